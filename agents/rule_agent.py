@@ -1,43 +1,231 @@
 import json
-from typing import List, Dict, Union
-import os, ast
-from openai import OpenAI
+from typing import List, Dict, Optional, Union
+import os, ast, re
+import threading
+from functools import lru_cache
+import asyncio
+from openai import AsyncOpenAI
+from tools.llm.cache import cached_chat_completion
 
 # Path to the knowledge base
 KNOWLEDGE_BASE_PATH = "configs/knowledge_base.json"
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY)
+client = AsyncOpenAI(api_key=OPENAI_API_KEY)
 
-def generate_cleaned_rules(student_profile: Dict[str, Union[str, List[str]]]) -> List[str]:
-    rules_to_apply = extract_rules_from_knowledge_base(student_profile)
+async def generate_cleaned_rules(student_profile: Dict[str, Union[str, List[str]]], use_cache: bool = True) -> List[str]:
+    # In-memory index lookup; only touches disk when the knowledge base changed
+    rules_to_apply = await asyncio.to_thread(extract_rules_from_knowledge_base, student_profile)
 
-    cleaned_rules = filter_rules_with_llm(rules_to_apply)
+    cleaned_rules = await filter_rules_with_llm(rules_to_apply, use_cache=use_cache)
     return cleaned_rules
 
+# -----------------------------
+# Pre-indexed knowledge base
+# -----------------------------
+MIN_PREFIX_MATCH = 8  # shortest normalized key allowed to match by prefix
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+_kb_lock = threading.Lock()
+_kb_state = {"mtime": None, "index": None}
+
+@lru_cache(maxsize=8192)  # profile values come from fixed dropdowns, so they repeat constantly
+def normalize_key(text: str) -> str:
+    """Case/whitespace/punctuation-insensitive key: 'Disability Category/Classification' → 'disabilitycategoryclassification'."""
+    return _NON_ALNUM.sub("", str(text).casefold())
+
+def _dedupe(rules: List[str]) -> List[str]:
+    return list(dict.fromkeys(rules))
+
+def _compile_index(rule_base: dict) -> dict:
+    """{normalized field: {normalized value: [unique rules]}}"""
+    fields = {}
+    for field, values in rule_base.items():
+        if not isinstance(values, dict):
+            continue
+        compiled = fields.setdefault(normalize_key(field), {})
+        for value, rules in values.items():
+            key = normalize_key(value)
+            compiled[key] = _dedupe(compiled.get(key, []) + list(rules or []))
+    return fields
+
+def load_knowledge_base_index() -> dict:
+    """
+    Returns the compiled knowledge base index, loading it once and
+    reloading only when the JSON file's mtime changes.
+    """
+    mtime = os.stat(KNOWLEDGE_BASE_PATH).st_mtime_ns
+    if _kb_state["mtime"] == mtime:
+        return _kb_state["index"]
+
+    with _kb_lock:
+        if _kb_state["mtime"] != mtime:
+            with open(KNOWLEDGE_BASE_PATH, "r") as f:
+                rule_base = json.load(f)
+            # Swap in a fresh index in one step; its field-name set keys the resolution memo
+            fields = _compile_index(rule_base)
+            _kb_state["index"] = {"fields": fields, "names": frozenset(fields)}
+            _kb_state["mtime"] = mtime
+            print(f"[RuleAgent] Knowledge base indexed ({len(_kb_state['index']['fields'])} fields)")
+    return _kb_state["index"]
+
+@lru_cache(maxsize=4096)  # bounded: profile keys come from user input; old indexes' entries age out
+def _resolve(candidates: frozenset, key: str) -> Optional[str]:
+    """
+    Resolves a profile field name to a knowledge base field: exact normalized
+    match, else the longest field where one key is a prefix of the other
+    (the knowledge base truncates some field names).
+    """
+    if key in candidates:
+        return key
+
+    best = None
+    if len(key) >= MIN_PREFIX_MATCH:
+        for candidate in candidates:
+            if len(candidate) >= MIN_PREFIX_MATCH and (key.startswith(candidate) or candidate.startswith(key)):
+                if best is None or len(candidate) > len(best):
+                    best = candidate
+    return best
+
 def extract_rules_from_knowledge_base(student_profile: Dict[str, Union[str, List[str]]]) -> List[str]:
     """
     Extract relevant rules based on the student profile.
     """
-    with open(KNOWLEDGE_BASE_PATH, "r") as f:
-        rule_base = json.load(f)
+    index = load_knowledge_base_index()
+    fields, names = index["fields"], index["names"]
 
     extracted_rules = []
 
     for key, value in student_profile.items():
-        if key in rule_base:
-            if isinstance(value, list):
-                for item in value:
-                    if item in rule_base[key]:
-                        extracted_rules.extend(rule_base[key][item])
-            elif isinstance(value, str):
-                if value in rule_base[key]:
-                    extracted_rules.extend(rule_base[key][value])
+        field = _resolve(names, normalize_key(key))
+        if field is None:
+            continue
+
+        values = value if isinstance(value, list) else [value] if isinstance(value, str) else []
+        for item in values:
+            rules = fields[field].get(normalize_key(item))
+            if rules:
+                extracted_rules.extend(rules)
+
+    return _dedupe(extracted_rules)
+
+# -----------------------------
+# Local pre-filter
+# -----------------------------
+CONTRADICTIONS_PATH = "configs/rule_contradictions.json"
+PREFILTER_MAX_RULES = int(os.getenv("RULE_PREFILTER_MAX_RULES", "60"))
+NEAR_DUPLICATE_THRESHOLD = 0.8   # word-shingle Jaccard similarity
+SHINGLE_SIZE = 3
+
+# Terms from the filter prompt's "keep" list, and markers of rules that only
+# describe policy or the student; used to rank rules when the list is capped.
+_LESSON_TERMS = re.compile(
+    r"\b(language|translat\w*|bilingual|glossar\w*|vocabulary|visuals?|images?|pictures?|audio|"
+    r"captions?|subtitles?|scaffold\w*|simplif\w*|plain|chunk\w*|steps?|sentence|frames?|"
+    r"pacing|breaks?|tone|examples?|graphic organizers?|checklists?|font|spacing|read[- ]aloud|"
+    r"instructions?|directions?|activit\w*|tasks?|questions?|practice|model\w*)\b"
+)
+_ADMIN_TERMS = re.compile(
+    r"\b(in (alabama|alaska|arizona|arkansas|california|colorado|connecticut|delaware|florida|georgia|"
+    r"hawaii|idaho|illinois|indiana|iowa|kansas|kentucky|louisiana|maine|maryland|massachusetts|"
+    r"michigan|minnesota|mississippi|missouri|montana|nebraska|nevada|new (hampshire|jersey|mexico|york)|"
+    r"north (carolina|dakota)|ohio|oklahoma|oregon|pennsylvania|rhode island|south (carolina|dakota)|"
+    r"tennessee|texas|utah|vermont|virginia|washington|west virginia|wisconsin|wyoming)|"
+    r"laws?|legal(ly)?|statutes?|regulations?|funding|district polic(y|ies)|permissible|"
+    r"only when specified|must be documented)\b"
+)
+
+_canon_space = re.compile(r"\s+")
+_words = re.compile(r"[0-9a-z]+")
+
+def canonical_rule(rule: str) -> str:
+    """Whitespace/case-normalized text used for exact duplicate checks and ordering."""
+    return _canon_space.sub(" ", str(rule).casefold()).strip()
 
-    return extracted_rules
+def _shingles(rule: str) -> frozenset:
+    words = _words.findall(rule.casefold())
+    if len(words) < SHINGLE_SIZE:
+        return frozenset([" ".join(words)])
+    return frozenset(" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1))
 
-import time
+def _drop_near_duplicates(rules: List[str]) -> List[str]:
+    """
+    Keeps the first of each group of rules whose shingle sets overlap by
+    NEAR_DUPLICATE_THRESHOLD or more. An inverted shingle index limits the
+    comparisons to rules that share at least one shingle.
+    """
+    kept, kept_shingles, postings = [], [], {}
+    for rule in rules:
+        shingles = _shingles(rule)
+        candidates = {i for s in shingles for i in postings.get(s, ())}
+        if any(len(shingles & kept_shingles[i]) / len(shingles | kept_shingles[i]) >= NEAR_DUPLICATE_THRESHOLD
+               for i in candidates):
+            continue
+        for s in shingles:
+            postings.setdefault(s, []).append(len(kept))
+        kept.append(rule)
+        kept_shingles.append(shingles)
+    return kept
+
+@lru_cache(maxsize=1)
+def load_contradictions(path: str = CONTRADICTIONS_PATH) -> tuple:
+    """[(name, [side a patterns], [side b patterns])] from the contradiction table."""
+    if not os.path.exists(path):
+        return ()
+    with open(path, "r") as f:
+        table = json.load(f)
+    return tuple(
+        (entry["name"], [re.compile(p) for p in entry["a"]], [re.compile(p) for p in entry["b"]])
+        for entry in table
+    )
+
+def _drop_contradictions(rules: List[str]) -> List[str]:
+    """
+    Removes both sides of every known contradiction present in the list,
+    as the filter prompt asks. A rule matching both sides counts as side a.
+    """
+    dropped = set()
+    for name, side_a, side_b in load_contradictions():
+        a, b = [], []
+        for rule in rules:
+            text = rule.casefold()
+            if any(p.search(text) for p in side_a):
+                a.append(rule)
+            elif any(p.search(text) for p in side_b):
+                b.append(rule)
+        if a and b:
+            print(f"[RuleAgent] Contradiction ({name}): {a} vs {b}")
+            dropped.update(a + b)
+    return [rule for rule in rules if rule not in dropped]
+
+def relevance_score(rule: str) -> int:
+    text = rule.casefold()
+    return len(_LESSON_TERMS.findall(text)) - 2 * len(_ADMIN_TERMS.findall(text))
+
+def prefilter_rules(rules: List[str], max_rules: int = PREFILTER_MAX_RULES) -> List[str]:
+    """
+    Deterministic pass before the LLM filter: exact and near-duplicate removal,
+    known contradictions, then a relevance cap. Returns the survivors in
+    canonical (sorted) order, so the same rule set always produces the same
+    prompt and the LLM answer is memoized by the response cache.
+    """
+    exact = {}
+    for rule in rules:
+        if str(rule).strip():
+            exact.setdefault(canonical_rule(rule), rule)
+    unique = _drop_near_duplicates(list(exact.values()))
+    unique = _drop_contradictions(unique)
 
-def filter_rules_with_llm(rules: List[str]) -> List[str]:
+    if max_rules and len(unique) > max_rules:
+        ranked = sorted(range(len(unique)), key=lambda i: (-relevance_score(unique[i]), i))
+        unique = [unique[i] for i in ranked[:max_rules]]
+
+    return sorted(unique, key=canonical_rule)
+
+async def filter_rules_with_llm(rules: List[str], use_cache: bool = True) -> List[str]:
+
+    rules = await asyncio.to_thread(prefilter_rules, rules)
+    if not rules:
+        return []
 
     prompt = f"""
 You are an expert lesson adaptation rule optimizer.
@@ -64,27 +252,35 @@ Optimized Rule List:
 """
 
     try:
-        response = client.chat.completions.create(
+        raw_output = await cached_chat_completion(
+            client,
             model="gpt-4o",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.2,
-            timeout=30  # Add timeout to avoid infinite hang
+            timeout=30,  # Add timeout to avoid infinite hang
+            use_cache=use_cache,
+            validate=parse_rule_list,
+            label="rule_filter"
         )
     except Exception as e:
         raise ValueError(f"[RuleAgent] LLM call failed: {e}")
 
-    raw_output = response.choices[0].message.content.strip()
+    try:
+        return parse_rule_list(raw_output)
+    except Exception as e:
+        raise ValueError(f"Failed to parse LLM response: {raw_output} — {str(e)}")
 
+
+def parse_rule_list(raw_output: str) -> List[str]:
+    """Parse the LLM's Python-list answer, tolerating code fences."""
+    raw_output = raw_output.strip()
     if raw_output.startswith("```"):
         raw_output = raw_output.strip("`")
         lines = raw_output.splitlines()
         lines = [line for line in lines if not line.strip().startswith("python")]
         raw_output = "\n".join(lines).strip()
 
-    try:
-        cleaned_rules = ast.literal_eval(raw_output)
-        if not isinstance(cleaned_rules, list):
-            raise ValueError("LLM did not return a list.")
-        return cleaned_rules
-    except Exception as e:
-        raise ValueError(f"Failed to parse LLM response: {raw_output} — {str(e)}")
\ No newline at end of file
+    cleaned_rules = ast.literal_eval(raw_output)
+    if not isinstance(cleaned_rules, list):
+        raise ValueError("LLM did not return a list.")
+    return cleaned_rules
@@ -0,0 +1,96 @@
+# benchmarks/audio_markers_bench.py — audio_node marker insertion and TTS fan-out
+#
+# Compares the old per-chunk lesson_text.replace() loop with the span splice in
+# graph/nodes/audio_node.py on a lesson with repeated paragraphs, and times
+# audio generation serially vs. concurrently against a simulated TTS latency.
+#
+#   python benchmarks/audio_markers_bench.py --paragraphs 50 --tts-latency 0.3
+
+import argparse
+import asyncio
+import functools
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import graph.nodes.audio_node as node
+import tools.audio.generate as audio
+from graph.nodes.audio_node import audio_node, insert_audio_markers
+
+
+def sample_lesson(paragraphs: int) -> str:
+    """Multi-day lesson text; every fifth paragraph repeats a question prompt."""
+    blocks = []
+    for i in range(paragraphs):
+        if i % 5 == 4:
+            blocks.append("Comprehension Check: What happened first? Turn and talk to a partner.")
+        else:
+            blocks.append(f"Paragraph {i + 1}. Daedalus built wings of feathers and wax. " * 6)
+    return "\n\n".join(blocks)
+
+
+def legacy_insert(lesson_text: str, chunks: list) -> str:
+    """The original loop: one full-text replace() per chunk."""
+    for idx, chunk in enumerate(chunks):
+        text = chunk.strip()
+        if text:
+            lesson_text = lesson_text.replace(text, f"{text}\n\n[AUDIO:audio_{idx}.mp3]")
+    return lesson_text
+
+
+def time_insertion(lesson: str, runs: int) -> tuple:
+    chunks = audio.split_text_for_audio(lesson)
+    spans = audio.split_text_for_audio_spans(lesson)
+    paths = [f"audio_{i}.mp3" for i in range(len(spans))]
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        legacy = legacy_insert(lesson, chunks)
+    legacy_ms = (time.perf_counter() - start) / runs * 1000
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        spliced = insert_audio_markers(lesson, spans, paths)
+    spliced_ms = (time.perf_counter() - start) / runs * 1000
+
+    return legacy_ms, spliced_ms, legacy.count("[AUDIO:"), spliced.count("[AUDIO:"), len(spans)
+
+
+async def time_generation(lesson: str, latency: float) -> dict:
+    """Runs audio_node with a fake TTS call that sleeps `latency` seconds."""
+    async def fake_synthesize_to(path, text, voice, model):
+        await asyncio.sleep(latency)
+        with open(path, "wb") as f:
+            f.write(b"\xff\xfb" + text.encode("utf-8"))
+
+    audio._synthesize_to = fake_synthesize_to
+    results = {}
+    for label, concurrency in (("serial", 1), ("concurrent", audio.TTS_MAX_CONCURRENCY)):
+        with tempfile.TemporaryDirectory() as store:
+            audio.OUTPUT_DIR = store  # empty store: every chunk is a miss
+            node.synthesize_chunks = functools.partial(audio.synthesize_chunks, max_concurrency=concurrency)
+            start = time.perf_counter()
+            state = await audio_node({"rules": ["Provide audio recordings"], "modified_lesson_text": lesson})
+            results[label] = (time.perf_counter() - start, len(state["audio_paths"]))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paragraphs", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--tts-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    for n in (args.paragraphs, args.paragraphs * 10):
+        legacy_ms, spliced_ms, legacy_markers, spliced_markers, spans = time_insertion(sample_lesson(n), args.runs)
+        print(f"{n:>5} paragraphs: replace loop {legacy_ms:8.2f} ms ({legacy_markers} markers), "
+              f"span splice {spliced_ms:6.2f} ms ({spliced_markers} markers for {spans} paragraphs)")
+
+    results = asyncio.run(time_generation(sample_lesson(args.paragraphs), args.tts_latency))
+    for label, (seconds, count) in results.items():
+        print(f"audio_node {label:<10}: {seconds:6.2f} s for {count} clips")
@@ -0,0 +1,104 @@
+# benchmarks/final_output_bench.py — generate_final_output rendering, before/after
+#
+# Renders a multi-day lesson to markdown and JSON with the original two-loop
+# renderer (uncompiled re.search per line) and with the single-pass block
+# renderer in tools/output/generate.py, checks the outputs are identical and
+# times both. Storage writes are excluded; they are the same for both.
+#
+#   python benchmarks/final_output_bench.py --days 10
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tools.output.generate import render_final_output
+
+
+def legacy_render(lesson_text: str) -> dict:
+    """The original generate_final_output body, minus the file writes."""
+    md_lines = []
+    lines = lesson_text.splitlines()
+    for line in lines:
+        stripped = line.strip()
+        if not stripped:
+            md_lines.append("")
+            continue
+        if stripped.lower().startswith("title:"):
+            md_lines.append(f"# {stripped.replace('Title:', '').strip()}")
+            continue
+        elif "instructions" in stripped.lower():
+            md_lines.append(f"## {stripped}")
+            continue
+        elif re.match(r"^\d+\.", stripped):
+            md_lines.append(f"### {stripped}")
+            continue
+        elif stripped.endswith(":"):
+            md_lines.append(f"**{stripped}**")
+            continue
+        audio_match = re.search(r"\[Insert Audio:\s*(.+?)\]", stripped)
+        if audio_match:
+            md_lines.append(f"🔊 [Insert Audio: {audio_match.group(1).strip()}]")
+            continue
+        image_match = re.search(r"\[Insert Image:\s*(.+?)\]", stripped)
+        if image_match:
+            md_lines.append(f"🔍 [Insert Image: {image_match.group(1).strip()}]")
+            continue
+        md_lines.append(stripped)
+
+    blocks = []
+    for line in lines:
+        audio_match = re.search(r"\[Insert Audio:\s*(.+?)\]", line)
+        if audio_match:
+            blocks.append({"type": "audio", "placeholder": audio_match.group(1).strip()})
+            continue
+        image_match = re.search(r"\[Insert Image:\s*(.+?)\]", line)
+        if image_match:
+            blocks.append({"type": "image", "placeholder": image_match.group(1).strip()})
+            continue
+        text_content = line.strip()
+        if text_content:
+            blocks.append({"type": "text", "content": text_content})
+
+    return {"txt": lesson_text, "md": "\n\n".join(md_lines), "json": json.dumps(blocks, ensure_ascii=False, indent=2)}
+
+
+def lesson_day(day: int) -> str:
+    """One day of modify_lesson output, including the odd lines the renderer special-cases."""
+    passage = "The water cycle moves water between the oceans, the air, and the land. " * 4
+    return "\n".join([
+        f"Title: Day {day} — The Water Cycle",
+        "",
+        "Instructions: Read each paragraph, then answer the questions below.",
+        "",
+        *(f"{passage}\n[Insert Audio: Paragraph {p} read aloud]\n[Insert Image: diagram for paragraph {p}]\n"
+          for p in range(1, 9)),
+        "Vocabulary:",
+        "   evaporation — water turning into vapor   ",
+        "TITLE: Key words",
+        "Instructions [Insert Audio: directions read aloud]",
+        *(f"{q}. Why does water vapor rise? Use a sequence word." for q in range(1, 9)),
+        "Word bank: [Insert Image: sequence word chart] first, next, then, finally",
+        "",
+    ])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    lesson = "\n\n".join(lesson_day(d) for d in range(1, args.days + 1))
+    assert render_final_output(lesson) == legacy_render(lesson), "renderers disagree"
+    print(f"{args.days}-day lesson: {len(lesson.splitlines())} lines, {len(lesson):,} chars; outputs identical")
+
+    for label, render in (("two-pass legacy", legacy_render), ("single-pass blocks", render_final_output)):
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            render(lesson)
+        print(f"{label:<20}{(time.perf_counter() - start) / args.runs * 1000:8.3f} ms per render")
@@ -0,0 +1,93 @@
+# benchmarks/load_test.py — concurrent throughput load test for the API
+#
+# Fires N concurrent /full-pipeline (or /generate_lesson_docx) requests at a
+# running server while probing /health, then reports request throughput and
+# /health latency. Run it against a server pointed at benchmarks/mock_openai.py
+# so results reflect our concurrency, not upstream latency:
+#
+#   python benchmarks/load_test.py --base-url http://127.0.0.1:8000 \
+#       --lesson-url http://127.0.0.1:9000/lesson.pdf --concurrency 20
+
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+
+
+def _payload(endpoint: str, lesson_url: str) -> dict:
+    profile = {"Dominant Language": "Spanish", "Learning Styles": ["Visual (Seeing)"]}
+    if endpoint == "/generate_lesson_docx":
+        return {
+            "student_profile": profile,
+            "lesson_objective": "Students retell the myth of Daedalus and Icarus.",
+            "language_objective": {"listening": "Follow a read-aloud"},
+            "target_language": "English",
+            "lesson_url": lesson_url,
+        }
+    return {"student_profile": profile, "lesson_url": lesson_url, "file_category": "Lesson", "number_of_days": 2}
+
+
+async def _probe_health(client: httpx.AsyncClient, stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            await client.get("/health", timeout=60)
+            samples.append(time.perf_counter() - start)
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.1)
+
+
+async def _one_request(client: httpx.AsyncClient, endpoint: str, payload: dict, latencies: list, errors: list):
+    start = time.perf_counter()
+    try:
+        response = await client.post(endpoint, json=payload, timeout=None)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    except httpx.HTTPError as e:
+        errors.append(str(e))
+
+
+def _pct(values: list, q: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def main(args):
+    latencies, errors, health = [], [], []
+    stop = asyncio.Event()
+    payload = _payload(args.endpoint, args.lesson_url)
+
+    async with httpx.AsyncClient(base_url=args.base_url, limits=httpx.Limits(max_connections=args.concurrency + 5)) as client:
+        prober = asyncio.create_task(_probe_health(client, stop, health))
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            _one_request(client, args.endpoint, payload, latencies, errors)
+            for _ in range(args.concurrency)
+        ])
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await prober
+
+    print(f"endpoint            {args.endpoint}")
+    print(f"concurrency         {args.concurrency}")
+    print(f"completed / failed  {len(latencies)} / {len(errors)}")
+    print(f"wall clock          {elapsed:.2f}s")
+    print(f"throughput          {len(latencies) / elapsed:.2f} req/s")
+    print(f"request p50 / p95   {_pct(latencies, 0.5):.2f}s / {_pct(latencies, 0.95):.2f}s")
+    if health:
+        print(f"/health p50 / max   {statistics.median(health) * 1000:.0f}ms / {max(health) * 1000:.0f}ms ({len(health)} probes)")
+    if errors:
+        print(f"first error         {errors[0]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--lesson-url", default="http://127.0.0.1:9000/lesson.pdf")
+    parser.add_argument("--endpoint", default="/full-pipeline", choices=["/full-pipeline", "/generate_lesson_docx"])
+    parser.add_argument("--concurrency", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
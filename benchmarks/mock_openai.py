@@ -0,0 +1,136 @@
+# benchmarks/mock_openai.py — minimal OpenAI-compatible stub for load testing
+#
+# Answers /v1/chat/completions after a fixed delay so the load test measures
+# how our API handles concurrency, not how fast OpenAI is. Also serves a small
+# sample lesson PDF at /lesson.pdf to use as `lesson_url`.
+#
+#   MOCK_LATENCY=2 uvicorn benchmarks.mock_openai:app --port 9000
+#   OPENAI_BASE_URL=http://127.0.0.1:9000/v1 OPENAI_API_KEY=test uvicorn main:app --port 8000
+
+import asyncio
+import json
+import os
+import time
+import fitz  # PyMuPDF
+from fastapi import FastAPI, Request
+from fastapi.responses import Response, StreamingResponse
+
+LATENCY = float(os.getenv("MOCK_LATENCY", "2"))
+
+app = FastAPI(title="Mock OpenAI")
+
+# Rough model of the provider's prompt cache: prefixes seen before, in 512-char blocks
+PREFIX_BLOCK = 512
+_seen_prefixes = set()
+
+
+def _usage(messages: list, content: str) -> dict:
+    """Token usage with prompt_tokens_details.cached_tokens for the longest previously seen prefix."""
+    text = "".join(f"{m.get('role')}:{m.get('content', '')}" for m in messages)
+    cached_chars = 0
+    for end in range(PREFIX_BLOCK, len(text) + 1, PREFIX_BLOCK):
+        prefix = hash(text[:end])
+        if prefix in _seen_prefixes and cached_chars == end - PREFIX_BLOCK:
+            cached_chars = end
+        _seen_prefixes.add(prefix)
+    prompt_tokens = len(text) // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": len(content) // 4,
+        "total_tokens": prompt_tokens + len(content) // 4,
+        "prompt_tokens_details": {"cached_tokens": cached_chars // 4 if cached_chars >= 4096 else 0},
+    }
+
+
+def _reply_for(messages: list) -> str:
+    """Return content shaped like what each caller parses."""
+    text = " ".join(m.get("content", "") for m in messages)
+    if "Optimized Rule List" in text:
+        return '["Use visuals to support comprehension", "Provide translations in Spanish"]'
+    if "worksheet sections" in text:
+        return '[{"section": "Q1", "content": "Mock question"}]'
+    if "valid JSON" in text:
+        return '[{"title": "Slide", "content": "Mock content"}]'
+    if "### Section:" in text:
+        return "\n\n".join(f"### Section: {name}\nMock {name} text." for name in ["Intro Teacher", "I Do Teacher", "Intro Student"])
+    return "# Mock Lesson\n\n## Engager\nMock engager.\n\n## I Do\nMock retelling [Insert Audio: Part 1]"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    content = _reply_for(body.get("messages", []))
+    if body.get("stream"):
+        return StreamingResponse(_stream(body, content), media_type="text/event-stream")
+
+    await asyncio.sleep(LATENCY)
+    return {
+        "id": "chatcmpl-mock",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": _usage(body.get("messages", []), content)
+    }
+
+
+async def _stream(body: dict, content: str):
+    """Spread LATENCY across word-sized chunks, like a real token stream."""
+    words = content.split(" ")
+    for i, word in enumerate(words):
+        await asyncio.sleep(LATENCY / len(words))
+        chunk = {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}]
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+    if (body.get("stream_options") or {}).get("include_usage"):
+        chunk = {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [],
+            "usage": _usage(body.get("messages", []), content)
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/audio/speech")
+async def audio_speech(request: Request):
+    """Streams fake mp3 bytes (a few KB per sentence of input) over LATENCY seconds."""
+    body = await request.json()
+    size = 2048 * max(1, body.get("input", "").count(".") + 1)
+
+    async def chunks():
+        for _ in range(4):
+            await asyncio.sleep(LATENCY / 4)
+            yield b"\xff\xfb" + os.urandom(size // 4 - 2)
+
+    return StreamingResponse(chunks(), media_type="audio/mpeg")
+
+
+@app.get("/images/{name}")
+async def image(name: str, size: int = 64 * 1024):
+    """A deterministic fake image per name (same name → same bytes) after LATENCY."""
+    await asyncio.sleep(LATENCY)
+    seed = name.encode("utf-8")
+    body = b"\x89PNG\r\n\x1a\n" + (seed * (size // len(seed) + 1))[:size]
+    return Response(body, media_type="image/png")
+
+
+@app.get("/lesson.pdf")
+def lesson_pdf():
+    doc = fitz.open()
+    for i in range(3):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Day {i + 1}: Daedalus and Icarus\nA short mock paragraph for load testing.")
+    return Response(doc.tobytes(), media_type="application/pdf")
@@ -0,0 +1,135 @@
+# benchmarks/pptx_render_bench.py — slide deck rendering, before/after
+#
+# Renders a lesson deck with the original _set_formatted_content (python-pptx
+# font properties set run by run) and with the precomputed line templates in
+# tools/output/generate_pptx.py, checks every slide's XML is identical, and
+# times rendering plus the old save-to-disk / read-back round trip against
+# rendering into memory.
+#
+#   python benchmarks/pptx_render_bench.py --slides 40
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from pptx.dml.color import RGBColor
+from pptx.enum.text import MSO_ANCHOR, PP_ALIGN
+from pptx.util import Pt
+import tools.output.generate_pptx as generate_pptx
+
+FAST_FORMATTER = generate_pptx._set_formatted_content
+
+
+def legacy_set_formatted_content(text_frame, content, center=False):
+    """The original formatter: python-pptx font setters for every line."""
+    text_frame.clear()
+    text_frame.word_wrap = True
+    if center:
+        text_frame.vertical_anchor = MSO_ANCHOR.MIDDLE
+
+    if "\n\n" in content and "\n" in content:
+        first_single = content.find("\n")
+        first_double = content.find("\n\n")
+        second_single = content.find("\n", first_double + 2)
+        part1 = content[:first_single].strip() if first_single != -1 else ""
+        part2 = content[first_single:first_double].strip() if first_double != -1 else ""
+        part3 = content[first_double:second_single].replace("\n\n", "").strip() if second_single != -1 else content[first_double:].replace("\n\n", "").strip()
+        part4 = content[second_single:].strip() if second_single != -1 else ""
+        styled_parts = [(part1, RGBColor(0, 102, 204), False), (part2, RGBColor(0, 102, 204), True),
+                        ("__SPACER__", None, None), (part3, RGBColor(255, 0, 0), False), (part4, RGBColor(255, 0, 0), True)]
+    elif "\n\n" in content:
+        english_part, translation_part = content.split("\n\n", 1)
+        styled_parts = [(english_part.strip(), RGBColor(0, 102, 204), False), ("__SPACER__", None, None),
+                        (translation_part.strip(), RGBColor(255, 0, 0), False)]
+    else:
+        styled_parts = [(content.strip(), RGBColor(0, 0, 0), False)]
+
+    for text, color, bold in styled_parts:
+        if text == "__SPACER__":
+            for _ in range(2):
+                text_frame.add_paragraph().text = ""
+            continue
+        if not text:
+            continue
+        for line in text.split("\n"):
+            clean_line = line.strip()
+            if not clean_line:
+                continue
+            p = text_frame.add_paragraph()
+            p.alignment = PP_ALIGN.CENTER if center else PP_ALIGN.LEFT
+            run = p.add_run()
+            run.text = clean_line
+            run.font.size = Pt(16)
+            run.font.name = "Poppins"
+            run.font.color.rgb = color
+            run.font.bold = bold
+
+
+def sample_slides(count: int) -> list:
+    english = "\n".join(f"Step {i}: water vapor cools and condenses into clouds." for i in range(1, 5))
+    spanish = "\n".join(f"Paso {i}: el vapor de agua se enfría y se condensa en nubes." for i in range(1, 5))
+    kinds = [
+        {"title": "I Do", "content": ""},
+        {"title": "Vocabulary", "content": f"Evaporation\nWater turns into vapor.\n\nEvaporación\n{spanish}"},
+        {"title": "Read Along", "content": f"{english}\n\n{spanish}"},
+        {"title": "", "content": "Turn and talk: what happens after condensation?\n\n¿Qué pasa después?"},
+        {"title": "Check", "content": "Thumbs up if you can name all four stages. \x07"},
+    ]
+    return [kinds[i % len(kinds)] for i in range(count)]
+
+
+def slide_xml(data: bytes) -> dict:
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        return {name: zf.read(name) for name in zf.namelist() if name.startswith("ppt/slides/slide")}
+
+
+def render_with(formatter, slides: list) -> bytes:
+    generate_pptx._set_formatted_content = formatter
+    try:
+        return generate_pptx.render_slide_deck(slides)
+    finally:
+        generate_pptx._set_formatted_content = FAST_FORMATTER
+
+
+def timed(fn, runs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) / runs * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--slides", type=int, default=40)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    slides = sample_slides(args.slides)
+    assert slide_xml(render_with(legacy_set_formatted_content, slides)) == slide_xml(render_with(FAST_FORMATTER, slides)), \
+        "slide XML differs"
+    print(f"{args.slides} slides: slide XML identical")
+
+    for label, formatter in (("per-run font setters", legacy_set_formatted_content),
+                             ("precomputed templates", FAST_FORMATTER)):
+        render_with(formatter, slides)  # warm-up
+        print(f"render, {label:<22}{timed(lambda: render_with(formatter, slides), args.runs):8.1f} ms")
+
+    deck = generate_pptx.render_slide_deck(slides)
+    with tempfile.TemporaryDirectory() as tmp:
+        def disk_round_trip():
+            path = os.path.join(tmp, "deck.pptx")
+            with open(path, "wb") as f:
+                f.write(deck)
+                f.flush()
+                os.fsync(f.fileno())
+            with open(path, "rb") as f:  # the download's StaticFiles read
+                return f.read()
+
+        disk_ms = timed(disk_round_trip, args.runs)
+    print(f"disk write + read back of a {len(deck) / 2**10:.0f} KiB deck {disk_ms:8.2f} ms (skipped when served from memory)")
@@ -0,0 +1,79 @@
+# benchmarks/prompt_tokens.py — prompt size of the section calls, before/after
+#
+# Builds the teacher and student prompts of generate_all_sections with the
+# original per-section layout (every template formatted with the full inputs)
+# and with the shared-context layout, and counts tokens locally.
+#
+#   python benchmarks/prompt_tokens.py                      # synthetic lessons
+#   python benchmarks/prompt_tokens.py data/inputs/*.pdf    # real lessons
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from tools.llm.generate_sections import (
+    STUDENT_SECTIONS, TEACHER_SECTIONS, build_combined_prompt, extract_profile_fields, load_prompt
+)
+from utils.tokens import count_tokens
+
+PROFILE = {
+    "Disability Category/Classification": ["Specific Learning Disability", "Speech or Language Impairment"],
+    "Related Services": ["Speech/Language Therapy", "Counseling"],
+    "Mobility Needs": "None",
+    "Health & Physical Needs": "None",
+    "Management Needs": ["Frequent check-ins", "Preferential seating", "Chunked directions"],
+    "Participation with Peers": "Works best in small groups",
+    "English Language Literacy Grade Level": "Grade 3 (L–P, 500–599)",
+    "Home Language Literacy Grade Level": "Grade 4",
+    "Dominant Language": "Spanish",
+    "Student Interests": ["Soccer", "Drawing", "Animals"],
+    "English Language Proficiency Level": "Developing",
+}
+TEACHER_OUTPUT = {name: "Teacher-facing text for this section. " * 40 for name in TEACHER_SECTIONS}
+
+
+def legacy_combined_prompt(section_list, student_profile, lesson_content, lesson_objective,
+                           language_objective, target_language, prior_sections=None):
+    """The original layout: each section template carries its own copy of every input."""
+    extracted = extract_profile_fields(student_profile)
+    prior_sections = prior_sections or {}
+    blocks = []
+    for section_key in section_list:
+        filled = load_prompt(section_key).format(
+            student_profile=student_profile, lesson_content=lesson_content,
+            lesson_objective=lesson_objective, language_objective=language_objective,
+            target_language=target_language, **extracted,
+            **{k: prior_sections.get(k, "") for k in ("intro_teacher", "i_do_teacher", "we_do_teacher", "you_do_teacher")}
+        )
+        blocks.append(f"### Section: {section_key.replace('_', ' ').title()}\n{filled}")
+    return "\n\n".join(blocks)
+
+
+def synthetic_lesson(paragraphs: int) -> str:
+    paragraph = ("The water cycle moves water between the oceans, the air, and the land. "
+                 "Heat from the sun causes evaporation, vapor cools into clouds, and rain returns it. ") * 3
+    return "\n\n".join(f"Paragraph {i + 1}. {paragraph}" for i in range(paragraphs))
+
+
+def lessons(paths: list) -> list:
+    if not paths:
+        return [(f"synthetic-{n}p", synthetic_lesson(n)) for n in (5, 20, 60)]
+    from utils.file_parser import extract_text_from_file
+    return [(os.path.basename(p), extract_text_from_file(p)) for p in paths]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("files", nargs="*", help="lesson files (pdf/docx/txt); synthetic lessons if omitted")
+    args = parser.parse_args()
+
+    args_common = ("Explain the stages of the water cycle.", "Describe a process using sequence words.", "Spanish")
+    print(f"{'lesson':<28}{'call':<10}{'before':>10}{'after':>10}{'saved':>9}")
+    for name, text in lessons(args.files):
+        for call, sections, prior in (("teacher", TEACHER_SECTIONS, None), ("student", STUDENT_SECTIONS, TEACHER_OUTPUT)):
+            before = count_tokens(legacy_combined_prompt(sections, PROFILE, text, *args_common, prior_sections=prior))
+            after = count_tokens(build_combined_prompt(sections, PROFILE, text, *args_common, prior_sections=prior))
+            print(f"{name[:27]:<28}{call:<10}{before:>10}{after:>10}{(before - after) / before:>9.1%}")
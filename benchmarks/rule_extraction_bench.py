@@ -0,0 +1,67 @@
+# benchmarks/rule_extraction_bench.py — rule extraction latency for large profiles
+#
+# Compares the old per-request json.load + nested lookups with the
+# pre-indexed knowledge base in agents/rule_agent.py.
+#
+#   python benchmarks/rule_extraction_bench.py --runs 200
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from agents.rule_agent import KNOWLEDGE_BASE_PATH, extract_rules_from_knowledge_base, load_knowledge_base_index
+
+
+def legacy_extract(student_profile: dict) -> list:
+    """The original implementation: reload and walk the JSON on every call."""
+    with open(KNOWLEDGE_BASE_PATH, "r") as f:
+        rule_base = json.load(f)
+    extracted = []
+    for key, value in student_profile.items():
+        if key in rule_base:
+            items = value if isinstance(value, list) else [value]
+            for item in items:
+                if item in rule_base[key]:
+                    extracted.extend(rule_base[key][item])
+    return extracted
+
+
+def large_profile() -> dict:
+    """Every field, with up to 10 values per list field — a worst-case rich profile."""
+    with open(KNOWLEDGE_BASE_PATH, "r") as f:
+        rule_base = json.load(f)
+    profile = {field: list(values)[:10] for field, values in rule_base.items()}
+    # Profile forms send the full field name the knowledge base truncates
+    profile["Disability Category/Classification"] = profile.pop("Disability CategoryClassificati")
+    profile["Home Language Literacy Grade Level"] = profile.pop("Home Language Literacy Grade Le")
+    return profile
+
+
+def timed(fn, profile: dict, runs: int) -> tuple:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        rules = fn(profile)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000, samples[int(len(samples) * 0.95)] * 1000, len(rules)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    profile = large_profile()
+    start = time.perf_counter()
+    load_knowledge_base_index()
+    print(f"index build (once)   {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    for name, fn in [("legacy json.load", legacy_extract), ("pre-indexed", extract_rules_from_knowledge_base)]:
+        p50, p95, count = timed(fn, profile, args.runs)
+        print(f"{name:<20} p50 {p50:.3f} ms   p95 {p95:.3f} ms   rules {count}")
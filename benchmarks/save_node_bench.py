@@ -0,0 +1,127 @@
+# benchmarks/save_node_bench.py — lesson plan fill time and peak memory
+#
+# Fills templates/lesson_template.docx with the original save_node approach
+# (open the template from disk, walk every table/row/cell, python-docx save)
+# and with the cached template (pre-parsed XML, precomputed cell targets,
+# zip records copied as stored), checks both produce the same document text,
+# and measures per-document time and tracemalloc peak while `--concurrency`
+# fills run at once in worker threads. Artifact storage is excluded.
+#
+#   python benchmarks/save_node_bench.py --docs 24 --concurrency 8
+
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+import tracemalloc
+import zipfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from docx import Document
+from docx.shared import Pt
+import graph.nodes.save_node as save_node
+from graph.nodes.save_node import ACTIVITY_TABLE_MAPPING, TEMPLATE_PATH, insert_into_cell
+
+SECTIONS = {
+    "standards": "RL.3.1 Ask and answer questions to demonstrate understanding of a text.",
+    "content": "Students will describe the stages of the water cycle.",
+    "language": "Students will use sequence words to explain a process orally and in writing.",
+    "purpose": "Understanding the water cycle helps students explain weather they observe.",
+    **{key: ["Model the first step with a think-aloud.", "Check for understanding with thumbs up/down.",
+             "Provide a sentence frame: First..., next..., finally..."] for key in ACTIVITY_TABLE_MAPPING.values()},
+}
+
+
+def legacy_fill(sections: dict) -> bytes:
+    """The original fill_lesson_template, returning the saved bytes."""
+    doc = Document(TEMPLATE_PATH)
+    if doc.paragraphs:
+        title_paragraph = doc.paragraphs[0]
+        title_paragraph.text = "Lesson Plan"
+        run = title_paragraph.runs[0] if title_paragraph.runs else title_paragraph.add_run()
+        run.font.name = "Poppins"
+        run.font.size = Pt(24)
+        run.bold = True
+
+    for table in doc.tables:
+        rows = table.rows
+        if len(rows) < 2:
+            continue
+        if "Standards Addressed" in rows[0].cells[0].text and "Objectives or Essential Question" in rows[0].cells[1].text:
+            standards_cell, content_cell = rows[1].cells[0], rows[1].cells[1]
+            purpose_cell, language_cell = rows[5].cells[0], rows[2].cells[1]
+            if "standards" in sections:
+                insert_into_cell(standards_cell, sections["standards"])
+            if "content" in sections and "CONTENT:" in content_cell.text:
+                insert_into_cell(content_cell, f"Content Goal: {sections['content']}")
+            if "language" in sections:
+                insert_into_cell(language_cell, f"Language Goal: {sections['language']}")
+            if "purpose" in sections:
+                insert_into_cell(purpose_cell, sections["purpose"])
+            continue
+        header_cells = [cell.text.strip() for cell in rows[0].cells]
+        for row in rows[1:]:
+            row_label = row.cells[0].text.strip()
+            for col_idx, col_text in enumerate(header_cells[1:], start=1):
+                key = (row_label, col_text.strip())
+                if key in ACTIVITY_TABLE_MAPPING and ACTIVITY_TABLE_MAPPING[key] in sections:
+                    content = sections[ACTIVITY_TABLE_MAPPING[key]]
+                    if isinstance(content, list):
+                        content = "\n".join(f"• {item}" for item in content)
+                    insert_into_cell(row.cells[col_idx], content)
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+cached_fill = save_node.render_lesson_plan
+
+
+def document_text(data: bytes) -> list:
+    doc = Document(io.BytesIO(data))
+    text = [p.text for p in doc.paragraphs]
+    for table in doc.tables:
+        text += [cell.text for row in table.rows for cell in row.cells]
+    return text
+
+
+async def run(fill, docs: int, concurrency: int) -> tuple:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            return len(await asyncio.to_thread(fill, SECTIONS))  # don't hold finished documents
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    outputs = await asyncio.gather(*(one() for _ in range(docs)))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, outputs[0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=24)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    save_node.load_lesson_template()  # startup cost, paid once per process
+    legacy, cached = legacy_fill(SECTIONS), cached_fill(SECTIONS)
+    assert zipfile.ZipFile(io.BytesIO(cached)).testzip() is None
+    assert document_text(legacy) == document_text(cached), "filled documents differ"
+    print("filled text identical; output zip valid")
+
+    for label, fill in (("legacy", legacy_fill), ("cached template", cached_fill)):
+        start = time.perf_counter()
+        fill(SECTIONS)
+        single = time.perf_counter() - start
+        elapsed, peak, size = asyncio.run(run(fill, args.docs, args.concurrency))
+        print(f"{label:<16} single {single * 1000:7.1f} ms | {args.docs} docs x{args.concurrency}: "
+              f"{elapsed / args.docs * 1000:7.1f} ms/doc, peak {peak / 2**20:6.1f} MiB, {size / 2**20:.2f} MiB each")
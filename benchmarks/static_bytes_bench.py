@@ -0,0 +1,149 @@
+# benchmarks/static_bytes_bench.py — bytes transferred per editor session
+#
+# Serves an editor session's assets (editor page/JS/CSS, the lesson markdown
+# and JSON, a few mp3 clips and images) from plain StaticFiles and from
+# utils/static_files.CachedStaticFiles, and replays repeat visits through a
+# client with a standard HTTP cache: fresh entries are not requested, stale
+# ones are revalidated with If-None-Match / If-Modified-Since. Audio is
+# requested the way <audio> does (Range: bytes=0-). Also checks that Range
+# and If-Range work on the audio mount.
+#
+#   python benchmarks/static_bytes_bench.py --visits 5
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from starlette.applications import Starlette
+from starlette.staticfiles import StaticFiles
+from starlette.testclient import TestClient
+from utils.static_files import CachedStaticFiles
+
+EDITOR_DIR = os.path.join(os.path.dirname(__file__), "..", "editor")
+ACCEPT_ENCODING = "gzip, deflate, br"
+
+
+def sample_lesson(days: int) -> str:
+    day = ("Title: The Water Cycle\n\nInstructions: Read the passage, then answer the questions.\n\n"
+           + "Heat from the sun causes evaporation, vapor cools into clouds, and rain returns it to the land. " * 12
+           + "\n\n1. What causes evaporation?\n\n🔊 [Insert Audio: Read the passage aloud]\n\n"
+           + "🔍 [Insert Image: diagram of the water cycle]\n\n")
+    return day * days
+
+
+def build_assets(root: str, days: int) -> list:
+    """Writes the session's files and returns the URLs the editor requests, in order."""
+    for name in ("outputs/markdown", "outputs/json", "audio", "images"):
+        os.makedirs(os.path.join(root, name), exist_ok=True)
+    shutil.copytree(EDITOR_DIR, os.path.join(root, "editor"))
+
+    lesson = sample_lesson(days)
+    with open(os.path.join(root, "outputs/markdown/final_lesson.md"), "w") as f:
+        f.write(lesson)
+    with open(os.path.join(root, "outputs/json/final_lesson.json"), "w") as f:
+        f.write(str([{"type": "text", "content": line} for line in lesson.splitlines() if line]))
+    for i in range(4):
+        with open(os.path.join(root, f"audio/tts_{i}.mp3"), "wb") as f:
+            f.write(os.urandom(240 * 1024))
+    for i in range(3):
+        with open(os.path.join(root, f"images/image_{i}.jpg"), "wb") as f:
+            f.write(os.urandom(90 * 1024))
+
+    return (["/editor/index.html", "/editor/script.js", "/editor/style.css",
+             "/outputs/markdown/final_lesson.md", "/outputs/json/final_lesson.json"]
+            + [f"/audio/tts_{i}.mp3" for i in range(4)]
+            + [f"/images/image_{i}.jpg" for i in range(3)])
+
+
+def build_app(root: str, cached: bool) -> Starlette:
+    app = Starlette()
+    if cached:
+        app.mount("/outputs", CachedStaticFiles(directory=f"{root}/outputs", immutable=True))
+        app.mount("/editor", CachedStaticFiles(directory=f"{root}/editor"))
+        app.mount("/audio", CachedStaticFiles(directory=f"{root}/audio", immutable=True))
+        app.mount("/images", CachedStaticFiles(directory=f"{root}/images", immutable=True))
+    else:
+        for name in ("outputs", "editor", "audio", "images"):
+            app.mount(f"/{name}", StaticFiles(directory=f"{root}/{name}"))
+    return app
+
+
+class CachingClient:
+    """Minimal private HTTP cache: immutable/max-age entries are reused, others revalidated."""
+
+    def __init__(self, client: TestClient):
+        self.client = client
+        self.entries = {}  # url -> response headers
+
+    def get(self, url: str) -> tuple:
+        """Returns (bytes on the wire, made a request)."""
+        cached = self.entries.get(url)
+        if cached is not None and "immutable" in cached.get("cache-control", ""):
+            return 0, False
+
+        headers = {"accept-encoding": ACCEPT_ENCODING}
+        if url.endswith(".mp3"):
+            headers["range"] = "bytes=0-"
+        if cached is not None:
+            if "etag" in cached:
+                headers["if-none-match"] = cached["etag"]
+            if "last-modified" in cached:
+                headers["if-modified-since"] = cached["last-modified"]
+
+        response = self.client.get(url, headers=headers)
+        assert response.status_code in (200, 206, 304), (url, response.status_code)
+        if response.status_code != 304:
+            self.entries[url] = response.headers
+        header_bytes = sum(len(k) + len(v) + 4 for k, v in response.headers.raw) + 17
+        return response.num_bytes_downloaded + header_bytes, True
+
+
+def run_sessions(root: str, urls: list, cached: bool, visits: int) -> list:
+    """Per visit: (total bytes, text asset bytes, requests made)."""
+    client = CachingClient(TestClient(build_app(root, cached)))
+    per_visit = []
+    for _ in range(visits):
+        results = [(url, *client.get(url)) for url in urls]
+        per_visit.append((
+            sum(b for _, b, _ in results),
+            sum(b for url, b, _ in results if url.endswith((".md", ".json", ".js", ".css", ".html"))),
+            sum(1 for _, _, requested in results if requested),
+        ))
+    return per_visit
+
+
+def check_ranges(root: str):
+    client = TestClient(build_app(root, cached=True))
+    full = client.get("/audio/tts_0.mp3")
+    etag = full.headers["etag"]
+    part = client.get("/audio/tts_0.mp3", headers={"range": "bytes=1000-1999"})
+    assert part.status_code == 206 and len(part.content) == 1000
+    assert part.content == full.content[1000:2000]
+    assert part.headers["content-range"] == f"bytes 1000-1999/{len(full.content)}"
+    same = client.get("/audio/tts_0.mp3", headers={"range": "bytes=0-99", "if-range": etag})
+    stale = client.get("/audio/tts_0.mp3", headers={"range": "bytes=0-99", "if-range": '"other"'})
+    assert same.status_code == 206 and stale.status_code == 200
+    print(f"audio ranges ok: 206 with {part.headers['content-range']}, If-Range honoured, "
+          f"accept-ranges={full.headers['accept-ranges']}, etag={etag[:14]}…\"")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--visits", type=int, default=5)
+    parser.add_argument("--days", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        urls = build_assets(root, args.days)
+        check_ranges(root)
+        print(f"{'':<14}{'first visit':>14}{'(text assets)':>16}{'repeat visit':>15}"
+              f"{'requests 1st/rep':>18}{f'{args.visits} visits':>14}")
+        for label, cached in (("StaticFiles", False), ("Cached", True)):
+            visits = run_sessions(root, urls, cached, args.visits)
+            total = sum(b for b, _, _ in visits)
+            print(f"{label:<14}{visits[0][0]:>12,} B{visits[0][1]:>14,} B{visits[1][0]:>13,} B"
+                  f"{f'{visits[0][2]}/{visits[1][2]}':>18}{total:>12,} B")
@@ -17,7 +17,9 @@ document.addEventListener("DOMContentLoaded", () => {
   }
   const file = params.get("file");
   if (file) {
-    fetch(`/outputs/markdown/${file}`)
+    // `file` is an artifact path (markdown/ab/name.md); older links carry a bare markdown filename
+    const path = file.includes("/") ? file : `markdown/${file}`;
+    fetch(`/outputs/${path}`)
       .then(res => res.text())
       .then(data => {
         container.innerHTML = marked.parse(data);
@@ -88,15 +90,35 @@ document.addEventListener("DOMContentLoaded", () => {
           return;
         }
 
-        images.forEach(url => {
+        // Results are thumbnails; only the picked image is downloaded and stored
+        images.forEach(image => {
           const img = document.createElement("img");
-          img.src = url;
+          img.src = image.thumbnail_url;
+          img.alt = image.title || "";
+          img.title = image.source || "";
+          img.loading = "lazy";
           img.style.width = "100%";
           img.style.margin = "5px 0";
           img.style.cursor = "pointer";
           img.onclick = () => {
-            insertAtCursor(`<img src="${url}" alt="Lesson Image" class="fixed-media">`);
-            sidePanel.style.right = "-400px";
+            img.style.opacity = "0.5";
+            fetch("/api/commit_image", {
+              method: "POST",
+              headers: { "Content-Type": "application/json" },
+              body: JSON.stringify({ result_id: image.id })
+            })
+              .then(res => {
+                if (!res.ok) throw new Error();
+                return res.json();
+              })
+              .then(data => {
+                insertAtCursor(`<img src="${data.image_url}" alt="Lesson Image" class="fixed-media">`);
+                sidePanel.style.right = "-400px";
+              })
+              .catch(() => {
+                img.style.opacity = "1";
+                alert("Error saving image.");
+              });
           };
           resultsDiv.appendChild(img);
         });
@@ -106,16 +128,63 @@ document.addEventListener("DOMContentLoaded", () => {
       });
   };
 
-  window.generateAudio = function () {
-    const text = document.getElementById("audio-text").value.trim();
-    if (!text) return;
+  // Prompts short enough for a URL play while they are synthesized. The
+  // stream is only a preview: lessons store the synthesized file's URL.
+  const STREAM_AUDIO_MAX_CHARS = 1500;
 
-    fetch("/api/generate_audio", {
+  function requestAudio(text) {
+    return fetch("/api/generate_audio", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({ prompt: text })
-    })
-      .then(res => res.json())
+    }).then(res => {
+      if (!res.ok) throw new Error();
+      return res.json();
+    });
+  }
+
+  // Joins the synthesis the stream started (nothing is synthesized twice) and
+  // swaps in the stored file, so reopening a lesson never re-runs TTS.
+  function storeStreamedAudio(audio, text) {
+    requestAudio(text)
+      .then(data => {
+        audio.querySelector("source").setAttribute("src", data.audio_url);
+        audio.removeAttribute("preload");
+        audio.removeAttribute("id");
+      })
+      .catch(() => {
+        audio.remove();
+        alert("Error generating audio.");
+      });
+  }
+
+  window.generateAudio = function () {
+    const text = document.getElementById("audio-text").value.trim();
+    if (!text) return;
+
+    if (text.length <= STREAM_AUDIO_MAX_CHARS) {
+      const pendingId = `pending-audio-${Date.now()}`;
+      const src = `/api/generate_audio/stream?prompt=${encodeURIComponent(text)}`;
+      insertAtCursor(`
+          <audio controls class="fixed-media" draggable="true" preload="auto" id="${pendingId}">
+            <source src="${src}" type="audio/mpeg">
+          </audio>
+        `);
+      sidePanel.style.right = "-400px";
+
+      const audio = document.getElementById(pendingId);
+      if (audio) {
+        // Once the stream is flowing it owns the synthesis; the request below joins it
+        audio.addEventListener("loadeddata", () => storeStreamedAudio(audio, text), { once: true });
+        audio.querySelector("source").addEventListener("error", () => {
+          audio.remove();
+          alert("Error generating audio.");
+        }, { once: true });
+      }
+      return;
+    }
+
+    requestAudio(text)
       .then(data => {
         const audioHTML = `
           <audio controls class="fixed-media" draggable="true">
@@ -1,9 +1,10 @@
 # graph/lesson_docx_graph.py
 
-from langgraph.graph import StateGraph
+from langgraph.graph import StateGraph, START, END
 from graph.schema import State
 from graph.nodes.download_lesson_node import download_lesson_node
 from graph.nodes.generate_node import generate_node
+from graph.nodes.generate_student_node import generate_student_node
 from graph.nodes.generate_pptx_node import generate_pptx_node
 from graph.nodes.save_node import save_node
 from graph.nodes.generate_worksheet_node import generate_worksheet_node
@@ -14,20 +15,39 @@ workflow = StateGraph(State)
 
 # Register each node
 workflow.add_node("download_lesson_node", download_lesson_node)
-workflow.add_node("generate_node", generate_node)
+workflow.add_node("generate_node", generate_node)                  # teacher sections
+workflow.add_node("generate_student_node", generate_student_node)  # student sections
 workflow.add_node("generate_pptx_node", generate_pptx_node)
-workflow.add_node("generate_worksheet_node", generate_worksheet_node)  # ✅ NEW
+workflow.add_node("generate_worksheet_node", generate_worksheet_node)
 workflow.add_node("save_node", save_node)
-workflow.add_node("generate_reference_text_node", generate_reference_text_node)  # ✅ NEW
+workflow.add_node("generate_reference_text_node", generate_reference_text_node)
 
-# Define the flow of the pipeline
-workflow.set_entry_point("download_lesson_node")
+# Define the flow of the pipeline as a DAG:
+#
+#   download → teacher sections ─┬─ student sections ─┬─ save (lesson plan)
+#                                │                    │
+#                                └─ slides ───────────┴─ worksheet
+#                                   └─ reference text
+#
+# Nodes return only the keys they write, so parallel branches never clash;
+# `sections` is merged by the reducer declared in graph/schema.py.
+workflow.add_edge(START, "download_lesson_node")
 workflow.add_edge("download_lesson_node", "generate_node")
+
+# Fan-out: student sections and slides only depend on the teacher sections
+workflow.add_edge("generate_node", "generate_student_node")
 workflow.add_edge("generate_node", "generate_pptx_node")
-workflow.add_edge("generate_pptx_node", "generate_worksheet_node")     # ✅ NEW
-workflow.add_edge("generate_worksheet_node", "save_node")     
-workflow.add_edge("save_node", "generate_reference_text_node")     # ✅ NEW
-workflow.set_finish_point("generate_reference_text_node")
+
+# The lesson plan needs every section; the reference text only needs slides' paragraphs
+workflow.add_edge("generate_student_node", "save_node")
+workflow.add_edge("generate_pptx_node", "generate_reference_text_node")
+
+# Fan-in: the worksheet waits for both student sections and slide data
+workflow.add_edge(["generate_student_node", "generate_pptx_node"], "generate_worksheet_node")
+
+workflow.add_edge("save_node", END)
+workflow.add_edge("generate_worksheet_node", END)
+workflow.add_edge("generate_reference_text_node", END)
 
 
 # Compile and export the full graph app
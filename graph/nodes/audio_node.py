@@ -1,9 +1,26 @@
 # graph/nodes/audio_node.py
 
-from tools.audio.generate import split_text_for_audio, generate_audio_for_text_chunks
+from tools.audio.generate import AUDIO_URL_BASE, split_text_for_audio_spans, synthesize_chunks
+from typing import List, Optional, Tuple
 import os
 
-def audio_node(state: dict) -> dict:
+def insert_audio_markers(lesson_text: str, spans: List[Tuple[int, int]], paths: List[Optional[str]]) -> str:
+    """
+    Splices an [AUDIO:filename.mp3] marker after each span that has audio,
+    in one left-to-right pass. Spans must be sorted and non-overlapping.
+    """
+    parts = []
+    last = 0
+    for (start, end), path in zip(spans, paths):
+        if path is None:
+            continue
+        parts.append(lesson_text[last:end])
+        parts.append(f"\n\n[AUDIO:{os.path.basename(path)}]")
+        last = end
+    parts.append(lesson_text[last:])
+    return "".join(parts)
+
+async def audio_node(state: dict) -> dict:
     """
     Generates audio narration based on modified lesson and rules.
     Adds audio paths and inline placeholders to the lesson.
@@ -16,14 +33,12 @@ def audio_node(state: dict) -> dict:
         state.update({"audio_paths" : []})
         return state
 
-    chunks = split_text_for_audio(lesson_text)
-    audio_results = generate_audio_for_text_chunks(chunks)
-
-    # Insert [AUDIO:filename.mp3] markers inline
-    for path, text in audio_results:
-        filename = os.path.basename(path)
-        lesson_text = lesson_text.replace(text, f"{text}\n\n[AUDIO:{filename}]")
+    # Paragraph spans, synthesized concurrently, markers spliced at their positions
+    spans = split_text_for_audio_spans(lesson_text)
+    paths = await synthesize_chunks([lesson_text[start:end] for start, end in spans])
+    lesson_text = insert_audio_markers(lesson_text, spans, paths)
 
     # Update state
-    state.update({"modified_lesson_text" : lesson_text, "audio_paths" : [path for path, _ in audio_results]})
-    return state
\ No newline at end of file
+    audio_paths = [f"{AUDIO_URL_BASE}/{os.path.basename(path)}" for path in paths if path is not None]
+    state.update({"modified_lesson_text" : lesson_text, "audio_paths" : audio_paths})
+    return state
@@ -1,19 +1,26 @@
 # graph/nodes/download_lesson_node.py
 
-from utils.file_utils import download_file
+import asyncio
+from utils.file_utils import blob_sha256, download_file
 from utils.file_parser import extract_text_from_file
 
-def download_lesson_node(state: dict) -> dict:
+async def download_lesson_node(state: dict) -> dict:
     """
     Downloads the lesson file from URL and extracts its text content.
+    Both steps block (network / parsing), so they run in a worker thread.
+    Downloads are content-addressed, so the extraction cache key comes from
+    the stored path instead of hashing the file again.
     """
     lesson_url = state.get("lesson_url")
     if not lesson_url:
         raise ValueError("Missing lesson_url in state.")
 
     # ✅ Cast to string to avoid decode error
-    file_path = download_file(str(lesson_url))
-    lesson_content = extract_text_from_file(file_path)
+    file_path = await asyncio.to_thread(download_file, str(lesson_url))
+    lesson_content = await asyncio.to_thread(
+        extract_text_from_file, file_path,
+        content_hash=blob_sha256(file_path), use_cache=state.get("use_cache", True)
+    )
 
     state.update({
         "lesson_file_path": file_path,
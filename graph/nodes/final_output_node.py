@@ -1,6 +1,7 @@
+import asyncio
 from tools.output.generate import generate_final_output
 
-def final_output_node(state: dict) -> dict:
+async def final_output_node(state: dict) -> dict:
     """
     Creates the final output files (.txt, .json, .md) with just placeholders.
     No audio/image assets are resolved – the output remains editable for user.
@@ -10,7 +11,7 @@ def final_output_node(state: dict) -> dict:
     if not lesson_text:
         raise ValueError("Missing modified_lesson_text in state.")
 
-    result = generate_final_output(lesson_text)
+    result = await asyncio.to_thread(generate_final_output, lesson_text)
 
     state.update({
         "final_output_path": result["txt_path"],
@@ -1,24 +1,25 @@
 # graph/nodes/generate_node.py
 
 from graph.schema import State
-from tools.llm.generate_sections import generate_all_sections
+from tools.llm.generate_sections import generate_teacher_sections
 
-def generate_node(state: State) -> State:
+async def generate_node(state: State) -> dict:
+    """
+    Generates the teacher-facing sections. Student sections and slides
+    both fan out from here once these are available.
+    """
     if not state.student_profile:
         raise ValueError("Missing student profile.")
     if not state.lesson_content:
         raise ValueError("Missing lesson content.")
 
-    lesson_objective = state.lesson_objective
-    language_objective = state.language_objective
-    target_language = state.target_language
-
-    sections = generate_all_sections(
+    teacher_sections = await generate_teacher_sections(
         student_profile=state.student_profile,
         lesson_content=state.lesson_content,
-        lesson_objective=lesson_objective,
-        language_objective=language_objective,
-        target_language=target_language
+        lesson_objective=state.lesson_objective,
+        language_objective=state.language_objective,
+        target_language=state.target_language,
+        use_cache=state.use_cache
     )
 
-    return state.update({"sections": sections})
+    return {"sections": teacher_sections}
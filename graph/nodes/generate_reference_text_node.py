@@ -1,11 +1,12 @@
+import asyncio
 from tools.output.save_source_material import save_source_material_doc
 from graph.schema import State
 
 
-def generate_reference_text_node(state: State) -> State:
+async def generate_reference_text_node(state: State) -> dict:
     """
     Generates a formatted Word document containing the processed lesson paragraphs.
-    Saves the document and updates the state with its path.
+    Saves the document and returns its path; only needs processed_paragraphs.
     """
-    source_path = save_source_material_doc(state.get("processed_paragraphs", []))
-    return state.update({"source_material_path": source_path})
\ No newline at end of file
+    source_path = await asyncio.to_thread(save_source_material_doc, state.get("processed_paragraphs", []))
+    return {"source_material_path": source_path}
\ No newline at end of file
@@ -0,0 +1,24 @@
+# graph/nodes/generate_student_node.py
+
+from graph.schema import State
+from tools.llm.generate_sections import generate_student_sections
+
+async def generate_student_node(state: State) -> dict:
+    """
+    Generates the student-facing sections from the teacher sections.
+    Runs in parallel with generate_pptx_node.
+    """
+    if not state.sections:
+        raise ValueError("Missing teacher sections. Did generate_node run correctly?")
+
+    student_sections = await generate_student_sections(
+        student_profile=state.student_profile,
+        lesson_content=state.lesson_content,
+        lesson_objective=state.lesson_objective,
+        language_objective=state.language_objective,
+        target_language=state.target_language,
+        teacher_sections=state.sections,
+        use_cache=state.use_cache
+    )
+
+    return {"sections": student_sections}
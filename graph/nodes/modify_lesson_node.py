@@ -1,25 +1,206 @@
 # graph/nodes/modify_lesson_node.py
 
+import os
+import re
+import asyncio
+from bisect import bisect_left, bisect_right
+from typing import Callable, Optional
+from langgraph.config import get_stream_writer
 from tools.llm.modify import modify_lesson_content, modify_lesson_content_worksheet
+from utils.tokens import count_tokens
+
+MODIFY_MAX_CONCURRENCY = int(os.getenv("MODIFY_MAX_CONCURRENCY", "4"))  # day chunks adapted at once
+MODIFY_MAX_ATTEMPTS = int(os.getenv("MODIFY_MAX_ATTEMPTS", "3"))
+MODIFY_RETRY_DELAY = 1.0  # seconds, doubled after each failed round
+
+HEADING_PATTERN = re.compile(r"^(#{1,6}\s|(day|lesson|chapter|part|section|unit|week)\s*\d+\b)", re.IGNORECASE)
+HEADING_MAX_WORDS = 8
+SOFT_SPLIT_TOLERANCE = 1.1  # accept up to 10% imbalance to split at a heading instead
+
+def is_heading(paragraph: str) -> bool:
+    """Markdown headings, 'Day 2' / 'Chapter 3' style labels, or short lines without sentence punctuation."""
+    if HEADING_PATTERN.match(paragraph):
+        return True
+    return len(paragraph.split()) <= HEADING_MAX_WORDS and not paragraph.rstrip().endswith((".", "?", "!", ",", ";", '"', "”"))
+
+def _group_blocks(paragraphs: list) -> tuple:
+    """
+    Glues each heading to the paragraph after it so a split never strands a heading.
+    Returns (blocks, starts_at_heading) where each block is a list of paragraphs.
+    """
+    blocks, starts_at_heading = [], []
+    carry = []
+    for para in paragraphs:
+        if is_heading(para):
+            carry.append(para)
+            continue
+        blocks.append(carry + [para])
+        starts_at_heading.append(bool(carry))
+        carry = []
+    if carry:  # trailing headings with no body
+        if blocks:
+            blocks[-1].extend(carry)
+        else:
+            blocks.append(carry)
+            starts_at_heading.append(True)
+    return blocks, starts_at_heading
+
+def _greedy_groups(weights: list, cap: float) -> int:
+    """Number of groups a left-to-right fill needs when no group may exceed cap."""
+    groups, current = 1, 0
+    for w in weights:
+        if current + w > cap:
+            groups += 1
+            current = 0
+        current += w
+    return groups
+
+def _partition(weights: list, soft: list, n: int) -> list:
+    """
+    Splits weights into n contiguous, non-empty groups (len(weights) > n).
+    A binary search finds the smallest achievable max group weight. Then each
+    group ends as near as possible to an even share of the remaining weight,
+    staying within SOFT_SPLIT_TOLERANCE of that max and preferring to end
+    right before a heading. Returns (start, end) index pairs.
+    """
+    size = len(weights)
+    prefix = [0]
+    for w in weights:
+        prefix.append(prefix[-1] + w)
+
+    # Smallest max group weight a greedy fill can achieve with n groups
+    low, high = max(weights), prefix[size]
+    while low < high:
+        mid = (low + high) // 2
+        if _greedy_groups(weights, mid) <= n:
+            high = mid
+        else:
+            low = mid + 1
+    cap = low * SOFT_SPLIT_TOLERANCE
+
+    # reach[i]: furthest end of a group starting at i; needed[i]: fewest groups for weights[i:]
+    reach = [size] * (size + 1)
+    j = 0
+    for i in range(size):
+        j = max(j, i + 1)
+        while j < size and prefix[j + 1] - prefix[i] <= cap:
+            j += 1
+        reach[i] = j
+    needed = [0] * (size + 1)
+    for i in range(size - 1, -1, -1):
+        needed[i] = 1 + needed[reach[i]]
+
+    # needed is non-increasing, so the ends leaving room for r groups form a suffix
+    first_end = [size] * (n + 1)  # first_end[r]: smallest j with needed[j] <= r
+    for j in range(size, -1, -1):
+        if needed[j] <= n:
+            first_end[needed[j]] = j
+    for r in range(1, n + 1):
+        first_end[r] = min(first_end[r], first_end[r - 1])
+
+    headings = [j for j in range(1, size) if not soft[j]]  # boundaries that start at a heading
+    bounds, i = [], 0
+    for remaining in range(n, 0, -1):
+        lo = max(first_end[remaining - 1], i + 1)
+        hi = min(reach[i], size - (remaining - 1))
+        target = prefix[i] + (prefix[size] - prefix[i]) / remaining
+
+        def distance(j):
+            return abs(prefix[j] - target)
+
+        h_lo, h_hi = bisect_left(headings, lo), bisect_right(headings, hi)
+        if h_lo < h_hi:
+            k = bisect_left(headings, bisect_left(prefix, target), h_lo, h_hi)
+            end = min(headings[max(k - 1, h_lo):min(k + 1, h_hi)], key=distance)
+        else:
+            t = min(max(bisect_left(prefix, target), lo), hi)
+            end = min({max(t - 1, lo), t}, key=distance)
+        bounds.append((i, end))
+        i = end
+    return bounds
 
 def split_text_into_chunks(text: str, n: int) -> list:
     """
-    Splits text into n chunks by paragraph, keeping boundaries clean.
+    Splits text into n day chunks balanced by estimated token count, keeping
+    paragraph boundaries clean, never separating a heading from its content,
+    and preferring to start a day at a heading.
     """
     paragraphs = [p.strip() for p in text.split("\n") if p.strip()]
-    total = len(paragraphs)
-    chunk_size = total // n
-    remainder = total % n
+    blocks, starts_at_heading = _group_blocks(paragraphs)
+    texts = ["\n\n".join(block) for block in blocks]
+
+    if len(texts) <= n:
+        # Not enough material to give every day a block; pad with empty days
+        return texts + [""] * (n - len(texts))
+
+    weights = [count_tokens(t) for t in texts]
+    soft = [not heading for heading in starts_at_heading]
+    return ["\n\n".join(texts[i:j]) for i, j in _partition(weights, soft, n)]
+
+def chunk_token_counts(chunks: list) -> list:
+    return [count_tokens(chunk) for chunk in chunks]
+
+async def adapt_day_chunks(chunks: list, rules: list, use_cache: bool = True,
+                           max_concurrency: int = MODIFY_MAX_CONCURRENCY,
+                           max_attempts: int = MODIFY_MAX_ATTEMPTS,
+                           emit: Optional[Callable[[dict], None]] = None) -> list:
+    """
+    Adapts all day chunks concurrently (at most `max_concurrency` LLM calls at once)
+    and returns the results in day order. Failed days are retried on their own,
+    successful days are never re-run.
+    If `emit` is given, it receives day_start / day_delta / day_end / day_retry
+    events so callers can stream each day as it is written.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    results = [None] * len(chunks)
+    errors = {}
+
+    async def adapt(day_idx: int) -> str:
+        async with semaphore:
+            if emit is None:
+                return await modify_lesson_content(chunks[day_idx], rules, use_cache=use_cache)
+
+            day = day_idx + 1
+            emit({"event": "day_start", "day": day, "header": f"### Day {day}\n\n"})
+            modified = await modify_lesson_content(
+                chunks[day_idx], rules, use_cache=use_cache,
+                on_delta=lambda text: emit({"event": "day_delta", "day": day, "text": text})
+            )
+            emit({"event": "day_end", "day": day, "content": f"### Day {day}\n\n{modified.strip()}"})
+            return modified
+
+    pending = list(range(len(chunks)))
+    delay = MODIFY_RETRY_DELAY
+    for attempt in range(1, max_attempts + 1):
+        outcomes = await asyncio.gather(*(adapt(i) for i in pending), return_exceptions=True)
+
+        failed = []
+        for day_idx, outcome in zip(pending, outcomes):
+            if isinstance(outcome, asyncio.CancelledError):
+                raise outcome  # a cancelled day is not a failure to retry
+            if isinstance(outcome, BaseException):
+                errors[day_idx] = outcome
+                failed.append(day_idx)
+            else:
+                results[day_idx] = outcome
+
+        if not failed:
+            return results
+
+        days = ", ".join(str(i + 1) for i in failed)
+        print(f"[ModifyLesson] Attempt {attempt}/{max_attempts} failed for day(s) {days}")
+        if emit is not None:
+            for day_idx in failed:
+                emit({"event": "day_retry", "day": day_idx + 1, "attempt": attempt, "error": str(errors[day_idx])})
+        pending = failed
+        if attempt < max_attempts:
+            await asyncio.sleep(delay)
+            delay *= 2
 
-    chunks = []
-    start = 0
-    for i in range(n):
-        end = start + chunk_size + (1 if i < remainder else 0)
-        chunks.append("\n\n".join(paragraphs[start:end]))
-        start = end
-    return chunks
+    details = "; ".join(f"Day {i + 1}: {errors[i]}" for i in pending)
+    raise RuntimeError(f"Adaptation failed after {max_attempts} attempts — {details}")
 
-def modify_lesson_node(state: dict) -> dict:
+async def modify_lesson_node(state: dict) -> dict:
     """
     Applies adaptation rules to the lesson content using GPT-4o.
     Splits content by number of days only for 'Lesson' category.
@@ -30,31 +211,48 @@ def modify_lesson_node(state: dict) -> dict:
     lesson_content = state.get("lesson_content")
     file_category = state.get("file_category", "Lesson")
     number_of_days = state.get("number_of_days", 1)
+    use_cache = state.get("use_cache", True)
 
     if not rules:
         raise ValueError("Missing 'rules' in state.")
     if not lesson_content:
         raise ValueError("Missing 'lesson_content' in state.")
 
+    day_token_counts = None
+    # Only the SSE endpoint consumes day events; everywhere else the LLM calls
+    # are plain (non-streaming) completions
+    emit = get_stream_writer() if state.get("stream_deltas") else None
     try:
         if file_category.lower() == "worksheet":
             # No chunking — apply full worksheet adaptation
-            modified = modify_lesson_content_worksheet(lesson_content, rules)
+            if emit is None:
+                modified = await modify_lesson_content_worksheet(lesson_content, rules, use_cache=use_cache)
+            else:
+                emit({"event": "day_start", "day": 1, "header": ""})
+                modified = await modify_lesson_content_worksheet(
+                    lesson_content, rules, use_cache=use_cache,
+                    on_delta=lambda text: emit({"event": "day_delta", "day": 1, "text": text})
+                )
+                emit({"event": "day_end", "day": 1, "content": modified.strip()})
             final_text = modified.strip()
 
         else:
-            # For 'Lesson', split into N days and adapt each
-            chunks = split_text_into_chunks(lesson_content, number_of_days)
-            modified_sections = []
+            # For 'Lesson', split into N days and adapt them concurrently
+            # Tokenizing and partitioning is CPU work; keep it off the event loop
+            chunks = await asyncio.to_thread(split_text_into_chunks, lesson_content, number_of_days)
+            day_token_counts = await asyncio.to_thread(chunk_token_counts, chunks)
+            print(f"[ModifyLesson] Day chunk sizes (tokens): {day_token_counts}")
+            modified_days = await adapt_day_chunks(chunks, rules, use_cache=use_cache, emit=emit)
 
-            for i, chunk in enumerate(chunks):
-                modified = modify_lesson_content(chunk, rules)
-                modified_sections.append(f"### Day {i + 1}\n\n{modified.strip()}")
+            modified_sections = [
+                f"### Day {i + 1}\n\n{modified.strip()}"
+                for i, modified in enumerate(modified_days)
+            ]
 
             final_text = "\n\n".join(modified_sections)
 
     except Exception as e:
         raise RuntimeError(f"Failed to modify lesson: {str(e)}")
 
-    state.update({"modified_lesson_text": final_text})
+    state.update({"modified_lesson_text": final_text, "day_token_counts": day_token_counts})
     return state
\ No newline at end of file
@@ -2,7 +2,7 @@
 
 from agents.rule_agent import generate_cleaned_rules
 
-def rule_node(state: dict) -> dict:
+async def rule_node(state: dict) -> dict:
     """
     LangGraph node to extract and filter adaptation rules based on student profile.
     Adds 'rules' to the state for downstream nodes.
@@ -11,7 +11,7 @@ def rule_node(state: dict) -> dict:
     if not profile:
         raise ValueError("Missing 'student_profile' in state.")
     
-    cleaned_rules = generate_cleaned_rules(profile)
+    cleaned_rules = await generate_cleaned_rules(profile, use_cache=state.get("use_cache", True))
     state.update({"rules" : cleaned_rules})
 
     return state
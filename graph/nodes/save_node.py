@@ -1,13 +1,23 @@
 # graph/nodes/save_node.py
 
+import asyncio
 from graph.schema import State
 from docx import Document
+from docx.opc.oxml import serialize_part_xml
 from docx.shared import Pt
+from docx.table import _Cell
+from docx.text.paragraph import Paragraph
+import io
 import os
+import copy
 import uuid
+import threading
+from utils.artifact_store import put_artifact
+from utils.zip_utils import ZipTemplate
 
 TEMPLATE_PATH = "templates/lesson_template.docx"
-OUTPUT_DIR = "data/outputs/word"
+DOCUMENT_PART = "word/document.xml"
+ARTIFACT_KIND = "word"
 
 # Mapping for the activity table
 ACTIVITY_TABLE_MAPPING = {
@@ -29,28 +39,25 @@ def insert_into_cell(cell, content: str):
     run.font.name = "Poppins"
     run.font.size = Pt(11)
 
-def save_node(state: State) -> State:
-    print("📝 Filling lesson template...")
-
-    sections = state.get("sections")
-    if not sections:
-        raise ValueError("No 'sections' data found in state. Did generate_node run correctly?")
-
-    doc = Document(TEMPLATE_PATH)
-
-    # Replace Title (first paragraph)
-    if doc.paragraphs:
-        title_paragraph = doc.paragraphs[0]
-        title_paragraph.text = "Lesson Plan"
-        if title_paragraph.runs:
-            run = title_paragraph.runs[0]
-        else:
-            run = title_paragraph.add_run()
-        run.font.name = "Poppins"
-        run.font.size = Pt(24)
-        run.bold = True
-
-    for table in doc.tables:
+# -----------------------------
+# Template cache: parsed once, reloaded when the file changes
+# -----------------------------
+_template = {"mtime": None, "zip": None, "document": None, "targets": None}
+_template_lock = threading.Lock()
+
+def _cell_position(cell) -> tuple:
+    """(row, cell) index of a cell's <w:tc> in its table XML; merged cells resolve to their origin."""
+    tc = cell._tc
+    tr = tc.getparent()
+    return tr.getparent().tr_lst.index(tr), tr.tc_lst.index(tc)
+
+def build_cell_targets(doc) -> list:
+    """
+    Every cell fill_lesson_template writes, in fill order:
+    (table index, row, cell, section key, text prefix, join lists as bullets).
+    """
+    targets = []
+    for table_idx, table in enumerate(doc.tables):
         rows = table.rows
         if len(rows) < 2:
             continue
@@ -63,44 +70,84 @@ def save_node(state: State) -> State:
                 purpose_cell = rows[5].cells[0]
                 language_cell = rows[2].cells[1]
 
-                # Fill standards
-                if "standards" in sections:
-                    insert_into_cell(standards_cell, sections["standards"])
-
-                # Fill content (look for "CONTENT:" block)
-                if "content" in sections and "CONTENT:" in content_cell.text:
-                    insert_into_cell(content_cell, f"Content Goal: {sections['content']}")
-
-                # Fill language (look for "LANGUAGE:" block)
-                if "language" in sections:
-                    insert_into_cell(language_cell, f"Language Goal: {sections['language']}")
-
-                # Fill purpose
-                if "purpose" in sections:
-                    insert_into_cell(purpose_cell, sections["purpose"])
+                cells = [(standards_cell, "standards", "")]
+                if "CONTENT:" in content_cell.text:  # only the "CONTENT:" block is replaced
+                    cells.append((content_cell, "content", "Content Goal: "))
+                cells += [(language_cell, "language", "Language Goal: "), (purpose_cell, "purpose", "")]
+                targets += [(table_idx, *_cell_position(cell), key, prefix, False) for cell, key, prefix in cells]
             except Exception as e:
-                print("⚠️ Could not fill Standards table:", str(e))
+                print("⚠️ Could not map Standards table:", str(e))
             continue
 
         # Handle activity table (student/teacher activities)
         header_cells = [cell.text.strip() for cell in rows[0].cells]
         for row in rows[1:]:
-            row_label = row.cells[0].text.strip()
+            row_cells = row.cells
+            row_label = row_cells[0].text.strip()
             for col_idx, col_text in enumerate(header_cells[1:], start=1):
-                key = (row_label, col_text.strip())
-                if key in ACTIVITY_TABLE_MAPPING:
-                    section_key = ACTIVITY_TABLE_MAPPING[key]
-                    if section_key in sections:
-                        content = sections[section_key]
-                        if isinstance(content, list):
-                            content = "\n".join(f"• {item}" for item in content)
-                        insert_into_cell(row.cells[col_idx], content)
-
-    # Save filled document
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    filename = f"lesson_plan_filled_{uuid.uuid4().hex}.docx"
-    output_path = os.path.join(OUTPUT_DIR, filename)
-    doc.save(output_path)
+                section_key = ACTIVITY_TABLE_MAPPING.get((row_label, col_text.strip()))
+                if section_key:
+                    targets.append((table_idx, *_cell_position(row_cells[col_idx]), section_key, "", True))
+    return targets
+
+def load_lesson_template() -> dict:
+    """Template bytes, its parsed document XML and cell targets; re-read only when the file changes."""
+    mtime = os.stat(TEMPLATE_PATH).st_mtime_ns
+    with _template_lock:
+        if _template["mtime"] != mtime:
+            with open(TEMPLATE_PATH, "rb") as f:
+                data = f.read()
+            doc = Document(io.BytesIO(data))
+            _template.update(mtime=mtime, zip=ZipTemplate(data), document=doc.element,
+                             targets=build_cell_targets(doc))
+            print(f"[Template] Loaded {TEMPLATE_PATH}: {len(_template['targets'])} target cells")
+        return dict(_template)
+
+def render_lesson_plan(sections: dict) -> bytes:
+    """Fill the lesson plan template with the generated sections; returns the .docx bytes. Blocking."""
+    template = load_lesson_template()
+    with _template_lock:
+        document = copy.deepcopy(template["document"])
+    body = document.body
+
+    # Replace Title (first paragraph)
+    if body.p_lst:
+        title_paragraph = Paragraph(body.p_lst[0], None)
+        title_paragraph.text = "Lesson Plan"
+        if title_paragraph.runs:
+            run = title_paragraph.runs[0]
+        else:
+            run = title_paragraph.add_run()
+        run.font.name = "Poppins"
+        run.font.size = Pt(24)
+        run.bold = True
+
+    tables = body.tbl_lst
+    for table_idx, row_idx, cell_idx, section_key, prefix, bullets in template["targets"]:
+        if section_key not in sections:
+            continue
+        content = sections[section_key]
+        if bullets and isinstance(content, list):
+            content = "\n".join(f"• {item}" for item in content)
+        insert_into_cell(_Cell(tables[table_idx].tr_lst[row_idx].tc_lst[cell_idx], None), f"{prefix}{content}")
+
+    # Only word/document.xml changed; every other part is copied from the template as stored
+    return template["zip"].replace({DOCUMENT_PART: serialize_part_xml(document)})
+
+def fill_lesson_template(sections: dict) -> str:
+    """Renders the lesson plan and stores it; returns the artifact key. Blocking."""
+    output_path = put_artifact(ARTIFACT_KIND, f"lesson_plan_filled_{uuid.uuid4().hex}.docx", render_lesson_plan(sections))
 
     print(f"✅ Lesson plan saved at: {output_path}")
-    return state.update({"final_output_docx": output_path})
\ No newline at end of file
+    return output_path
+
+async def save_node(state: State) -> dict:
+    print("📝 Filling lesson template...")
+
+    sections = state.get("sections")
+    if not sections:
+        raise ValueError("No 'sections' data found in state. Did generate_node run correctly?")
+
+    # python-docx work is CPU/disk bound, keep it off the event loop
+    output_path = await asyncio.to_thread(fill_lesson_template, sections)
+    return {"final_output_docx": output_path}
\ No newline at end of file
@@ -1,11 +1,12 @@
-from tools.visuals.fetch import get_image_urls_from_serpapi, download_images
-from openai import OpenAI
+from tools.visuals.fetch import search_image_urls, download_images
+from openai import AsyncOpenAI
 import os, ast, re
+import asyncio
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY)
+client = AsyncOpenAI(api_key=OPENAI_API_KEY)
 
-def extract_image_queries(text: str, rules: list) -> list:
+async def extract_image_queries(text: str, rules: list) -> list:
     """
     Use LLM to suggest what image topics should be added to the lesson.
     """
@@ -27,7 +28,7 @@ Extract 3–5 short and searchable visual topics that would help illustrate this
 
 Visual Suggestions:
 """
-    response = client.chat.completions.create(
+    response = await client.chat.completions.create(
         model="gpt-4o",
         messages=[{"role": "user", "content": prompt}],
         temperature=0.5,
@@ -57,7 +58,7 @@ Visual Suggestions:
         print("[VisualNode] Failed to eval raw:", raw, "Error:", e)
         return []
 
-def visual_node(state: dict) -> dict:
+async def visual_node(state: dict) -> dict:
     text = state.get("modified_lesson_text", "")
     rules = state.get("rules", [])
 
@@ -66,12 +67,12 @@ def visual_node(state: dict) -> dict:
         return state
 
     # 1. Extract image queries from lesson
-    queries = extract_image_queries(text, rules)
+    queries = await extract_image_queries(text, rules)
 
     # 2. Clean and download images for each query
     image_urls = []
-    for query in queries:
-        urls = get_image_urls_from_serpapi(query, count=1)
+    results = await asyncio.gather(*(search_image_urls(query, 1) for query in queries))
+    for query, urls in zip(queries, results):
         if not urls:
             print(f"[VisualNode] No images found for query: {query}")
             continue
@@ -82,7 +83,7 @@ def visual_node(state: dict) -> dict:
         state.update({"image_paths": []})  # ✅ fix
         return state
 
-    image_paths = download_images(image_urls)
+    image_paths = await download_images(image_urls)
 
     # 3. Replace placeholders using a COPY of image_paths
     image_paths_copy = image_paths.copy()
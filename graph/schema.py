@@ -1,7 +1,17 @@
 # schema.py
 
 from pydantic import BaseModel, HttpUrl
-from typing import List, Dict, Union, Optional
+from typing import Annotated, List, Dict, Union, Optional
+
+
+def merge_dicts(left: Optional[Dict[str, str]], right: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+    """
+    Reducer for dict-valued state keys written by parallel branches.
+    Later writes win per key; None leaves the existing value untouched.
+    """
+    if right is None:
+        return left
+    return {**(left or {}), **right}
 
 class State(BaseModel):
     """
@@ -14,16 +24,20 @@ class State(BaseModel):
     lesson_file_path: Optional[str] = None
     lesson_content: Optional[str] = None
     modified_lesson_text: Optional[str] = None
+    day_token_counts: Optional[List[int]] = None  # estimated tokens per day chunk sent to the LLM
     audio_paths: Optional[List[str]] = None
     image_paths: Optional[List[str]] = None
 
     file_category: Optional[str] = "Lesson"   # e.g., "Lesson" or "Worksheet"
     number_of_days: Optional[int] = 1 
+    use_cache: Optional[bool] = True          # False bypasses the LLM response cache for this run
+    stream_deltas: Optional[bool] = False     # True when the caller consumes day_delta events (SSE)
 
-    final_output_path: Optional[str] = None   # path to final .txt file
-    final_output_json: Optional[str] = None  # path to final .json file for structured display
-    final_output_md: Optional[str] = None    # ✅ path to final .md file
-    source_material_path: Optional[str] = None  # 📘 New: path to reference material DOCX
+    # Output files are artifact keys (utils/artifact_store.py), e.g. "markdown/3f/final_lesson_<id>.md"
+    final_output_path: Optional[str] = None   # key of final .txt file
+    final_output_json: Optional[str] = None  # key of final .json file for structured display
+    final_output_md: Optional[str] = None    # ✅ key of final .md file
+    source_material_path: Optional[str] = None  # 📘 New: key of reference material DOCX
 
     # 📘 New DOCX Flow Additions
     lesson_objective: Optional[str] = None
@@ -32,7 +46,7 @@ class State(BaseModel):
     generated_sections: Optional[Dict[str, str]] = None  # from LLM
     final_output_docx: Optional[str] = None
     final_output_pptx: Optional[str] = None
-    sections: Optional[Dict[str, str]] = None
+    sections: Annotated[Optional[Dict[str, str]], merge_dicts] = None  # teacher + student branches merge here
     student_worksheet_path: Optional[str] = None
     slide_data: Optional[List[Dict[str, str]]] = None
     processed_paragraphs: Optional[List[str]] = None
@@ -0,0 +1,40 @@
+# graph/streaming.py
+
+import time
+from typing import AsyncIterator
+
+async def stream_pipeline_events(app, inputs: dict) -> AsyncIterator[dict]:
+    """
+    Runs a compiled graph and yields progress events as plain dicts:
+      - {"event": "node_start", "node": ...}
+      - {"event": "node_end", "node": ..., "duration_ms": ..., "error": ...}
+      - custom events written by nodes via get_stream_writer() (e.g. day_delta)
+      - {"event": "result", "state": <final state>} once the graph finishes
+    """
+    started = {}
+    final_state = None
+
+    async for mode, chunk in app.astream(inputs, stream_mode=["debug", "custom", "values"]):
+        if mode == "custom":
+            yield chunk
+
+        elif mode == "debug":
+            payload = chunk.get("payload", {})
+            task_id, node = payload.get("id"), payload.get("name")
+            if chunk.get("type") == "task":
+                started[task_id] = time.perf_counter()
+                yield {"event": "node_start", "node": node}
+            elif chunk.get("type") == "task_result":
+                elapsed = time.perf_counter() - started.pop(task_id, time.perf_counter())
+                error = payload.get("error")
+                yield {
+                    "event": "node_end",
+                    "node": node,
+                    "duration_ms": round(elapsed * 1000),
+                    "error": str(error) if error else None
+                }
+
+        elif mode == "values":
+            final_state = chunk
+
+    yield {"event": "result", "state": final_state}
@@ -3,21 +3,70 @@
 from requests import request
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, HttpUrl
-from typing import Dict, List, Union, Optional
+from typing import Any, Dict, List, Union, Optional
 import os
+import json
 import uuid
-import shutil
+import mimetypes
+import asyncio
+import aiofiles
 
-from tools.audio.generate import generate_audio_file
-from tools.visuals.fetch import get_image_urls_from_serpapi, download_images
+from tools.audio.generate import synthesize_long, stream_audio, audio_stats, audio_key, audio_path_for, audio_url_for
+from tools.visuals.fetch import search_images_async, commit_image, aclose_http_client
+from tools.llm.cache import cache_stats
+from tools.llm.prompts import load_all_prompts, prompt_versions
 from graph.lesson_docx_graph import lesson_docx_app  # LangGraph pipeline
 from graph.lesson_placeholder_graph import lesson_placeholders_app
+from graph.nodes.save_node import load_lesson_template, render_lesson_plan
+from tools.output.generate_pptx import render_slide_deck
+from tools.output.generate_worksheet import render_student_worksheet_doc
+from tools.output.save_source_material import render_source_material_doc
+from graph.streaming import stream_pipeline_events
+from utils.job_queue import JobWorkerPool, submit_job, get_job
+from utils.artifact_store import (
+    ARTIFACT_BACKEND, ARTIFACT_ROOT, artifact_relpath, artifact_stats, artifact_url, get_artifact, memory_artifact, open_artifact, run_gc_forever,
+    touch_artifact
+)
+from contextlib import asynccontextmanager
+from starlette.concurrency import iterate_in_threadpool
+from starlette.datastructures import Headers
+from utils.static_files import CachedStaticFiles, IMMUTABLE_CACHE_CONTROL, bytes_response
+
+# State keys kept as a job's result (enough to rebuild the public URLs)
+JOB_RESULT_KEYS = [
+    "rules", "final_output_docx", "final_output_pptx", "student_worksheet_path", "source_material_path",
+    "final_output_md", "final_output_json", "final_output_path"
+]
+
+def job_runner(graph_app):
+    async def run(inputs: dict):
+        async for event in stream_pipeline_events(graph_app, inputs):
+            if event["event"] == "result":
+                state = event["state"] or {}
+                event = {"event": "result", "state": {k: state.get(k) for k in JOB_RESULT_KEYS}}
+            yield event
+    return run
+
+job_pool = JobWorkerPool({
+    "generate_lesson_docx": job_runner(lesson_docx_app),
+    "full_pipeline": job_runner(lesson_placeholders_app),
+})
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    load_all_prompts()  # fail fast on a broken template
+    await asyncio.to_thread(load_lesson_template)  # parse the lesson plan .docx once
+    job_pool.start()
+    gc_task = asyncio.create_task(run_gc_forever())
+    yield
+    gc_task.cancel()
+    await job_pool.stop()
+    await aclose_http_client()
 
 # === Initialize FastAPI App ===
-app = FastAPI(title="Lesson Modifier API - Placeholder Based")
+app = FastAPI(title="Lesson Modifier API - Placeholder Based", lifespan=lifespan)
 
 # === CORS Configuration ===
 app.add_middleware(
@@ -35,15 +84,25 @@ class LessonDocxRequest(BaseModel):
     language_objective: Dict[str, str]
     target_language: str
     lesson_url: HttpUrl
+    use_cache: Optional[bool] = True     # False forces fresh LLM calls
 
 class FullPipelineRequest(BaseModel):
     student_profile: Dict[str, Union[str, List[str]]]
     lesson_url: HttpUrl
     file_category: Optional[str] = "Lesson"        # e.g., "Lesson" or "Worksheet"
     number_of_days: Optional[int] = 1    
+    use_cache: Optional[bool] = True
+
+class CommitImageRequest(BaseModel):
+    result_id: str  # "id" of a result from GET /api/search_images
+
+class RenderRequest(BaseModel):
+    data: Union[List[Any], Dict[str, Any]]  # slides / sections / paragraphs, as the renderer expects
 
 class GenerateAudioRequest(BaseModel):
     prompt: str
+    early: bool = False  # respond once the first sentence segment is ready
+    stream: bool = False  # send the mp3 bytes as they are synthesized
 
 
 # === Root Health Route ===
@@ -55,89 +114,297 @@ def root():
 def health_check():
     return {"status": "ok"}
 
+@app.get("/api/llm_cache_stats")
+async def llm_cache_stats():
+    return await asyncio.to_thread(cache_stats)
+
+@app.get("/api/audio_stats")
+async def get_audio_stats():
+    return audio_stats()
+
+@app.get("/api/prompt_versions")
+async def get_prompt_versions():
+    return prompt_versions()
+
+@app.get("/api/artifact_stats")
+async def get_artifact_stats():
+    return await asyncio.to_thread(artifact_stats)
+
 # === Lesson DOCX Generation Endpoint ===
 @app.post("/generate_lesson_docx")
 async def generate_lesson_docx(request: Request, lesson_request: LessonDocxRequest):
     try:
-        # Run LangGraph pipeline
-        result = lesson_docx_app.invoke({
-            "student_profile": lesson_request.student_profile,
-            "lesson_objective": lesson_request.lesson_objective,
-            "language_objective": lesson_request.language_objective,
-            "target_language": lesson_request.target_language,
-            "lesson_url": str(lesson_request.lesson_url)
-        })
-
+        # Run LangGraph pipeline (async, so the worker keeps serving other requests)
+        result = await lesson_docx_app.ainvoke(lesson_docx_inputs(lesson_request))
         base_url = str(request.base_url).rstrip("/")
-
-        # Extract filenames from result
-        docx_file = os.path.basename(result.get("final_output_docx", ""))
-        pptx_file = os.path.basename(result.get("final_output_pptx", ""))
-        worksheet_file = os.path.basename(result.get("student_worksheet_path", ""))
-        reference_file = os.path.basename(result.get("source_material_path", ""))
-
-        # Build response with public URLs
-        response = {}
-        if docx_file:
-            response["lesson_plan_url"] = f"{base_url}/outputs/word/{docx_file}"
-        if pptx_file:
-            response["slide_deck_url"] = f"{base_url}/outputs/slides/{pptx_file}"
-        if worksheet_file:
-            response["worksheet_url"] = f"{base_url}/outputs/worksheets/{worksheet_file}"
-        if reference_file:
-            response["reference_material_url"] = f"{base_url}/outputs/source_materials/{reference_file}"
-
-        return response
+        return lesson_docx_response(result, base_url)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"DOCX pipeline failed: {str(e)}")
+
+
+def lesson_docx_inputs(lesson_request: LessonDocxRequest) -> dict:
+    return {
+        "student_profile": lesson_request.student_profile,
+        "lesson_objective": lesson_request.lesson_objective,
+        "language_objective": lesson_request.language_objective,
+        "target_language": lesson_request.target_language,
+        "lesson_url": str(lesson_request.lesson_url),
+        "use_cache": lesson_request.use_cache
+    }
+
+def lesson_docx_response(result, base_url: str) -> dict:
+    # Result values are artifact keys; build public URLs for the ones present
+    urls = {
+        "lesson_plan_url": artifact_url(result.get("final_output_docx"), base_url),
+        "slide_deck_url": artifact_url(result.get("final_output_pptx"), base_url),
+        "worksheet_url": artifact_url(result.get("student_worksheet_path"), base_url),
+        "reference_material_url": artifact_url(result.get("source_material_path"), base_url),
+    }
+    return {name: url for name, url in urls.items() if url}
     
 
 # ===== Full Pipeline: Placeholder only =====
 @app.post("/full-pipeline")
 async def full_pipeline(request: Request, lesson_request: FullPipelineRequest):
     try:
-        result = lesson_placeholders_app.invoke({
-            "student_profile": lesson_request.student_profile,
-            "lesson_url": str(lesson_request.lesson_url),
-            "number_of_days": lesson_request.number_of_days,
-            "file_category": str(lesson_request.file_category)
-        })
-
+        result = await lesson_placeholders_app.ainvoke(full_pipeline_inputs(lesson_request))
         base_url = str(request.base_url).rstrip("/")
-
-        md_file = os.path.basename(result["final_output_md"])
-        json_file = os.path.basename(result["final_output_json"])
-        txt_file = os.path.basename(result["final_output_path"])
-
-        return {
-            "rules": result.get("rules", []),
-            "final_output_md": f"{base_url}/outputs/markdown/{md_file}",
-            "final_output_json": f"{base_url}/outputs/json/{json_file}",
-            "final_output_path": f"{base_url}/outputs/files/{txt_file}",
-            "editor_url": f"{base_url}/editor/index.html?file={md_file}"
-        }
+        return full_pipeline_response(result, base_url)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Full pipeline failed: {str(e)}")
+
+
+def full_pipeline_inputs(lesson_request: FullPipelineRequest) -> dict:
+    return {
+        "student_profile": lesson_request.student_profile,
+        "lesson_url": str(lesson_request.lesson_url),
+        "number_of_days": lesson_request.number_of_days,
+        "file_category": str(lesson_request.file_category),
+        "use_cache": lesson_request.use_cache
+    }
+
+def full_pipeline_response(result, base_url: str) -> dict:
+    return {
+        "rules": result.get("rules", []),
+        "final_output_md": artifact_url(result["final_output_md"], base_url),
+        "final_output_json": artifact_url(result["final_output_json"], base_url),
+        "final_output_path": artifact_url(result["final_output_path"], base_url),
+        "editor_url": f"{base_url}/editor/index.html?file={artifact_relpath(result['final_output_md'])}"
+    }
+
+
+# ===== Full Pipeline: Server-Sent Events stream =====
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/full-pipeline/stream")
+async def full_pipeline_stream(request: Request, lesson_request: FullPipelineRequest):
+    """
+    Same pipeline as /full-pipeline, streamed as Server-Sent Events:
+    node_start / node_end for each graph node, day_start / day_delta / day_end
+    (and day_retry) while each day's markdown is generated, then a final
+    `result` event with the same payload /full-pipeline returns.
+    """
+    base_url = str(request.base_url).rstrip("/")
+
+    async def event_source():
+        try:
+            inputs = {**full_pipeline_inputs(lesson_request), "stream_deltas": True}
+            async for event in stream_pipeline_events(lesson_placeholders_app, inputs):
+                name = event.pop("event")
+                if name == "result":
+                    yield sse_event("result", full_pipeline_response(event["state"], base_url))
+                else:
+                    yield sse_event(name, event)
+        except Exception as e:
+            yield sse_event("error", {"detail": f"Full pipeline failed: {str(e)}"})
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
     
 
+# ===== Background Jobs =====
+# Submit returns a job id right away; poll GET /jobs/{id} or subscribe to
+# GET /jobs/{id}/events. Jobs live in SQLite and survive restarts.
+JOB_RESPONSE_BUILDERS = {
+    "generate_lesson_docx": lambda result, base_url: lesson_docx_response(result, base_url),
+    "full_pipeline": lambda result, base_url: full_pipeline_response(result, base_url),
+}
+
+def job_status_response(job: dict, base_url: str) -> dict:
+    response = {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "node_timings": job["node_timings"],
+    }
+    if job["status"] == "succeeded" and job["result"]:
+        response["result"] = JOB_RESPONSE_BUILDERS[job["kind"]](job["result"], base_url)
+    if job["error"]:
+        response["error"] = job["error"]
+    return response
+
+@app.post("/jobs/generate_lesson_docx", status_code=202)
+async def submit_lesson_docx_job(request: Request, lesson_request: LessonDocxRequest):
+    job_id = await asyncio.to_thread(submit_job, "generate_lesson_docx", lesson_docx_inputs(lesson_request))
+    return {"job_id": job_id, "status_url": f"{str(request.base_url).rstrip('/')}/jobs/{job_id}"}
+
+@app.post("/jobs/full-pipeline", status_code=202)
+async def submit_full_pipeline_job(request: Request, lesson_request: FullPipelineRequest):
+    job_id = await asyncio.to_thread(submit_job, "full_pipeline", full_pipeline_inputs(lesson_request))
+    return {"job_id": job_id, "status_url": f"{str(request.base_url).rstrip('/')}/jobs/{job_id}"}
+
+@app.get("/jobs/{job_id}")
+async def job_status(request: Request, job_id: str):
+    job = await asyncio.to_thread(get_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status_response(job, str(request.base_url).rstrip("/"))
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(request: Request, job_id: str):
+    """SSE feed: a `status` event whenever the job changes, ending once it finishes."""
+    base_url = str(request.base_url).rstrip("/")
+    if not await asyncio.to_thread(get_job, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_source():
+        last = None
+        while not await request.is_disconnected():
+            job = await asyncio.to_thread(get_job, job_id)
+            snapshot = job_status_response(job, base_url)
+            if snapshot != last:
+                yield sse_event("status", snapshot)
+                last = snapshot
+            if job["status"] in ("succeeded", "failed"):
+                break
+            await asyncio.sleep(1.0)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# ===== Render Documents Straight to the Response =====
+# kind -> (renderer, expected payload type, download name); nothing is stored
+DOCUMENT_RENDERERS = {
+    "slides": (render_slide_deck, list, "lesson_slides.pptx"),
+    "lesson_plan": (render_lesson_plan, dict, "lesson_plan.docx"),
+    "worksheet": (render_student_worksheet_doc, list, "student_worksheet.docx"),
+    "source_material": (render_source_material_doc, list, "source_material.docx"),
+}
+
+@app.post("/api/render/{kind}")
+async def render_document(kind: str, request: RenderRequest):
+    """Renders slides / sections / paragraphs in memory and returns the file itself."""
+    if kind not in DOCUMENT_RENDERERS:
+        raise HTTPException(status_code=404, detail=f"Unknown document kind: {kind}")
+    renderer, payload_type, filename = DOCUMENT_RENDERERS[kind]
+    if not isinstance(request.data, payload_type):
+        raise HTTPException(status_code=422, detail=f"'{kind}' expects a JSON {payload_type.__name__}")
+    try:
+        data = await asyncio.to_thread(renderer, request.data)
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+    return Response(
+        data,
+        media_type=mimetypes.guess_type(filename)[0],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"}
+    )
+
+
 # ===== Image Search for Placeholder Replacement =====
 @app.get("/api/search_images")
 async def search_images(q: str = Query(...)):
+    """
+    Returns result metadata (id, title, source, thumbnail_url, original_url, size)
+    without downloading anything; POST /api/commit_image stores the chosen one by id.
+    """
     try:
-        urls = get_image_urls_from_serpapi(q, count=5)
-        return download_images(urls)
+        return await search_images_async(q, 5)
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
+@app.post("/api/commit_image")
+async def commit_selected_image(request: CommitImageRequest):
+    try:
+        image_url = await commit_image(request.result_id)
+        if image_url is None:
+            return JSONResponse(status_code=502, content={"error": "Could not download the selected image."})
+        return {"image_url": image_url}
+    except KeyError:
+        return JSONResponse(status_code=404, content={"error": "Unknown or expired search result; search again."})
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
     
 
 # ===== Generate Audio on Demand =====
+_audio_tasks = set()  # keeps early-returned syntheses alive until they finish
+
+def _finish_audio_task(task: asyncio.Task):
+    _audio_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"[Audio] Background synthesis failed: {task.exception()}")
+
+def audio_stream_response(prompt: str) -> StreamingResponse:
+    """Chunked mp3 forwarded from TTS; X-Audio-Url is where the stored copy will live."""
+    return StreamingResponse(
+        stream_audio(prompt),
+        media_type="audio/mpeg",
+        headers={"X-Audio-Url": audio_url_for(audio_path_for(audio_key(prompt))), "Cache-Control": "no-cache"}
+    )
+
+@app.get("/api/generate_audio/stream")
+async def generate_audio_stream(prompt: str = Query(...)):
+    """GET form of the streaming mode, usable directly as an <audio> src."""
+    if not prompt.strip():
+        return JSONResponse(status_code=400, content={"error": "Empty text provided for TTS."})
+    return audio_stream_response(prompt)
+
 @app.post("/api/generate_audio")
 async def generate_audio(request: GenerateAudioRequest):
+    """
+    Long prompts are synthesized sentence by sentence in parallel and joined.
+    With early=true the response is sent as soon as the first segment exists
+    (first_segment_url); audio_url becomes available when the rest is joined.
+    With stream=true the response body is the mp3 itself, sent as it is synthesized.
+    """
+    if not request.prompt.strip():
+        return JSONResponse(status_code=400, content={"error": "Empty text provided for TTS."})
+    if request.stream:
+        return audio_stream_response(request.prompt)
     try:
-        path = generate_audio_file(request.prompt)
-        filename = os.path.basename(path)
-        return {"audio_url": f"https://langgraph-lesson-modifier.onrender.com/audio/{filename}"}
+        if not request.early:
+            path, segment_paths = await synthesize_long(request.prompt)
+            return {"audio_url": audio_url_for(path), "segment_urls": [audio_url_for(p) for p in segment_paths], "ready": True}
+
+        first_segment = asyncio.get_running_loop().create_future()
+        task = asyncio.create_task(synthesize_long(
+            request.prompt,
+            on_first_segment=lambda p: first_segment.done() or first_segment.set_result(p)
+        ))
+        _audio_tasks.add(task)
+        task.add_done_callback(_finish_audio_task)
+
+        await asyncio.wait({first_segment, task}, return_when=asyncio.FIRST_COMPLETED)
+        if task.done():
+            path, segment_paths = task.result()
+            return {"audio_url": audio_url_for(path), "segment_urls": [audio_url_for(p) for p in segment_paths], "ready": True}
+        return {
+            "audio_url": audio_url_for(audio_path_for(audio_key(request.prompt))),
+            "first_segment_url": audio_url_for(first_segment.result()),
+            "ready": False
+        }
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
@@ -146,21 +413,56 @@ async def generate_audio(request: GenerateAudioRequest):
 async def upload_audio(file: UploadFile = File(...)):
     try:
         out_path = f"data/outputs/audio/{uuid.uuid4().hex}_{file.filename}"
-        with open(out_path, "wb") as out_file:
-            shutil.copyfileobj(file.file, out_file)
+        async with aiofiles.open(out_path, "wb") as out_file:
+            while chunk := await file.read(1024 * 1024):
+                await out_file.write(chunk)
         filename = os.path.basename(out_path)
         return {"audio_url": f"https://langgraph-lesson-modifier.onrender.com/audio/{filename}"}
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
+# === Artifacts (see utils/artifact_store.py) ===
+class ArtifactFiles(CachedStaticFiles):
+    """
+    Serves the local artifact store, answering from the in-memory layer when
+    the artifact is still there, and refreshes last_accessed for quota GC.
+    """
+
+    async def get_response(self, path: str, scope):
+        key = path.replace(os.sep, "/")
+        cached = memory_artifact(key)
+        if cached is not None and scope["method"] in ("GET", "HEAD"):
+            response = bytes_response(cached["data"], cached["content_type"], cached["etag"], Headers(scope=scope))
+        else:
+            response = await super().get_response(path, scope)
+        if response.status_code in (200, 206, 304):
+            await asyncio.to_thread(touch_artifact, key)
+        return response
+
+if ARTIFACT_BACKEND == "s3":
+    @app.get("/outputs/{key:path}")
+    async def get_s3_artifact(request: Request, key: str):
+        cached = memory_artifact(key)
+        if cached is not None:
+            return bytes_response(cached["data"], cached["content_type"], cached["etag"], request.headers)
+        meta = await asyncio.to_thread(get_artifact, key)
+        if meta is None:
+            raise HTTPException(status_code=404, detail="Not Found")
+        await asyncio.to_thread(touch_artifact, key)
+        return StreamingResponse(
+            iterate_in_threadpool(open_artifact(key)),
+            media_type=meta["content_type"],
+            headers={"Content-Length": str(meta["size"]), "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+        )
+
 # === Ensure Output Directories Exist ===
-output_subfolders = ["word", "slides", "worksheets", "source_materials", "markdown", "json", "files"]
-for folder in output_subfolders:
-    os.makedirs(f"data/outputs/{folder}", exist_ok=True)
+os.makedirs(ARTIFACT_ROOT, exist_ok=True)
 os.makedirs("editor", exist_ok=True)
 
 # === Mount Static File Routes ===
-app.mount("/outputs", StaticFiles(directory="data/outputs"), name="outputs")
-app.mount("/editor", StaticFiles(directory="editor"), name="editor")
-app.mount("/audio", StaticFiles(directory="data/outputs/audio"), name="audio")
-app.mount("/images", StaticFiles(directory="data/outputs/images"), name="images")
\ No newline at end of file
+if ARTIFACT_BACKEND != "s3":
+    app.mount("/outputs", ArtifactFiles(directory=ARTIFACT_ROOT, immutable=True), name="outputs")
+app.mount("/editor", CachedStaticFiles(directory="editor"), name="editor")  # revalidated: edited in place
+# uuid / content-hash file names, never rewritten
+app.mount("/audio", CachedStaticFiles(directory="data/outputs/audio", immutable=True), name="audio")
+app.mount("/images", CachedStaticFiles(directory="data/outputs/images", immutable=True), name="images")
\ No newline at end of file
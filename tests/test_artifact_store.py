@@ -0,0 +1,34 @@
+import os
+
+import utils.artifact_store as store
+
+DAY = 24 * 3600
+
+
+def write(path, data=b"x"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def test_gc_collects_unreferenced_media_and_keeps_referenced(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(store, "_initialized", False)
+    monkeypatch.setattr(store, "_backend", None)
+    for name in ("audio/tts_kept.mp3", "audio/tts_orphan.mp3", "images/image_kept.png", "images/image_orphan.png"):
+        write(os.path.join(store.ARTIFACT_ROOT, name))
+
+    start = 1_000_000_000.0
+    store.collect_garbage(now=start)  # first seen: dated now, nothing expires yet
+    assert len(os.listdir(os.path.join(store.ARTIFACT_ROOT, "audio"))) == 2
+
+    later = start + store.ARTIFACT_RETENTION_SECONDS - DAY
+    monkeypatch.setattr(store.time, "time", lambda: later)
+    recorded = store.record_media_references(
+        "Intro\n\n[AUDIO:tts_kept.mp3]\n\n![](https://example.onrender.com/images/image_kept.png)"
+    )
+    assert recorded == 2
+
+    store.collect_garbage(now=start + store.ARTIFACT_RETENTION_SECONDS + DAY)
+    assert os.listdir(os.path.join(store.ARTIFACT_ROOT, "audio")) == ["tts_kept.mp3"]
+    assert os.listdir(os.path.join(store.ARTIFACT_ROOT, "images")) == ["image_kept.png"]
@@ -0,0 +1,23 @@
+import asyncio
+import os
+
+import tools.audio.generate as audio
+
+
+def test_long_prompt_keeps_segments_out_of_the_audio_store(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(audio.SEGMENT_DIR)
+
+    async def fake_synthesize_to(path, text, voice, model):
+        with open(path, "wb") as f:
+            f.write(text.encode())
+
+    monkeypatch.setattr(audio, "_synthesize_to", fake_synthesize_to)
+    text = " ".join(f"Sentence number {i} is about the water cycle." for i in range(40))
+
+    path, segment_paths = asyncio.run(audio.synthesize_long(text))
+
+    assert sorted(os.listdir(audio.OUTPUT_DIR)) == sorted(["segments", os.path.basename(path)])
+    assert len(segment_paths) > 1
+    assert all(os.path.dirname(p) == audio.SEGMENT_DIR for p in segment_paths)
+    assert audio.audio_url_for(segment_paths[0]).startswith(f"{audio.AUDIO_URL_BASE}/segments/tts_")
@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+
+import graph.nodes.modify_lesson_node as modify_node
+
+
+def test_cancelled_day_propagates_instead_of_becoming_a_result(monkeypatch):
+    calls = []
+
+    async def fake_modify(chunk, rules, use_cache=True, on_delta=None):
+        calls.append(chunk)
+        if chunk == "day 2":
+            raise asyncio.CancelledError()
+        return f"adapted {chunk}"
+
+    monkeypatch.setattr(modify_node, "modify_lesson_content", fake_modify)
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(modify_node.adapt_day_chunks(["day 1", "day 2", "day 3"], ["rule"], max_attempts=3))
+    assert calls.count("day 2") == 1  # not retried
+
+
+def test_failed_day_is_retried(monkeypatch):
+    failures = {"day 2": 1}
+
+    async def fake_modify(chunk, rules, use_cache=True, on_delta=None):
+        if failures.get(chunk):
+            failures[chunk] -= 1
+            raise RuntimeError("rate limited")
+        return f"adapted {chunk}"
+
+    monkeypatch.setattr(modify_node, "modify_lesson_content", fake_modify)
+    monkeypatch.setattr(modify_node, "MODIFY_RETRY_DELAY", 0)
+
+    result = asyncio.run(modify_node.adapt_day_chunks(["day 1", "day 2"], ["rule"]))
+    assert result == ["adapted day 1", "adapted day 2"]
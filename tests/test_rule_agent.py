@@ -0,0 +1,18 @@
+from agents.rule_agent import prefilter_rules, relevance_score
+
+
+def test_sel_instruction_rule_is_not_scored_as_administrative():
+    assert relevance_score("Have students work socially in pairs to practice vocabulary") > 0
+    assert relevance_score("Model how to read a map in north south directions") > 0
+    assert relevance_score("In Texas law, accommodations must be documented") < 0
+
+
+def test_sel_instruction_rule_survives_the_prefilter_cap():
+    filler = [f"Rule {i}: add captions to item {i}" for i in range(70)]
+    sel_rule = "Have students work socially in pairs to practice vocabulary"
+    admin_rule = "Funding for aides is permissible only when specified by statute"
+
+    kept = prefilter_rules(filler + [sel_rule, admin_rule], max_rules=60)
+
+    assert sel_rule in kept
+    assert admin_rule not in kept
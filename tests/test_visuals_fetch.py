@@ -0,0 +1,79 @@
+import asyncio
+import os
+import socket
+
+import httpcore
+import httpx
+
+import tools.visuals.fetch as fetch
+
+PNG = b"\x89PNG\r\n\x1a\n"
+
+
+def fake_dns(monkeypatch, answers):
+    """Each lookup of a host returns its next answer (the last one repeats)."""
+    lookups = {}
+
+    def getaddrinfo(host, port, *args, **kwargs):
+        n = lookups[host] = lookups.get(host, -1) + 1
+        address = answers[host][min(n, len(answers[host]) - 1)]
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, port))]
+
+    monkeypatch.setattr(socket, "getaddrinfo", getaddrinfo)
+
+
+class RecordingBackend(httpcore.AsyncMockBackend):
+    def __init__(self, buffer):
+        super().__init__(buffer)
+        self.connected = []
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        self.connected.append(host)
+        return await super().connect_tcp(host, port, timeout, local_address, socket_options)
+
+
+def fetch_with(backend, url):
+    async def run():
+        fetch._http["client"] = httpx.AsyncClient(
+            transport=fetch._PublicOnlyTransport(network_backend=fetch._PublicOnlyBackend(backend)),
+            trust_env=False,
+        )
+        fetch._http["loop"] = asyncio.get_running_loop()
+        try:
+            return await fetch.fetch_image(url)
+        finally:
+            await fetch.aclose_http_client()
+
+    return asyncio.run(run())
+
+
+def test_rebinding_second_resolution_is_never_connected_to(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(fetch.IMAGE_OUTPUT_DIR)
+    fake_dns(monkeypatch, {"images.example.com": ["93.184.216.34", "127.0.0.1"]})
+    backend = RecordingBackend([
+        b"HTTP/1.1 200 OK\r\n",
+        b"Content-Type: image/png\r\n",
+        f"Content-Length: {len(PNG)}\r\n\r\n".encode(),
+        PNG,
+    ])
+
+    filename = fetch_with(backend, "http://images.example.com/cat.png")
+
+    assert filename is not None
+    assert backend.connected == ["93.184.216.34"]
+
+
+def test_redirect_to_a_private_host_is_refused(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(fetch.IMAGE_OUTPUT_DIR)
+    fake_dns(monkeypatch, {"images.example.com": ["93.184.216.34"], "internal.example.com": ["127.0.0.1"]})
+    backend = RecordingBackend([
+        b"HTTP/1.1 302 Found\r\n",
+        b"Location: http://internal.example.com/secret.png\r\n",
+        b"Content-Length: 0\r\n\r\n",
+    ])
+
+    assert fetch_with(backend, "http://images.example.com/cat.png") is None
+    assert backend.connected == ["93.184.216.34"]
+    assert os.listdir(fetch.IMAGE_OUTPUT_DIR) == []
@@ -1,15 +1,150 @@
 # tools/audio/generate.py
 
 import os
+import time
 import uuid
-from openai import OpenAI
-from typing import List, Tuple
+import asyncio
+import hashlib
+from collections import deque
+from openai import AsyncOpenAI
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+import aiofiles
+import nltk
+from nltk.tokenize import sent_tokenize
+
+# Vendored punkt data (same as tools/llm/generate_slide_content.py)
+nltk.data.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../nltk_data')))
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY)
+client = AsyncOpenAI(api_key=OPENAI_API_KEY)
 
 OUTPUT_DIR = "data/outputs/audio"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+AUDIO_URL_BASE = "https://langgraph-lesson-modifier.onrender.com/audio"  # where OUTPUT_DIR is served
+# Sentence segments of long prompts: only needed until the joined file exists
+# (and for early playback), so they live in a cache tree that artifact GC
+# sweeps by mtime (utils/artifact_store.py CACHE_TREES).
+SEGMENT_DIR = os.path.join(OUTPUT_DIR, "segments")
+os.makedirs(SEGMENT_DIR, exist_ok=True)
+
+TTS_MODEL = os.getenv("TTS_MODEL", "gpt-4o-mini-tts")
+TTS_VOICE = os.getenv("TTS_VOICE", "sage")
+TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", "4"))
+TTS_SEGMENT_CHARS = int(os.getenv("TTS_SEGMENT_CHARS", "600"))  # target size of one synthesis call
+TTS_MAX_INPUT_CHARS = 4000  # the speech endpoint rejects inputs over 4096 characters
+TTS_STREAM_CHUNK = 16 * 1024
+
+# -----------------------------
+# Content-addressed audio store
+# -----------------------------
+# Identical (text, voice, model) requests map to one mp3 in OUTPUT_DIR, so a
+# repeated prompt is served from disk instead of being synthesized again.
+_stats = {"hits": 0, "misses": 0, "errors": 0}
+_latencies = {"hit": deque(maxlen=500), "miss": deque(maxlen=500), "first_byte": deque(maxlen=500)}
+_inflight: Dict[str, asyncio.Future] = {}
+
+def audio_key(text: str, voice: str = TTS_VOICE, model: str = TTS_MODEL) -> str:
+    payload = "\0".join([model, voice, "mp3", text.strip()])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def audio_path_for(key: str, directory: str = OUTPUT_DIR) -> str:
+    return os.path.join(directory, f"tts_{key}.mp3")
+
+def audio_url_for(path: str) -> str:
+    return f"{AUDIO_URL_BASE}/{os.path.relpath(path, OUTPUT_DIR).replace(os.sep, '/')}"
+
+def _record(kind: str, started: float):
+    _latencies[kind].append(time.perf_counter() - started)
+
+def _percentile(samples, q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 1)
+
+def audio_stats() -> dict:
+    """Store hit rate and synthesis latency (ms) for this process."""
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        **_stats,
+        "hit_rate": round(_stats["hits"] / lookups, 3) if lookups else 0.0,
+        "latency_ms": {
+            kind: {"p50": _percentile(samples, 0.5), "p95": _percentile(samples, 0.95), "count": len(samples)}
+            for kind, samples in _latencies.items()
+        },
+    }
+
+async def _synthesize_to(path: str, text: str, voice: str, model: str):
+    tmp_path = os.path.join(OUTPUT_DIR, f".{uuid.uuid4().hex}.part")
+    try:
+        async with client.audio.speech.with_streaming_response.create(
+            model=model,
+            voice=voice,
+            input=text
+        ) as response:
+            await response.stream_to_file(tmp_path)
+        os.replace(tmp_path, path)  # readers never see a half-written file
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+async def _join_inflight(path: str) -> bool:
+    """
+    Waits for another task's synthesis of `path`. Returns False when there is
+    none, or when its owner was cancelled (e.g. a stream client went away):
+    the caller should then synthesize the audio itself. Synthesis errors and
+    cancellation of the waiting task itself propagate.
+    """
+    pending = _inflight.get(path)
+    if pending is None:
+        return False
+    try:
+        await asyncio.shield(pending)
+        return True
+    except asyncio.CancelledError:
+        if pending.cancelled() and not asyncio.current_task().cancelling():
+            return False
+        raise
+
+async def synthesize(text: str, voice: str = TTS_VOICE, model: str = TTS_MODEL,
+                     directory: str = OUTPUT_DIR) -> str:
+    """
+    Returns the path of an mp3 for `text` in `directory`, synthesizing it only
+    if the store does not already hold one. Concurrent requests for the same
+    audio share a single synthesis.
+    """
+    started = time.perf_counter()
+    path = audio_path_for(audio_key(text, voice, model), directory)
+
+    if os.path.exists(path):
+        os.utime(path)  # keeps reused segments out of the cache sweep
+        _stats["hits"] += 1
+        _record("hit", started)
+        return path
+
+    while path in _inflight:  # re-checked: a cancelled owner may have been replaced
+        if await _join_inflight(path):
+            _stats["hits"] += 1
+            _record("hit", started)
+            return path
+
+    _stats["misses"] += 1
+    pending = asyncio.get_running_loop().create_future()
+    _inflight[path] = pending
+    try:
+        await _synthesize_to(path, text.strip(), voice, model)
+        pending.set_result(path)
+    except Exception as e:
+        _stats["errors"] += 1
+        pending.set_exception(e)
+        pending.exception()  # mark retrieved when nobody else is waiting
+        raise
+    finally:
+        if not pending.done():
+            pending.cancel()  # cancelled mid-synthesis; release any waiters
+        del _inflight[path]
+
+    _record("miss", started)
+    return path
 
 def split_text_for_audio(text: str) -> List[str]:
     """
@@ -18,53 +153,251 @@ def split_text_for_audio(text: str) -> List[str]:
     """
     return text.split("\n\n")  # Split by paragraph
 
-def generate_audio_for_text_chunks(chunks: List[str]) -> List[Tuple[str, str]]:
+def split_text_for_audio_spans(text: str) -> List[Tuple[int, int]]:
+    """
+    Same paragraphs as split_text_for_audio, as (start, end) offsets of the
+    stripped text, so callers can splice at exact positions instead of searching.
+    """
+    spans = []
+    pos = 0
+    for piece in text.split("\n\n"):
+        lead = len(piece) - len(piece.lstrip())
+        trail = len(piece.rstrip())
+        if trail > lead:
+            spans.append((pos + lead, pos + trail))
+        pos += len(piece) + 2
+    return spans
+
+async def synthesize_chunks(chunks: List[str], max_concurrency: int = TTS_MAX_CONCURRENCY) -> List[Optional[str]]:
     """
-    Converts each text chunk into an audio file.
-    Returns list of (audio_path, audio_caption).
+    Synthesizes chunks up to `max_concurrency` at a time. Returns one path per
+    chunk, in order; None where the chunk is empty or synthesis failed.
     """
-    audio_results = []
+    semaphore = asyncio.Semaphore(max_concurrency)
 
-    for idx, chunk in enumerate(chunks):
+    async def one(idx: int, chunk: str) -> Optional[str]:
         if not chunk.strip():
-            continue  # Skip empty parts
+            return None
+        async with semaphore:
+            try:
+                return await synthesize(chunk)
+            except Exception as e:
+                print(f"[AudioAgent] Failed to generate audio for chunk {idx}: {e}")
+                return None
 
-        try:
-            filename = f"audio_{uuid.uuid4().hex}.mp3"
-            audio_path = os.path.join(OUTPUT_DIR, filename)
+    return list(await asyncio.gather(*(one(idx, chunk) for idx, chunk in enumerate(chunks))))
 
-            response = client.audio.speech.create(
-                model="gpt-4o-mini-tts",
-                voice="sage",  # or "shimmer", "onyx", etc.
-                input=chunk
-            )
-            response.stream_to_file(audio_path)
+async def generate_audio_for_text_chunks(chunks: List[str], max_concurrency: int = TTS_MAX_CONCURRENCY) -> List[Tuple[str, str]]:
+    """
+    Converts each text chunk into an audio file, up to `max_concurrency` at a time.
+    Returns list of (audio_path, audio_caption) in chunk order.
+    """
+    paths = await synthesize_chunks(chunks, max_concurrency)
+    return [
+        (audio_url_for(path), chunk.strip())
+        for path, chunk in zip(paths, chunks)
+        if path is not None
+    ]
 
-            audio_results.append((f"https://langgraph-lesson-modifier.onrender.com/audio/{filename}", chunk.strip()))
-            #audio_results.append((audio_path, chunk.strip()))
-        except Exception as e:
-            print(f"[AudioAgent] Failed to generate audio for chunk {idx}: {e}")
-            continue
 
-    return audio_results
+# -----------------------------
+# Long text: sentence segments synthesized in parallel
+# -----------------------------
+def _hard_split(sentence: str, limit: int) -> List[str]:
+    """Splits an over-long sentence at whitespace into pieces of at most `limit` chars."""
+    pieces, current = [], ""
+    for word in sentence.split():
+        if current and len(current) + 1 + len(word) > limit:
+            pieces.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
+
+def split_text_into_segments(text: str, max_chars: int = TTS_SEGMENT_CHARS) -> List[str]:
+    """
+    Groups whole sentences (punkt) into segments of up to `max_chars`, so each
+    segment is one short TTS call and no call exceeds the input limit.
+    """
+    segments, current = [], ""
+    for paragraph in text.split("\n"):
+        for sentence in sent_tokenize(paragraph.strip()) if paragraph.strip() else []:
+            for piece in (_hard_split(sentence, TTS_MAX_INPUT_CHARS) if len(sentence) > TTS_MAX_INPUT_CHARS else [sentence]):
+                if current and len(current) + 1 + len(piece) > max_chars:
+                    segments.append(current)
+                    current = piece
+                else:
+                    current = f"{current} {piece}" if current else piece
+    if current:
+        segments.append(current)
+    return segments
 
+def _mp3_frames(data: bytes, keep_header: bool = False) -> bytes:
+    """Strips ID3v2/ID3v1 tags so segments can be joined into one stream."""
+    if not keep_header and data[:3] == b"ID3" and len(data) > 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        data = data[10 + size:]
+    if len(data) >= 128 and data[-128:-125] == b"TAG":
+        data = data[:-128]
+    return data
 
-def generate_audio_file(text: str) -> str:
+def concatenate_mp3(segment_paths: List[str], out_path: str):
+    tmp_path = os.path.join(OUTPUT_DIR, f".{uuid.uuid4().hex}.part")
+    try:
+        with open(tmp_path, "wb") as out:
+            for idx, path in enumerate(segment_paths):
+                with open(path, "rb") as f:
+                    data = f.read()
+                out.write(_mp3_frames(data, keep_header=idx == 0))
+        os.replace(tmp_path, out_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+async def synthesize_long(text: str, voice: str = TTS_VOICE, model: str = TTS_MODEL,
+                          max_concurrency: int = TTS_MAX_CONCURRENCY,
+                          on_first_segment: Optional[Callable[[str], None]] = None) -> Tuple[str, List[str]]:
+    """
+    Synthesizes `text` as sentence segments in parallel and joins them in order.
+    Returns (full mp3 path, segment paths). `on_first_segment` is called with the
+    first segment's path as soon as it exists, so playback can start early.
+    The joined file lives in the content-addressed store, the segments in
+    SEGMENT_DIR.
+    """
+    path = audio_path_for(audio_key(text, voice, model))
+    segments = split_text_into_segments(text)
+
+    if os.path.exists(path) or len(segments) <= 1:
+        path = await synthesize(text, voice, model)
+        if on_first_segment is not None:
+            on_first_segment(path)
+        return path, [path]
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def one(idx: int, segment: str) -> str:
+        async with semaphore:
+            segment_path = await synthesize(segment, voice, model, SEGMENT_DIR)
+        if idx == 0 and on_first_segment is not None:
+            on_first_segment(segment_path)
+        return segment_path
+
+    segment_paths = await asyncio.gather(*(one(idx, segment) for idx, segment in enumerate(segments)))
+    await asyncio.to_thread(concatenate_mp3, segment_paths, path)
+    print(f"[AudioAgent] Joined {len(segment_paths)} segments into {os.path.basename(path)}")
+    return path, list(segment_paths)
+
+# -----------------------------
+# Streaming: forward bytes while persisting them
+# -----------------------------
+async def _read_chunks(path: str, strip_tags: bool = False) -> AsyncIterator[bytes]:
+    if strip_tags:
+        async with aiofiles.open(path, "rb") as f:
+            yield _mp3_frames(await f.read())
+        return
+    async with aiofiles.open(path, "rb") as f:
+        while chunk := await f.read(TTS_STREAM_CHUNK):
+            yield chunk
+
+async def _stream_one(text: str, voice: str, model: str, directory: str = OUTPUT_DIR) -> AsyncIterator[bytes]:
+    """
+    Yields the mp3 for `text` as the TTS response arrives, writing the same
+    bytes to the store. A stored (or concurrently finishing) copy is read from disk.
+    """
+    started = time.perf_counter()
+    path = audio_path_for(audio_key(text, voice, model), directory)
+
+    while not os.path.exists(path) and path in _inflight:
+        await _join_inflight(path)
+    if os.path.exists(path):
+        os.utime(path)
+        _stats["hits"] += 1
+        _record("hit", started)
+        async for chunk in _read_chunks(path):
+            yield chunk
+        return
+
+    _stats["misses"] += 1
+    pending = asyncio.get_running_loop().create_future()
+    _inflight[path] = pending
+    tmp_path = os.path.join(OUTPUT_DIR, f".{uuid.uuid4().hex}.part")
+    try:
+        async with client.audio.speech.with_streaming_response.create(
+            model=model,
+            voice=voice,
+            input=text.strip()
+        ) as response:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                first = True
+                async for chunk in response.iter_bytes():  # forward as received, unbuffered
+                    if first:
+                        _record("first_byte", started)
+                        first = False
+                    await f.write(chunk)
+                    yield chunk
+        await asyncio.to_thread(os.replace, tmp_path, path)
+        pending.set_result(path)
+        _record("miss", started)
+    except Exception as e:
+        _stats["errors"] += 1
+        pending.set_exception(e)
+        pending.exception()
+        raise
+    finally:
+        if not pending.done():
+            pending.cancel()  # client went away before the audio was complete
+        del _inflight[path]
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+async def stream_audio(text: str, voice: str = TTS_VOICE, model: str = TTS_MODEL,
+                       max_concurrency: int = TTS_MAX_CONCURRENCY) -> AsyncIterator[bytes]:
+    """
+    Yields one mp3 stream for `text`. The first sentence segment is forwarded
+    as it is synthesized while the remaining segments are synthesized in the
+    background and follow in order. Once complete, the joined file is stored
+    at audio_path_for(audio_key(text)), the same place synthesize_long uses.
+    """
+    path = audio_path_for(audio_key(text, voice, model))
+    segments = split_text_into_segments(text)
+
+    if os.path.exists(path) or len(segments) <= 1:
+        async for chunk in _stream_one(text, voice, model):
+            yield chunk
+        return
+
+    semaphore = asyncio.Semaphore(max_concurrency - 1 or 1)  # one slot is the live stream
+
+    async def one(segment: str) -> str:
+        async with semaphore:
+            return await synthesize(segment, voice, model, SEGMENT_DIR)
+
+    # Not cancelled if the client disconnects: finished segments still fill the store
+    rest = [asyncio.create_task(one(segment)) for segment in segments[1:]]
+    for task in rest:
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    first_path = audio_path_for(audio_key(segments[0], voice, model), SEGMENT_DIR)
+    async for chunk in _stream_one(segments[0], voice, model, SEGMENT_DIR):
+        yield chunk
+
+    for task in rest:
+        async for chunk in _read_chunks(await task, strip_tags=True):
+            yield chunk
+
+    await asyncio.to_thread(concatenate_mp3, [first_path] + [task.result() for task in rest], path)
+
+
+async def generate_audio_file(text: str) -> str:
     """
     Generate audio for a single sentence or prompt.
+    Long text is split into sentences and synthesized in parallel.
     Returns the file path to the generated MP3.
     """
     if not text.strip():
         raise ValueError("Empty text provided for TTS.")
 
-    filename = f"audio_{uuid.uuid4().hex}.mp3"
-    audio_path = os.path.join(OUTPUT_DIR, filename)
-
-    response = client.audio.speech.create(
-        model="gpt-4o-mini-tts",  # or "tts-1-hd" for better quality
-        voice="sage",  # Or coral, shimmer, onyx, etc.
-        input=text
-    )
-    response.stream_to_file(audio_path)
-
-    return audio_path
\ No newline at end of file
+    path, _ = await synthesize_long(text)
+    return path
@@ -0,0 +1,265 @@
+# tools/llm/cache.py
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+from contextlib import closing
+from typing import Callable, Optional
+from utils.sqlite_utils import connect
+
+# -----------------------------
+# Configuration
+# -----------------------------
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "data/cache/llm_cache.sqlite3")
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))  # 256 MB
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))  # 7 days
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+
+# Counters for this process; shared totals across workers live in the `stats` table
+_local_stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0, "errors": 0}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_last_accessed ON entries(last_accessed);
+CREATE TABLE IF NOT EXISTS stats (
+    name TEXT PRIMARY KEY,
+    count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS usage (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    label TEXT,
+    model TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    cached_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_usage_created ON usage(created_at);
+"""
+
+_initialized = False
+
+def _open():
+    global _initialized
+    conn = connect(LLM_CACHE_PATH)
+    if not _initialized:
+        conn.executescript(_SCHEMA)
+        _initialized = True
+    return conn
+
+def _bump(conn, name: str, amount: int = 1):
+    _local_stats[name] += amount
+    conn.execute(
+        "INSERT INTO stats(name, count) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET count = count + excluded.count",
+        (name, amount)
+    )
+
+# -----------------------------
+# Keys
+# -----------------------------
+def make_cache_key(model: str, messages: list, temperature: Optional[float] = None, **params) -> str:
+    """
+    Content-addressed key: SHA-256 over the canonical JSON of everything
+    that influences the completion.
+    """
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "params": params,
+    }
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+# -----------------------------
+# Storage (blocking, called via asyncio.to_thread)
+# -----------------------------
+def cache_get(key: str) -> Optional[str]:
+    now = time.time()
+    with closing(_open()) as conn:
+        row = conn.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            _bump(conn, "misses")
+            return None
+
+        value, created_at = row
+        if now - created_at > LLM_CACHE_TTL_SECONDS:
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            _bump(conn, "expired")
+            _bump(conn, "misses")
+            return None
+
+        conn.execute("UPDATE entries SET last_accessed = ? WHERE key = ?", (now, key))
+        _bump(conn, "hits")
+        return value
+
+def cache_set(key: str, model: str, value: str):
+    now = time.time()
+    size = len(value.encode("utf-8"))
+    with closing(_open()) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries(key, model, value, size, created_at, last_accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, value, size, now, now)
+            )
+            _evict(conn, now)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+def _evict(conn, now: float):
+    """Drop expired entries, then least-recently-used ones until under LLM_CACHE_MAX_BYTES."""
+    expired = conn.execute("DELETE FROM entries WHERE created_at < ?", (now - LLM_CACHE_TTL_SECONDS,)).rowcount
+    if expired:
+        _bump(conn, "expired", expired)
+
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+    if total <= LLM_CACHE_MAX_BYTES:
+        return
+
+    evicted = 0
+    for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_accessed ASC").fetchall():
+        if total <= LLM_CACHE_MAX_BYTES:
+            break
+        conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        total -= size
+        evicted += 1
+    if evicted:
+        _bump(conn, "evicted", evicted)
+
+def record_usage(label: Optional[str], model: str, usage) -> None:
+    """Stores one API call's token usage, including the provider's prefix-cache hits."""
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+    now = time.time()
+    with closing(_open()) as conn:
+        conn.execute(
+            "INSERT INTO usage(label, model, prompt_tokens, cached_tokens, completion_tokens, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (label, model, usage.prompt_tokens or 0, cached, usage.completion_tokens or 0, now)
+        )
+        conn.execute("DELETE FROM usage WHERE created_at < ?", (now - LLM_CACHE_TTL_SECONDS,))
+    print(f"[LLMUsage] {label or model}: {usage.prompt_tokens} prompt tokens, {cached} cached")
+
+def usage_stats() -> dict:
+    """Per-label prompt token totals and the share served from the provider's prompt cache."""
+    with closing(_open()) as conn:
+        rows = conn.execute(
+            """SELECT COALESCE(label, ''), COUNT(*), SUM(prompt_tokens), SUM(cached_tokens), SUM(completion_tokens)
+               FROM usage GROUP BY label ORDER BY label"""
+        ).fetchall()
+    return {
+        label: {
+            "calls": calls,
+            "prompt_tokens": prompt,
+            "cached_tokens": cached,
+            "completion_tokens": completion,
+            "cached_ratio": round(cached / prompt, 3) if prompt else 0.0,
+        }
+        for label, calls, prompt, cached, completion in rows
+    }
+
+def cache_stats() -> dict:
+    """Hit/miss counters for this process plus shared totals across all workers."""
+    with closing(_open()) as conn:
+        shared = dict(conn.execute("SELECT name, count FROM stats").fetchall())
+        entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+    return {"process": dict(_local_stats), "shared": shared, "entries": entries, "size_bytes": size,
+            "prompt_usage": usage_stats()}
+
+def cache_clear():
+    with closing(_open()) as conn:
+        conn.execute("DELETE FROM entries")
+
+# -----------------------------
+# Main entry point for tools/llm
+# -----------------------------
+async def _stream_completion(client, model: str, messages: list, on_delta: Callable[[str], None], **params) -> tuple:
+    """Returns (content, usage); usage arrives in the final chunk via include_usage."""
+    parts = []
+    usage = None
+    stream = await client.chat.completions.create(
+        model=model, messages=messages, stream=True, stream_options={"include_usage": True}, **params
+    )
+    async for chunk in stream:
+        if getattr(chunk, "usage", None) is not None:
+            usage = chunk.usage
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            parts.append(delta)
+            on_delta(delta)
+    return "".join(parts), usage
+
+async def cached_chat_completion(client, *, model: str, messages: list, temperature: Optional[float] = None,
+                                 use_cache: bool = True, validate: Optional[Callable[[str], object]] = None,
+                                 on_delta: Optional[Callable[[str], None]] = None,
+                                 cache_tag: Optional[str] = None, label: Optional[str] = None, **params) -> str:
+    """
+    Runs client.chat.completions.create() through the shared response cache
+    and returns the message content. Pass use_cache=False to always call the API.
+    If `validate` is given, a response is only stored when validate(content)
+    does not raise, so unparseable output is never replayed from the cache.
+    If `on_delta` is given, the completion is streamed and on_delta receives
+    each text fragment as it arrives (a cache hit arrives as one fragment).
+    `cache_tag` (e.g. prompt template versions) is added to the key only.
+    Token usage of every API call is recorded under `label` (see usage_stats).
+    Cache failures never fail the request; they only count as errors.
+    """
+    use_cache = use_cache and LLM_CACHE_ENABLED
+    key_params = {k: v for k, v in params.items() if k != "timeout"}
+    if cache_tag is not None:
+        key_params["cache_tag"] = cache_tag
+    key = make_cache_key(model, messages, temperature, **key_params)
+
+    if use_cache:
+        try:
+            cached = await asyncio.to_thread(cache_get, key)
+            if cached is not None:
+                print(f"[LLMCache] hit {key[:12]} ({model})")
+                if on_delta is not None:
+                    on_delta(cached)
+                return cached
+        except Exception as e:
+            _local_stats["errors"] += 1
+            print(f"[LLMCache] lookup failed: {e}")
+
+    if temperature is not None:
+        params["temperature"] = temperature
+    if on_delta is None:
+        response = await client.chat.completions.create(model=model, messages=messages, **params)
+        content, usage = response.choices[0].message.content, response.usage
+    else:
+        content, usage = await _stream_completion(client, model, messages, on_delta, **params)
+
+    try:
+        await asyncio.to_thread(record_usage, label, model, usage)
+    except Exception as e:
+        print(f"[LLMUsage] record failed: {e}")
+
+    if use_cache and content:
+        if validate is not None:
+            try:
+                validate(content)
+            except Exception:
+                return content  # caller's own parsing will surface the error
+        try:
+            await asyncio.to_thread(cache_set, key, model, content)
+        except Exception as e:
+            _local_stats["errors"] += 1
+            print(f"[LLMCache] store failed: {e}")
+
+    return content
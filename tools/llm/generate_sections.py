@@ -1,18 +1,21 @@
 import os
-from openai import OpenAI
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 from graph.schema import State
+from tools.llm.cache import cached_chat_completion
+from tools.llm.prompts import get_prompt, prompt_version
 
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 # -----------------------------
-# Load individual prompt templates
+# Load individual prompt templates (validated, in-memory, reloaded on change)
 # -----------------------------
 def load_prompt(section_name: str) -> str:
-    path = f"prompts/{section_name}.txt"
-    with open(path, "r") as f:
-        return f.read()
+    return get_prompt(section_name)["text"]
+
+def sections_version(section_list) -> str:
+    return ",".join(f"{name}:{prompt_version(name)}" for name in section_list)
 
 # -----------------------------
 # Section groupings
@@ -45,7 +48,25 @@ def extract_profile_fields(profile: dict) -> dict:
 # -----------------------------
 # Helper: Build prompt dynamically
 # -----------------------------
-def build_combined_prompt(section_list, student_profile, lesson_content, lesson_objective, language_objective, target_language, prior_sections=None):
+# The lesson is sent once, as a labelled "Lesson Content" block ahead of the
+# section templates; templates embed it under their own "Lesson Content:"
+# label, so they get a pointer to that block instead of another copy. Only a teacher
+# template uses the full profile, so it is filled in place (compactly) rather
+# than shared.
+LESSON_CONTENT_REF = "(see Lesson Content above)"
+
+def format_profile(profile: dict) -> str:
+    lines = []
+    for field, value in profile.items():
+        if isinstance(value, list):
+            value = ", ".join(str(v) for v in value)
+        lines.append(f"- {field}: {value}")
+    return "\n".join(lines) or "N/A"
+
+def build_shared_context(lesson_content) -> str:
+    return f"Lesson Content:\n{lesson_content}"
+
+def build_section_blocks(section_list, student_profile, lesson_objective, language_objective, target_language, prior_sections=None):
     prompt_blocks = []
     extracted = extract_profile_fields(student_profile)
     prior_sections = prior_sections or {}
@@ -55,8 +76,8 @@ def build_combined_prompt(section_list, student_profile, lesson_content, lesson_
 
         # Fill prompt placeholders
         filled_prompt = section_prompt.format(
-            student_profile=student_profile,
-            lesson_content=lesson_content,
+            student_profile=format_profile(student_profile),
+            lesson_content=LESSON_CONTENT_REF,
             lesson_objective=lesson_objective,
             language_objective=language_objective,
             target_language=target_language,
@@ -79,6 +100,24 @@ def build_combined_prompt(section_list, student_profile, lesson_content, lesson_
 
     return "\n\n".join(prompt_blocks)
 
+def build_combined_prompt(section_list, student_profile, lesson_content, lesson_objective, language_objective, target_language, prior_sections=None):
+    shared = build_shared_context(lesson_content)
+    blocks = build_section_blocks(section_list, student_profile, lesson_objective, language_objective, target_language, prior_sections)
+    return f"{shared}\n\n{blocks}"
+
+# The teacher and student calls start with the same system message and shared
+# context message, so the provider's prompt cache can reuse that prefix.
+SECTIONS_SYSTEM_PROMPT = "You are an expert instructional designer generating lesson sections clearly titled with '### Section:'."
+
+def build_section_messages(audience, section_list, student_profile, lesson_content, lesson_objective, language_objective, target_language, prior_sections=None):
+    shared = build_shared_context(lesson_content)
+    blocks = build_section_blocks(section_list, student_profile, lesson_objective, language_objective, target_language, prior_sections)
+    return [
+        {"role": "system", "content": SECTIONS_SYSTEM_PROMPT},
+        {"role": "user", "content": shared},
+        {"role": "user", "content": f"Generate all the {audience}-facing lesson sections below.\n\n{blocks}"},
+    ]
+
 # -----------------------------
 # Helper: Parse response into dict by section
 # -----------------------------
@@ -102,56 +141,59 @@ def parse_sections(output_text):
     return parsed_sections
 
 # -----------------------------
-# MAIN FUNCTION: Two LLM calls
+# Teacher sections (first LLM call)
 # -----------------------------
-def generate_all_sections(student_profile, lesson_content, lesson_objective, language_objective, target_language):
-    # --- FIRST CALL: Generate teacher sections ---
-    teacher_prompt = build_combined_prompt(
-        TEACHER_SECTIONS, student_profile, lesson_content, lesson_objective, language_objective, target_language
+async def generate_teacher_sections(student_profile, lesson_content, lesson_objective, language_objective, target_language, use_cache=True):
+    messages = build_section_messages(
+        "teacher", TEACHER_SECTIONS, student_profile, lesson_content, lesson_objective, language_objective, target_language
     )
 
-    teacher_response = client.chat.completions.create(
+    teacher_output = await cached_chat_completion(
+        client,
         model="gpt-4o",
-        messages=[
-            {
-                "role": "system",
-                "content": "You are an expert instructional designer generating teacher-facing lesson sections clearly titled with '### Section:'."
-            },
-            {
-                "role": "user",
-                "content": teacher_prompt
-            }
-        ],
-        temperature=0.7
+        messages=messages,
+        temperature=0.7,
+        use_cache=use_cache,
+        cache_tag=sections_version(TEACHER_SECTIONS),
+        label="teacher_sections"
     )
 
-    teacher_output = teacher_response.choices[0].message.content
-    teacher_sections = parse_sections(teacher_output)
+    return parse_sections(teacher_output)
 
-    # --- SECOND CALL: Generate student sections using teacher output ---
-    student_prompt = build_combined_prompt(
-        STUDENT_SECTIONS, student_profile, lesson_content, lesson_objective, language_objective, target_language,
+# -----------------------------
+# Student sections (second LLM call, uses teacher output)
+# -----------------------------
+async def generate_student_sections(student_profile, lesson_content, lesson_objective, language_objective, target_language, teacher_sections, use_cache=True):
+    messages = build_section_messages(
+        "student", STUDENT_SECTIONS, student_profile, lesson_content, lesson_objective, language_objective, target_language,
         prior_sections=teacher_sections
     )
 
-    student_response = client.chat.completions.create(
+    student_output = await cached_chat_completion(
+        client,
         model="gpt-4o",
-        messages=[
-            {
-                "role": "system",
-                "content": "You are an expert instructional designer generating all the student-facing lesson sections clearly titled with '### Section:'."
-            },
-            {
-                "role": "user",
-                "content": student_prompt
-            }
-        ],
-        temperature=0.7
+        messages=messages,
+        temperature=0.7,
+        use_cache=use_cache,
+        cache_tag=sections_version(STUDENT_SECTIONS),
+        label="student_sections"
     )
 
-    student_output = student_response.choices[0].message.content
-    student_sections = parse_sections(student_output)
+    return parse_sections(student_output)
+
+# -----------------------------
+# MAIN FUNCTION: Two LLM calls
+# -----------------------------
+async def generate_all_sections(student_profile, lesson_content, lesson_objective, language_objective, target_language, use_cache=True):
+    teacher_sections = await generate_teacher_sections(
+        student_profile, lesson_content, lesson_objective, language_objective, target_language,
+        use_cache=use_cache
+    )
+    student_sections = await generate_student_sections(
+        student_profile, lesson_content, lesson_objective, language_objective, target_language,
+        teacher_sections=teacher_sections,
+        use_cache=use_cache
+    )
 
     # Combine all sections
-    all_sections = {**teacher_sections, **student_sections}
-    return all_sections
+    return {**teacher_sections, **student_sections}
@@ -2,10 +2,13 @@ import os
 import json
 import re
 import ast 
-from openai import OpenAI
+import asyncio
+from openai import AsyncOpenAI
 import traceback
 from dotenv import load_dotenv
 from tools.llm.generate_sections import load_prompt
+from tools.llm.prompts import prompt_version
+from tools.llm.cache import cached_chat_completion
 import nltk
 from nltk.tokenize import sent_tokenize
 import math
@@ -14,7 +17,7 @@ import math
 nltk_data_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../nltk_data'))
 nltk.data.path.append(nltk_data_path)
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 
 def sanitize_text_for_docx(text: str) -> str:
@@ -66,11 +69,25 @@ def split_paragraph_by_sentence_limit(paragraph: str, max_chars: int = 550) -> l
 
     return chunks
 
-def generate_modified_lesson_content(lesson_content, lesson_objective, language_objective, i_do_teacher):
-    """Generate slide‑ready modified lesson content aligned with objectives."""
-    prompt_template = load_prompt("modify_lesson_content")
+def parse_slide_json(raw_output: str) -> list:
+    """Parse the LLM's slide JSON, tolerating code fences and smart quotes."""
+    raw_output = raw_output.strip()
+    try:
+        return json.loads(raw_output)
+    except json.JSONDecodeError:
+        cleaned = raw_output
+        if cleaned.startswith("```json"):
+            cleaned = cleaned.replace("```json", "").replace("```", "").strip()
+        elif cleaned.startswith("```"):
+            cleaned = cleaned.replace("```", "").strip()
 
-    # 🪓 Split long paragraphs in lesson_content before sending to LLM
+        cleaned = cleaned.replace("“", "\"").replace("”", "\"").replace("‘", "'").replace("’", "'")
+
+        print("\n🧹 Cleaned slide structure:")
+        return json.loads(cleaned)
+
+def split_lesson_paragraphs(lesson_content):
+    """Non-empty paragraphs, with long ones split at sentence boundaries (<= 550 chars)."""
     processed_paragraphs = []
     for para in lesson_content.split("\n"):
         para = para.strip()
@@ -80,51 +97,67 @@ def generate_modified_lesson_content(lesson_content, lesson_objective, language_
             processed_paragraphs.extend(split_paragraph_by_sentence_limit(para, max_chars=550))
         else:
             processed_paragraphs.append(para)
+    return processed_paragraphs
+
+# Both slide calls open with the same system message and lesson context, so the
+# provider's prompt cache can reuse that prefix; the task-specific template follows.
+SLIDES_SYSTEM_PROMPT = (
+    "You are an expert instructional designer generating slide-ready lesson content. "
+    "Return only a valid JSON list of objects with 'title' and 'content'. "
+    "Do NOT include markdown, triple backticks or extra text."
+)
+SLIDE_CONTEXT_REF = "(see lesson_content in the shared lesson context above)"
+
+def build_slide_context(processed_paragraphs, lesson_objective, language_objective) -> str:
+    return (
+        "## Shared Lesson Context\n\n"
+        f"lesson_objective: {lesson_objective}\n"
+        f"language_objective: {language_objective}\n"
+        f"lesson_content (paragraphs in order): {processed_paragraphs}"
+    )
 
-    # 🧱 Rebuild lesson_content with cleaned paragraphs
-    #lesson_content_split = "\n\n".join(processed_paragraphs)
+def build_slide_messages(shared_context: str, filled_prompt: str) -> list:
+    return [
+        {"role": "system", "content": SLIDES_SYSTEM_PROMPT},
+        {"role": "user", "content": shared_context},
+        {"role": "user", "content": filled_prompt},
+    ]
 
-    # 🧠 Prompt with updated content
+async def generate_modified_lesson_content(lesson_content, lesson_objective, language_objective, i_do_teacher, use_cache=True,
+                                           processed_paragraphs=None):
+    """
+    Generate slide‑ready modified lesson content aligned with objectives.
+    Pass processed_paragraphs when split_lesson_paragraphs already ran on lesson_content.
+    """
+    prompt_template = load_prompt("modify_lesson_content")
+
+    # 🪓 Split long paragraphs in lesson_content before sending to LLM
+    if processed_paragraphs is None:
+        processed_paragraphs = split_lesson_paragraphs(lesson_content)
+
+    # 🧠 Task prompt; the lesson itself is in the shared context message
     filled_prompt = prompt_template.format(
-        lesson_content=processed_paragraphs,
+        lesson_content=SLIDE_CONTEXT_REF,
         lesson_objective=lesson_objective,
         language_objective=language_objective,
         i_do_teacher=i_do_teacher
     )
 
     # 🧠 LLM Call
-    response = client.chat.completions.create(
+    raw_output = await cached_chat_completion(
+        client,
         model="gpt-4o",
-        messages=[
-            {
-                "role": "system",
-                "content": (
-                    "You are a curriculum adaptation expert generating slide-ready rewritten lesson content. "
-                    "Return only valid JSON with 'title' and 'content'. Do NOT include markdown or triple backticks."
-                )
-            },
-            {"role": "user", "content": filled_prompt}
-        ],
-        temperature=0.7
+        messages=build_slide_messages(
+            build_slide_context(processed_paragraphs, lesson_objective, language_objective), filled_prompt
+        ),
+        temperature=0.7,
+        use_cache=use_cache,
+        validate=parse_slide_json,
+        cache_tag=prompt_version("modify_lesson_content"),
+        label="slides_modified_lesson"
     )
 
-    raw_output = response.choices[0].message.content.strip()
-
-
-    try:
-        sanitized_slides = json.loads(raw_output)
-    except json.JSONDecodeError:
-        cleaned = raw_output.strip()
-        if cleaned.startswith("```json"):
-            cleaned = cleaned.replace("```json", "").replace("```", "").strip()
-        elif cleaned.startswith("```"):
-            cleaned = cleaned.replace("```", "").strip()
-
-        cleaned = cleaned.replace("“", "\"").replace("”", "\"").replace("‘", "'").replace("’", "'")
-
-        print("\n🧹 Cleaned base slide structure:")
-
-        sanitized_slides = json.loads(cleaned)
+    sanitized_slides = parse_slide_json(raw_output)
 
     print(f"✅ Base Slide Structure Generated: {len(sanitized_slides)}")
     return sanitized_slides, processed_paragraphs
@@ -133,49 +166,38 @@ def generate_modified_lesson_content(lesson_content, lesson_objective, language_
 # ------------------------------------------------------------
 # SECOND LLM CALL → Generate Main Lesson Slide Structure
 # ------------------------------------------------------------
-def generate_base_slide_structure(lesson_objective, language_objective, lesson_content, intro_teacher, we_do_teacher):
+async def generate_base_slide_structure(lesson_objective, language_objective, lesson_content, intro_teacher, we_do_teacher, use_cache=True,
+                                        processed_paragraphs=None):
     """
     Step 2: Generate the core slide structure (title, engager, I DO, WE DO, etc.)
     without including the modified lesson slides.
+    Pass processed_paragraphs when split_lesson_paragraphs already ran on lesson_content.
     """
+    if processed_paragraphs is None:
+        processed_paragraphs = split_lesson_paragraphs(lesson_content)
     prompt_template = load_prompt("slide_deck")  # New prompt file (see below)
     filled_prompt = prompt_template.format(
         lesson_objective=lesson_objective,
         language_objective=language_objective,
-        lesson_content=lesson_content,
+        lesson_content=SLIDE_CONTEXT_REF,
         intro_teacher=intro_teacher,
         we_do_teacher=we_do_teacher
     )
 
-    response = client.chat.completions.create(
+    raw_output = await cached_chat_completion(
+        client,
         model="gpt-4o",
-        messages=[
-            {
-                "role": "system",
-                "content": "You are an expert instructional designer. Return only valid JSON with 'title' and 'content'. No markdown or extra text."
-            },
-            {"role": "user", "content": filled_prompt}
-        ],
-        temperature=0.7
+        messages=build_slide_messages(
+            build_slide_context(processed_paragraphs, lesson_objective, language_objective), filled_prompt
+        ),
+        temperature=0.7,
+        use_cache=use_cache,
+        validate=parse_slide_json,
+        cache_tag=prompt_version("slide_deck"),
+        label="slides_base_structure"
     )
 
-    raw_output = response.choices[0].message.content.strip()
-
-    try:
-        base_slides = json.loads(raw_output)
-    except json.JSONDecodeError:
-        cleaned = raw_output.strip()
-        if cleaned.startswith("```json"):
-            cleaned = cleaned.replace("```json", "").replace("```", "").strip()
-        elif cleaned.startswith("```"):
-            cleaned = cleaned.replace("```", "").strip()
-
-        cleaned = cleaned.replace("“", "\"").replace("”", "\"").replace("‘", "'").replace("’", "'")
-
-        print("\n🧹 Cleaned base slide structure:")
-        print(cleaned)
-
-        base_slides = json.loads(cleaned)
+    base_slides = parse_slide_json(raw_output)
 
     print(f"✅ Base Slide Structure Generated: {len(base_slides)}")
     return base_slides
@@ -184,28 +206,36 @@ def generate_base_slide_structure(lesson_objective, language_objective, lesson_c
 # ------------------------------------------------------------
 # FINAL COMBINED FUNCTION → Merge Slides
 # ------------------------------------------------------------
-def generate_slide_content(lesson_objective, language_objective, lesson_content, intro_teacher, i_do_teacher, we_do_teacher):
+async def generate_slide_content(lesson_objective, language_objective, lesson_content, intro_teacher, i_do_teacher, we_do_teacher, use_cache=True):
     """
     Full pipeline:
       1️⃣ Generate modified lesson slides (LLM #1)
       2️⃣ Generate base slide structure (LLM #2)
       3️⃣ Insert modified slides right after 'I DO – Teacher Modeling'
+    Steps 1 and 2 are independent, so both LLM calls run concurrently; the
+    lesson is split into paragraphs once and shared by both prompts.
     """
-    # Step 1: Modified lesson slides
-    modified_slides, processed_paragraphs = generate_modified_lesson_content(
-        lesson_content=lesson_content,
-        lesson_objective=lesson_objective,
-        language_objective=language_objective,
-        i_do_teacher=i_do_teacher
-    )
-
-    # Step 2: Main structure slides
-    base_slides = generate_base_slide_structure(
-        lesson_objective=lesson_objective,
-        language_objective=language_objective,
-        lesson_content=lesson_content,
-        intro_teacher=intro_teacher,
-        we_do_teacher=we_do_teacher
+    processed_paragraphs = split_lesson_paragraphs(lesson_content)
+
+    # Steps 1 + 2: Modified lesson slides and main structure slides
+    (modified_slides, _), base_slides = await asyncio.gather(
+        generate_modified_lesson_content(
+            lesson_content=lesson_content,
+            lesson_objective=lesson_objective,
+            language_objective=language_objective,
+            i_do_teacher=i_do_teacher,
+            use_cache=use_cache,
+            processed_paragraphs=processed_paragraphs
+        ),
+        generate_base_slide_structure(
+            lesson_objective=lesson_objective,
+            language_objective=language_objective,
+            lesson_content=lesson_content,
+            intro_teacher=intro_teacher,
+            we_do_teacher=we_do_teacher,
+            use_cache=use_cache,
+            processed_paragraphs=processed_paragraphs
+        )
     )
 
     # Step 3: Find index of “I DO – Teacher Modeling” slide
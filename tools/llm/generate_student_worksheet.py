@@ -1,19 +1,33 @@
 import os
 import json
-from openai import OpenAI
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 from tools.llm.generate_sections import load_prompt
+from tools.llm.prompts import prompt_version
+from tools.llm.cache import cached_chat_completion
 
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-def generate_student_worksheet_sections(
+def parse_worksheet_json(raw_output: str) -> list:
+    """Parse the LLM's worksheet JSON, tolerating code fences and smart quotes."""
+    raw_output = raw_output.strip()
+    try:
+        return json.loads(raw_output)
+    except json.JSONDecodeError:
+        cleaned = raw_output.replace("“", "\"").replace("”", "\"").replace("‘", "'").replace("’", "'").strip()
+        if cleaned.startswith("```"):
+            cleaned = cleaned.replace("```json", "").replace("```", "").strip()
+        return json.loads(cleaned)
+
+async def generate_student_worksheet_sections(
     intro_student,
     i_do_student,
     we_do_student,
     you_do_student,
     lesson_content,
-    slides: list[dict] = None
+    slides: list[dict] = None,
+    use_cache: bool = True
 ):
     prompt_template = load_prompt("student_worksheet")
 
@@ -29,21 +43,18 @@ def generate_student_worksheet_sections(
         slides=slides_json_str  # ⬅️ Actual JSON list of dicts
     )
 
-    response = client.chat.completions.create(
+    raw_output = await cached_chat_completion(
+        client,
         model="gpt-4o",
         messages=[
             {"role": "system", "content": "You are an expert instructional designer. Use all content below to generate worksheet sections. Return only a valid JSON list. No markdown or backticks."},
             {"role": "user", "content": filled_prompt}
         ],
-        temperature=0.7
+        temperature=0.7,
+        use_cache=use_cache,
+        validate=parse_worksheet_json,
+        cache_tag=prompt_version("student_worksheet"),
+        label="student_worksheet"
     )
 
-    raw_output = response.choices[0].message.content.strip()
-
-    try:
-        return json.loads(raw_output)
-    except json.JSONDecodeError:
-        cleaned = raw_output.replace("“", "\"").replace("”", "\"").replace("‘", "'").replace("’", "'").strip()
-        if cleaned.startswith("```"):
-            cleaned = cleaned.replace("```json", "").replace("```", "").strip()
-        return json.loads(cleaned)
+    return parse_worksheet_json(raw_output)
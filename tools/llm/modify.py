@@ -1,19 +1,24 @@
 # tools/llm/modify.py
 
 import os
-from openai import OpenAI
-from typing import List
+from openai import AsyncOpenAI
+from typing import Callable, List, Optional
+from tools.llm.cache import cached_chat_completion
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY)
+client = AsyncOpenAI(api_key=OPENAI_API_KEY)
 
-def modify_lesson_content(text: str, rules: List[str]) -> str:
+async def modify_lesson_content(text: str, rules: List[str], use_cache: bool = True,
+                                on_delta: Optional[Callable[[str], None]] = None) -> str:
     """
     Uses GPT‑4o to apply lesson adaptation rules to the input lesson content.
     Produces a structured output: Engager → I Do → We Do → You Do.
     Enforces side-by-side translations or accessibility features if required.
+    Pass on_delta to receive the output as it streams in.
     """
-    prompt = f"""
+    # Rules and guidelines are identical for every day of a lesson and lead the
+    # prompt, so the provider's prompt cache serves them after the first day.
+    instructions = f"""
 You are an expert inclusive education designer who adapts lessons for multilingual and special‑needs learners.
 
 == Student Profile Rules ==
@@ -73,7 +78,8 @@ Apply *all relevant rules*, including any language‑ or accessibility‑specifi
 - Maintain clear structure with H1 for title, H2 for sections, H3 for subheadings, and normal text elsewhere.
 - Keep the tone teacher-like, expressive, and friendly.
 - Avoid summarizing — this must feel like a teacher leading a full story reading session.
-
+"""
+    lesson_input = f"""
 == LESSON INPUT ==
 \"\"\"{text}\"\"\"
 
@@ -81,7 +87,8 @@ Now produce the fully modified lesson based on the student profile rules.
 """
 
     try:
-        response = client.chat.completions.create(
+        content = await cached_chat_completion(
+            client,
             model="gpt-4o",
             messages=[
                 {
@@ -91,19 +98,24 @@ Now produce the fully modified lesson based on the student profile rules.
                         "You must always apply bilingual or accessibility modifications when requested."
                     )
                 },
-                {"role": "user", "content": prompt}
+                {"role": "user", "content": instructions},
+                {"role": "user", "content": lesson_input}
             ],
             temperature=0.4,
-            timeout=60
+            timeout=60,
+            use_cache=use_cache,
+            on_delta=on_delta,
+            label="modify_lesson"
         )
-        return response.choices[0].message.content.strip()
+        return content.strip()
 
     except Exception as e:
         raise RuntimeError(f"Failed to modify lesson with LLM: {str(e)}")
     
 
 
-def modify_lesson_content_worksheet(text: str, rules: List[str]) -> str:
+async def modify_lesson_content_worksheet(text: str, rules: List[str], use_cache: bool = True,
+                                          on_delta: Optional[Callable[[str], None]] = None) -> str:
     """
     Uses GPT‑4o to adapt worksheet content (questions, instructions, or exercises)
     according to the provided student adaptation rules.
@@ -114,7 +126,7 @@ def modify_lesson_content_worksheet(text: str, rules: List[str]) -> str:
     - Keeps the original worksheet’s logical structure (no Engager/I Do/We Do/You Do).
     """
 
-    prompt = f"""
+    instructions = f"""
 You are an expert inclusive education designer adapting **worksheet content** for multilingual and special-needs students.
 
 == Student Profile Rules ==
@@ -166,20 +178,22 @@ Adapt the following worksheet into valid, clean **Markdown format** with clear h
    - Add unrelated content or remove exercises
    - Use Engager/I Do/We Do structure (this is a worksheet)
 
-== WORKSHEET INPUT ==
-\"\"\"{text}\"\"\"
-
 == OUTPUT REQUIREMENTS ==
 - Output must be clean, valid Markdown.
 - Use `##` for section headings, `###` for questions, plain text for options.
 - Insert translated versions and `[Insert Audio: ...]` only if required by student profile rules.
 - Do NOT use any Markdown code fences or triple backticks in the output.
+"""
+    worksheet_input = f"""
+== WORKSHEET INPUT ==
+\"\"\"{text}\"\"\"
 
 Now output the fully adapted worksheet in Markdown format only.
 """
 
     try:
-        response = client.chat.completions.create(
+        content = await cached_chat_completion(
+            client,
             model="gpt-4o",
             messages=[
                 {
@@ -190,13 +204,17 @@ Now output the fully adapted worksheet in Markdown format only.
                         "keeping the structure unchanged while adding supports and placeholders."
                     )
                 },
-                {"role": "user", "content": prompt}
+                {"role": "user", "content": instructions},
+                {"role": "user", "content": worksheet_input}
             ],
             temperature=0.4,
-            timeout=60
+            timeout=60,
+            use_cache=use_cache,
+            on_delta=on_delta,
+            label="modify_worksheet"
         )
 
-        return response.choices[0].message.content.strip()
+        return content.strip()
 
     except Exception as e:
         raise RuntimeError(f"Failed to modify worksheet with LLM: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,119 @@
+# tools/llm/prompts.py
+
+import os
+import hashlib
+import threading
+from string import Formatter
+from typing import Dict, Optional
+
+PROMPTS_DIR = os.getenv("PROMPTS_DIR", "prompts")
+
+# -----------------------------
+# Placeholders each caller passes to str.format()
+# -----------------------------
+SECTION_FIELDS = frozenset({
+    "student_profile", "lesson_content", "lesson_objective", "language_objective", "target_language",
+    "related_services", "disability_category", "mobility_needs", "health_needs", "management_needs",
+    "peer_participation", "grade_level", "student_interests", "dominant_language",
+    "intro_teacher", "i_do_teacher", "we_do_teacher", "you_do_teacher",
+})
+
+PROMPT_FIELDS: Dict[str, frozenset] = {
+    **{name: SECTION_FIELDS for name in [
+        "standards", "content", "language", "purpose",
+        "intro_teacher", "i_do_teacher", "we_do_teacher", "you_do_teacher",
+        "intro_student", "i_do_student", "we_do_student", "you_do_student",
+    ]},
+    "modify_lesson_content": frozenset({"lesson_content", "lesson_objective", "language_objective", "i_do_teacher"}),
+    "slide_deck": frozenset({"lesson_objective", "language_objective", "lesson_content", "intro_teacher", "we_do_teacher"}),
+    "student_worksheet": frozenset({"intro_student", "i_do_student", "we_do_student", "you_do_student", "lesson_content", "slides"}),
+}
+
+_lock = threading.Lock()
+_registry: Dict[str, dict] = {}  # name -> {"text", "fields", "version", "mtime"}
+
+def template_fields(text: str) -> set:
+    """Top-level placeholder names in a str.format template ('{a.b}' → 'a')."""
+    names = set()
+    for _, field, _, _ in Formatter().parse(text):
+        if field is None:
+            continue
+        base = field.split(".", 1)[0].split("[", 1)[0]
+        if not base or base.isdigit():
+            raise ValueError(f"positional placeholder '{{{field}}}' is not supported")
+        names.add(base)
+    return names
+
+def _compile(name: str, path: str, mtime: int) -> dict:
+    with open(path, "r") as f:
+        text = f.read()
+
+    try:
+        fields = template_fields(text)
+    except ValueError as e:
+        raise ValueError(f"Prompt '{name}' is not a valid template: {e}")
+
+    allowed = PROMPT_FIELDS.get(name)
+    if allowed is not None and not fields <= allowed:
+        unknown = ", ".join(sorted(fields - allowed))
+        raise ValueError(f"Prompt '{name}' uses placeholders its caller does not pass: {unknown}")
+
+    return {
+        "text": text,
+        "fields": frozenset(fields),
+        "version": hashlib.sha256(text.encode("utf-8")).hexdigest()[:16],
+        "mtime": mtime,
+    }
+
+def get_prompt(name: str) -> dict:
+    """
+    Returns the compiled template, reading the file only on first use or when
+    its mtime changes. A reload that fails validation keeps serving the last
+    good version.
+    """
+    path = os.path.join(PROMPTS_DIR, f"{name}.txt")
+    mtime = os.stat(path).st_mtime_ns
+    entry = _registry.get(name)
+    if entry is not None and entry["mtime"] == mtime:
+        return entry
+
+    with _lock:
+        entry = _registry.get(name)
+        if entry is None or entry["mtime"] != mtime:
+            try:
+                entry = _compile(name, path, mtime)
+            except ValueError:
+                if entry is None:
+                    raise
+                print(f"[Prompts] Reload of '{name}' failed validation; keeping version {entry['version']}")
+                entry = {**entry, "mtime": mtime}
+            else:
+                if name in _registry:
+                    print(f"[Prompts] Reloaded '{name}' (version {entry['version']})")
+            _registry[name] = entry
+    return entry
+
+def load_all_prompts() -> Dict[str, str]:
+    """
+    Loads and validates every known template; call at startup so a broken
+    prompt fails the deploy instead of a request. Returns {name: version}.
+    """
+    errors = []
+    for name in PROMPT_FIELDS:
+        try:
+            get_prompt(name)
+        except (OSError, ValueError) as e:
+            errors.append(str(e))
+    if errors:
+        raise ValueError("Invalid prompt templates:\n" + "\n".join(errors))
+    print(f"[Prompts] Loaded {len(PROMPT_FIELDS)} templates from {PROMPTS_DIR}/")
+    return prompt_versions()
+
+def render_prompt(name: str, **fields) -> str:
+    return get_prompt(name)["text"].format(**fields)
+
+def prompt_version(name: str) -> str:
+    return get_prompt(name)["version"]
+
+def prompt_versions(names: Optional[list] = None) -> Dict[str, str]:
+    return {name: prompt_version(name) for name in (names or PROMPT_FIELDS)}
@@ -1,92 +1,139 @@
-import os
+import io
 import uuid
-import json
 import re
-import urllib.parse
-
-FINAL_TXT_DIR = "data/outputs/final"
-FINAL_JSON_DIR = "data/outputs/json"
-FINAL_MD_DIR = "data/outputs/markdown"
-
-os.makedirs(FINAL_TXT_DIR, exist_ok=True)
-os.makedirs(FINAL_JSON_DIR, exist_ok=True)
-os.makedirs(FINAL_MD_DIR, exist_ok=True)
-
-def generate_final_output(lesson_text: str) -> dict:
-    file_id = uuid.uuid4().hex
-    txt_filename = f"final_lesson_{file_id}.txt"
-    json_filename = f"final_lesson_{file_id}.json"
-    md_filename = f"final_lesson_{file_id}.md"
-
-    txt_path = os.path.join(FINAL_TXT_DIR, txt_filename)
-    json_path = os.path.join(FINAL_JSON_DIR, json_filename)
-    md_path = os.path.join(FINAL_MD_DIR, md_filename)
-
-    enriched_text = lesson_text
-    with open(txt_path, "w") as f:
-        f.write(enriched_text)
-
-    # === Markdown Output ===
-    md_lines = []
-    lines = enriched_text.splitlines()
-
-    for line in lines:
-        stripped = line.strip()
-        if not stripped:
-            md_lines.append("")
-            continue
-
-        if stripped.lower().startswith("title:"):
-            md_lines.append(f"# {stripped.replace('Title:', '').strip()}")
-            continue
-        elif "instructions" in stripped.lower():
-            md_lines.append(f"## {stripped}")
-            continue
-        elif re.match(r"^\d+\.", stripped):
-            md_lines.append(f"### {stripped}")
-            continue
-        elif stripped.endswith(":"):
-            md_lines.append(f"**{stripped}**")
-            continue
-
-        # Preserve placeholders as plain text
-        audio_match = re.search(r"\[Insert Audio:\s*(.+?)\]", stripped)
-        if audio_match:
-            md_lines.append(f"🔊 [Insert Audio: {audio_match.group(1).strip()}]")
-            continue
-
-        image_match = re.search(r"\[Insert Image:\s*(.+?)\]", stripped)
-        if image_match:
-            md_lines.append(f"🔍 [Insert Image: {image_match.group(1).strip()}]")
-            continue
-
-        md_lines.append(stripped)
-
-    with open(md_path, "w") as md:
-        md.write("\n\n".join(md_lines))
-
-    # === JSON Output ===
+from json.encoder import encode_basestring as encode_json_string
+from typing import List, NamedTuple, Optional, TextIO
+from utils.artifact_store import put_text, record_media_references
+
+# Artifact kinds (top-level folders of the artifact store)
+FINAL_TXT_KIND = "final"
+FINAL_JSON_KIND = "json"
+FINAL_MD_KIND = "markdown"
+
+AUDIO_PLACEHOLDER = re.compile(r"\[Insert Audio:\s*(.+?)\]")
+IMAGE_PLACEHOLDER = re.compile(r"\[Insert Image:\s*(.+?)\]")
+NUMBERED_LINE = re.compile(r"\d+\.")
+PLACEHOLDER_MARKER = "[Insert "  # cheap pre-check before running the placeholder patterns
+
+class Block(NamedTuple):
+    """
+    One line of the lesson. `kind` drives the markdown rendering: blank,
+    heading (level 1-3), label, audio, image or text. `audio` / `image`
+    hold a placeholder found anywhere on the line; the JSON output uses
+    them even when the line renders as a heading or label.
+    """
+    kind: str
+    line: str                      # stripped source line
+    text: str = ""                 # markdown text (heading text without the "Title:" prefix)
+    level: int = 0
+    audio: Optional[str] = None
+    image: Optional[str] = None
+
+BLANK = Block("blank", "")
+
+def parse_blocks(lesson_text: str) -> List[Block]:
+    """Classifies every line of the lesson in a single pass."""
     blocks = []
-    for line in lines:
-        audio_match = re.search(r"\[Insert Audio:\s*(.+?)\]", line)
-        if audio_match:
-            blocks.append({"type": "audio", "placeholder": audio_match.group(1).strip()})
-            continue
-
-        image_match = re.search(r"\[Insert Image:\s*(.+?)\]", line)
-        if image_match:
-            blocks.append({"type": "image", "placeholder": image_match.group(1).strip()})
+    for raw in lesson_text.splitlines():
+        line = raw.strip()
+        if not line:
+            blocks.append(BLANK)
             continue
 
-        text_content = line.strip()
-        if text_content:
-            blocks.append({"type": "text", "content": text_content})
-
-    with open(json_path, "w") as jf:
-        json.dump(blocks, jf, ensure_ascii=False, indent=2)
+        audio = image = None
+        if PLACEHOLDER_MARKER in line:
+            audio_match = AUDIO_PLACEHOLDER.search(line)
+            if audio_match:
+                audio = audio_match.group(1).strip()
+            else:
+                image_match = IMAGE_PLACEHOLDER.search(line)
+                image = image_match.group(1).strip() if image_match else None
+
+        lower = line.lower()
+        if lower.startswith("title:"):
+            blocks.append(Block("heading", line, line.replace("Title:", "").strip(), 1, audio, image))
+        elif "instructions" in lower:
+            blocks.append(Block("heading", line, line, 2, audio, image))
+        elif NUMBERED_LINE.match(line):
+            blocks.append(Block("heading", line, line, 3, audio, image))
+        elif line.endswith(":"):
+            blocks.append(Block("label", line, line, 0, audio, image))
+        elif audio is not None:
+            blocks.append(Block("audio", line, audio, 0, audio))
+        elif image is not None:
+            blocks.append(Block("image", line, image, 0, None, image))
+        else:
+            blocks.append(Block("text", line, line))
+    return blocks
+
+def _markdown_line(block: Block) -> str:
+    if block.kind == "heading":
+        return f"{'#' * block.level} {block.text}"
+    if block.kind == "label":
+        return f"**{block.text}**"
+    # Placeholders stay plain text so the editor can resolve them later
+    if block.kind == "audio":
+        return f"🔊 [Insert Audio: {block.text}]"
+    if block.kind == "image":
+        return f"🔍 [Insert Image: {block.text}]"
+    return block.text
+
+def render_markdown(blocks: List[Block], out: TextIO):
+    """Markdown with one paragraph per source line (blank lines become empty paragraphs)."""
+    for i, block in enumerate(blocks):
+        if i:
+            out.write("\n\n")
+        out.write(_markdown_line(block))
+
+def json_blocks(blocks: List[Block]) -> List[dict]:
+    """The editor's structured form: audio / image placeholders and text lines."""
+    result = []
+    for block in blocks:
+        if block.audio is not None:
+            result.append({"type": "audio", "placeholder": block.audio})
+        elif block.image is not None:
+            result.append({"type": "image", "placeholder": block.image})
+        elif block.kind != "blank":
+            result.append({"type": "text", "content": block.line})
+    return result
+
+def render_json(blocks: List[Block], out: TextIO):
+    """
+    Same text as json.dump(json_blocks(blocks), out, ensure_ascii=False, indent=2).
+    The objects are flat string maps, so they are written directly with the
+    C string encoder instead of the pure-Python indenting encoder.
+    """
+    items = json_blocks(blocks)
+    if not items:
+        out.write("[]")
+        return
+    out.write("[\n")
+    for i, item in enumerate(items):
+        if i:
+            out.write(",\n")
+        out.write("  {\n")
+        out.write(",\n".join(f"    {encode_json_string(k)}: {encode_json_string(v)}" for k, v in item.items()))
+        out.write("\n  }")
+    out.write("\n]")
+
+def render_final_output(lesson_text: str) -> dict:
+    """Renders the txt / md / json outputs in memory; returns {"txt", "md", "json"} strings."""
+    blocks = parse_blocks(lesson_text)
+    md, js = io.StringIO(), io.StringIO()
+    render_markdown(blocks, md)
+    render_json(blocks, js)
+    return {"txt": lesson_text, "md": md.getvalue(), "json": js.getvalue()}
 
+def generate_final_output(lesson_text: str) -> dict:
+    """
+    Stores the lesson as .txt, .md and .json artifacts and returns their keys.
+    The audio and images it links to are recorded so GC keeps them with it.
+    """
+    file_id = uuid.uuid4().hex
+    rendered = render_final_output(lesson_text)
+    record_media_references(lesson_text)
     return {
-        "txt_path": txt_path,
-        "json_path": json_path,
-        "md_path": md_path
-    }
\ No newline at end of file
+        "txt_path": put_text(FINAL_TXT_KIND, f"final_lesson_{file_id}.txt", rendered["txt"]),
+        "json_path": put_text(FINAL_JSON_KIND, f"final_lesson_{file_id}.json", rendered["json"]),
+        "md_path": put_text(FINAL_MD_KIND, f"final_lesson_{file_id}.md", rendered["md"]),
+    }
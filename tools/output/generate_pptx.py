@@ -2,8 +2,38 @@ from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
 from pptx.dml.color import RGBColor
-import os
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls
+from pptx.text.text import _Paragraph
+import io
+import copy
 import uuid
+from utils.artifact_store import put_artifact
+
+BLUE = RGBColor(0, 102, 204)
+RED = RGBColor(255, 0, 0)
+BLACK = RGBColor(0, 0, 0)
+
+# (color, bold, center) -> <a:p> holding one formatted, empty run
+_line_templates = {}
+
+def _line_template(color, bold, center):
+    """
+    A content line's paragraph (alignment, Poppins 16pt, color, bold), built
+    once with python-pptx; each line deep-copies it and sets the run text.
+    """
+    key = (color, bold, center)
+    template = _line_templates.get(key)
+    if template is None:
+        paragraph = _Paragraph(parse_xml(f"<a:p {nsdecls('a')}/>"), None)
+        paragraph.alignment = PP_ALIGN.CENTER if center else PP_ALIGN.LEFT
+        run = paragraph.add_run()
+        run.font.size = Pt(16)
+        run.font.name = "Poppins"
+        run.font.color.rgb = color
+        run.font.bold = bold
+        template = _line_templates[key] = paragraph._p
+    return template
 
 
 # -----------------------------------------------------------
@@ -39,27 +69,28 @@ def _set_formatted_content(text_frame, content, center=False):
         part4 = content[second_single:].strip() if second_single != -1 else ""
 
         styled_parts = [
-            (part1, RGBColor(0, 102, 204), False),  # 🔵 Blue
-            (part2, RGBColor(0, 102, 204), True),   # 🔵 Blue Bold
-            ("__SPACER__", None, None),             # Two blank lines after \n\n
-            (part3, RGBColor(255, 0, 0), False),    # 🔴 Red
-            (part4, RGBColor(255, 0, 0), True),     # 🔴 Red Bold
+            (part1, BLUE, False),          # 🔵 Blue
+            (part2, BLUE, True),           # 🔵 Blue Bold
+            ("__SPACER__", None, None),    # Two blank lines after \n\n
+            (part3, RED, False),           # 🔴 Red
+            (part4, RED, True),            # 🔴 Red Bold
         ]
 
     # Case 2: Only '\n\n' present
     elif "\n\n" in content:
         english_part, translation_part = content.split("\n\n", 1)
         styled_parts = [
-            (english_part.strip(), RGBColor(0, 102, 204), False),  # 🔵 Blue
-            ("__SPACER__", None, None),                            # Spacer
-            (translation_part.strip(), RGBColor(255, 0, 0), False)  # 🔴 Red
+            (english_part.strip(), BLUE, False),       # 🔵 Blue
+            ("__SPACER__", None, None),                # Spacer
+            (translation_part.strip(), RED, False)     # 🔴 Red
         ]
 
     # Case 3: No split → All black
     else:
-        styled_parts = [(content.strip(), RGBColor(0, 0, 0), False)]
+        styled_parts = [(content.strip(), BLACK, False)]
 
     # Render
+    txBody = text_frame._txBody
     for text, color, bold in styled_parts:
         if text == "__SPACER__":
             for _ in range(2):  # Add 2 blank lines
@@ -69,18 +100,14 @@ def _set_formatted_content(text_frame, content, center=False):
 
         if not text:
             continue
+        template = _line_template(color, bold, center)
         for line in text.split("\n"):
             clean_line = line.strip()
             if not clean_line:
                 continue
-            p = text_frame.add_paragraph()
-            p.alignment = PP_ALIGN.CENTER if center else PP_ALIGN.LEFT
-            run = p.add_run()
-            run.text = clean_line
-            run.font.size = Pt(16)
-            run.font.name = "Poppins"
-            run.font.color.rgb = color
-            run.font.bold = bold
+            p = copy.deepcopy(template)
+            p.r_lst[0].text = clean_line
+            txBody.append(p)
 
 # -----------------------------------------------------------
 # Layout Functions
@@ -139,7 +166,8 @@ def _add_content_only_slide(prs, content):
 # -----------------------------------------------------------
 # Main Deck Generator
 # -----------------------------------------------------------
-def generate_slide_deck(slides: list) -> str:
+def render_slide_deck(slides: list) -> bytes:
+    """Builds the deck in memory and returns the .pptx bytes."""
     prs = Presentation()
 
     for slide in slides:
@@ -155,9 +183,10 @@ def generate_slide_deck(slides: list) -> str:
         else:
             _add_title_content_slide(prs, title, content)
 
-    save_dir = "data/outputs/slides"
-    os.makedirs(save_dir, exist_ok=True)
-    filename = f"lesson_slides_{uuid.uuid4().hex}.pptx"
-    path = os.path.join(save_dir, filename)
-    prs.save(path)
-    return path
\ No newline at end of file
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    return buffer.getvalue()
+
+def generate_slide_deck(slides: list) -> str:
+    """Renders the deck and stores it; returns the artifact key."""
+    return put_artifact("slides", f"lesson_slides_{uuid.uuid4().hex}.pptx", render_slide_deck(slides))
\ No newline at end of file
@@ -1,4 +1,4 @@
-import os
+import io
 import re
 import uuid
 from docx import Document
@@ -6,6 +6,7 @@ from docx.shared import Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml import OxmlElement
 from docx.oxml.ns import qn
+from utils.artifact_store import put_artifact
 
 
 
@@ -26,7 +27,8 @@ def add_horizontal_line(doc):
     border.append(bottom)
     p_props.append(border)
 
-def generate_student_worksheet_doc(sections: list) -> str:
+def render_student_worksheet_doc(sections: list) -> bytes:
+    """Builds the worksheet in memory and returns the .docx bytes."""
     doc = Document()
 
     # --- Title ---
@@ -102,10 +104,10 @@ def generate_student_worksheet_doc(sections: list) -> str:
         doc.add_paragraph()  # Spacer
 
     # --- Save the file ---
-    save_dir = "data/outputs/worksheets"
-    os.makedirs(save_dir, exist_ok=True)
-    filename = f"student_worksheet_{uuid.uuid4().hex}.docx"
-    path = os.path.join(save_dir, filename)
-    doc.save(path)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
 
-    return path
\ No newline at end of file
+def generate_student_worksheet_doc(sections: list) -> str:
+    """Renders the worksheet and stores it; returns the artifact key."""
+    return put_artifact("worksheets", f"student_worksheet_{uuid.uuid4().hex}.docx", render_student_worksheet_doc(sections))
\ No newline at end of file
@@ -1,15 +1,16 @@
-import os
+import io
 import uuid
 from docx import Document
 from docx.shared import Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from typing import List
+from utils.artifact_store import put_artifact
 
-OUTPUT_DIR = "data/outputs/source_materials"
+ARTIFACT_KIND = "source_materials"
 
-def save_source_material_doc(processed_paragraphs: List[str]) -> str:
+def render_source_material_doc(processed_paragraphs: List[str]) -> bytes:
     """
-    Save processed lesson paragraphs into a formatted Word document.
+    Processed lesson paragraphs as a formatted Word document (.docx bytes).
     Title: 'Source Material Text' (Poppins, 24pt Bold)
     Paragraphs: Poppins, 14pt, separated by line breaks
     """
@@ -39,11 +40,14 @@ def save_source_material_doc(processed_paragraphs: List[str]) -> str:
         run.font.color.rgb = RGBColor(0, 0, 0)
         doc.add_paragraph()  # Blank line between paragraphs
 
-    # 💾 Save
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    filename = f"source_material_{uuid.uuid4().hex}.docx"
-    path = os.path.join(OUTPUT_DIR, filename)
-    doc.save(path)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+def save_source_material_doc(processed_paragraphs: List[str]) -> str:
+    """Renders the source material document and stores it; returns the artifact key."""
+    path = put_artifact(ARTIFACT_KIND, f"source_material_{uuid.uuid4().hex}.docx",
+                        render_source_material_doc(processed_paragraphs))
 
     print(f"✅ Source material document saved at: {path}")
     return path
\ No newline at end of file
@@ -1,7 +1,16 @@
 import os
+import time
 import uuid
-import requests
-from typing import List
+import socket
+import asyncio
+import hashlib
+import ipaddress
+import threading
+import httpx
+import httpcore
+from collections import OrderedDict
+from typing import List, Optional
+from urllib.parse import urljoin, urlparse
 from serpapi import GoogleSearch
 
 # Directory to store downloaded images
@@ -12,14 +21,94 @@ os.makedirs(IMAGE_OUTPUT_DIR, exist_ok=True)
 SERPAPI_KEY = os.getenv("SERPAPI_API_KEY")
 BASE_IMAGE_URL = "https://langgraph-lesson-modifier.onrender.com/images/"
 
-def get_image_urls_from_serpapi(query: str, count: int = 1) -> List[str]:
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(10 * 1024 * 1024)))  # 10 MB per image
+IMAGE_DOWNLOAD_CONCURRENCY = int(os.getenv("IMAGE_DOWNLOAD_CONCURRENCY", "5"))
+IMAGE_QUERY_TTL_SECONDS = int(os.getenv("IMAGE_QUERY_TTL_SECONDS", str(24 * 3600)))
+IMAGE_QUERY_CACHE_SIZE = 512
+IMAGE_RESULT_CACHE_SIZE = 4096          # search results that can still be committed by id
+IMAGE_MAX_REDIRECTS = 5
+
+# Raster types only: stored images are served same-origin under /images, so
+# SVG (which can carry script) and untyped responses are never stored.
+IMAGE_EXTENSIONS = {
+    "image/jpeg": ".jpg", "image/jpg": ".jpg", "image/png": ".png", "image/gif": ".gif",
+    "image/webp": ".webp", "image/bmp": ".bmp",
+}
+
+# -----------------------------
+# Query → search result cache (TTL + LRU)
+# -----------------------------
+_query_lock = threading.Lock()
+_query_cache: "OrderedDict[tuple, tuple]" = OrderedDict()  # (query, count) -> (expires_at, results)
+
+def _cached_query(key: tuple) -> Optional[List[dict]]:
+    with _query_lock:
+        entry = _query_cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.time():
+            del _query_cache[key]
+            return None
+        _query_cache.move_to_end(key)
+        return [dict(result) for result in entry[1]]
+
+def _store_query(key: tuple, results: List[dict]):
+    with _query_lock:
+        _query_cache[key] = (time.time() + IMAGE_QUERY_TTL_SECONDS, tuple(results))
+        _query_cache.move_to_end(key)
+        while len(_query_cache) > IMAGE_QUERY_CACHE_SIZE:
+            _query_cache.popitem(last=False)
+
+# -----------------------------
+# Result id → URLs the server itself got from the search (TTL + LRU)
+# -----------------------------
+_result_cache: "OrderedDict[str, tuple]" = OrderedDict()  # id -> (expires_at, original_url, thumbnail_url)
+
+def _remember_results(images: List[dict]):
+    with _query_lock:
+        for image in images:
+            _result_cache[image["id"]] = (time.time() + IMAGE_QUERY_TTL_SECONDS, image["original_url"], image["thumbnail_url"])
+            _result_cache.move_to_end(image["id"])
+        while len(_result_cache) > IMAGE_RESULT_CACHE_SIZE:
+            _result_cache.popitem(last=False)
+
+def search_result_urls(result_id: str) -> Optional[tuple]:
+    """(original_url, thumbnail_url) of a result returned by a recent search, else None."""
+    with _query_lock:
+        entry = _result_cache.get(result_id)
+        if entry is None or entry[0] < time.time():
+            return None
+        return entry[1], entry[2]
+
+def _image_metadata(img: dict) -> dict:
+    return {
+        "id": hashlib.sha256(img["original"].encode("utf-8")).hexdigest()[:32],
+        "title": img.get("title", ""),
+        "source": img.get("source", ""),
+        "thumbnail_url": img.get("thumbnail") or img.get("original"),
+        "original_url": img.get("original"),
+        "width": img.get("original_width"),
+        "height": img.get("original_height"),
+    }
+
+def search_image_metadata(query: str, count: int = 1) -> List[dict]:
     """
-    Fetch image URLs from Google Images using SerpAPI.
+    Image search results from Google Images via SerpAPI, as metadata with
+    thumbnail and original URLs. Nothing is downloaded. Non-empty results are
+    cached per (query, count) for IMAGE_QUERY_TTL_SECONDS, and each result's
+    `id` can be passed to commit_image for as long.
     """
     if not SERPAPI_KEY:
         print("[SerpAPI] SERPAPI_KEY is missing.")
         return []
 
+    key = (" ".join(query.casefold().split()), count)
+    cached = _cached_query(key)
+    if cached is not None:
+        print(f"[SerpAPI] Cache hit for: '{query}'")
+        _remember_results(cached)
+        return cached
+
     try:
         params = {
             "engine": "google_images",         # Correct engine for image search
@@ -35,42 +124,203 @@ def get_image_urls_from_serpapi(query: str, count: int = 1) -> List[str]:
             print(f"[SerpAPI] No results found for query: {query}")
             return []
 
-        # Extract original image URLs
-        image_urls = [img["original"] for img in results["images_results"][:count]]
-        print(f"[SerpAPI] Fetched {len(image_urls)} images for: '{query}'")
-        return image_urls
+        images = [_image_metadata(img) for img in results["images_results"][:count] if img.get("original")]
+        print(f"[SerpAPI] Fetched {len(images)} images for: '{query}'")
+        if images:
+            _store_query(key, images)
+            _remember_results(images)
+        return images
 
     except Exception as e:
         print(f"[SerpAPI] Error fetching images for '{query}': {e}")
         return []
 
-def download_images(image_urls: List[str]) -> List[str]:
+def get_image_urls_from_serpapi(query: str, count: int = 1) -> List[str]:
+    """
+    Fetch image URLs from Google Images using SerpAPI.
+    """
+    return [image["original_url"] for image in search_image_metadata(query, count)]
+
+async def search_image_urls(query: str, count: int = 1) -> List[str]:
+    """Async form of get_image_urls_from_serpapi (the SerpAPI client is blocking)."""
+    return await asyncio.to_thread(get_image_urls_from_serpapi, query, count)
+
+async def search_images_async(query: str, count: int = 1) -> List[dict]:
+    """Async form of search_image_metadata."""
+    return await asyncio.to_thread(search_image_metadata, query, count)
+
+# -----------------------------
+# Pooled, bounded, content-addressed downloads
+# -----------------------------
+_http = {"client": None, "loop": None}
+_HTTP_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+
+async def _public_addresses(host: str, port: int) -> List[str]:
+    """The addresses `host` resolves to, or [] unless all are public (no private, loopback, link-local...)."""
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except (OSError, UnicodeError):
+        return []
+    addresses = list(dict.fromkeys(info[4][0].split("%")[0] for info in infos))
+    if not addresses or not all(ipaddress.ip_address(address).is_global for address in addresses):
+        return []
+    return addresses
+
+class _PublicOnlyBackend(httpcore.AsyncNetworkBackend):
     """
-    Downloads images and returns their public URLs.
+    Resolves the host of every connection itself and connects to one of the
+    checked addresses, so a second DNS answer (rebinding) is never used.
+    TLS SNI and the Host header still carry the original hostname.
     """
-    downloaded_urls = []
-    headers = {'User-Agent': 'Mozilla/5.0'}
 
-    for url in image_urls:
-        try:
-            print(f"[Download] Downloading: {url}")
-            response = requests.get(url, headers=headers, timeout=10)
+    def __init__(self, backend: Optional[httpcore.AsyncNetworkBackend] = None):
+        self._backend = backend or httpcore.AnyIOBackend()
 
-            if response.status_code != 200:
-                print(f"[Download] Failed with status {response.status_code}")
-                continue
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        addresses = await _public_addresses(host, port)
+        if not addresses:
+            raise httpcore.ConnectError(f"Refusing non-public host: {host}")
+        for address in addresses:
+            try:
+                return await self._backend.connect_tcp(
+                    address, port, timeout=timeout, local_address=local_address, socket_options=socket_options
+                )
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+        raise error
 
-            filename = f"image_{uuid.uuid4().hex}.jpg"
-            filepath = os.path.join(IMAGE_OUTPUT_DIR, filename)
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        raise httpcore.ConnectError("Unix sockets are not used for image downloads")
 
-            with open(filepath, "wb") as f:
-                f.write(response.content)
+    async def sleep(self, seconds):
+        await self._backend.sleep(seconds)
 
-            public_url = f"{BASE_IMAGE_URL}{filename}"
-            downloaded_urls.append(public_url)
+class _PublicOnlyTransport(httpx.AsyncHTTPTransport):
+    """httpx's transport with its connection pool on _PublicOnlyBackend."""
 
-        except Exception as e:
-            print(f"[Download] Error downloading image from {url}: {e}")
+    def __init__(self, limits: httpx.Limits = _HTTP_LIMITS, network_backend: Optional[httpcore.AsyncNetworkBackend] = None):
+        super().__init__(limits=limits, trust_env=False)
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(trust_env=False),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            network_backend=network_backend or _PublicOnlyBackend(),
+        )
+
+def _http_client() -> httpx.AsyncClient:
+    """One pooled client per event loop, so connections to image hosts are reused."""
+    loop = asyncio.get_running_loop()
+    if _http["client"] is None or _http["loop"] is not loop:
+        _http["client"] = httpx.AsyncClient(
+            headers={"User-Agent": "Mozilla/5.0"},
+            timeout=httpx.Timeout(10.0),
+            follow_redirects=False,  # redirects are followed by fetch_image, one hop at a time
+            transport=_PublicOnlyTransport(),
+            trust_env=False,  # a proxy from the environment would resolve hosts itself
+        )
+        _http["loop"] = loop
+    return _http["client"]
+
+async def aclose_http_client():
+    """Closes the pooled client (app shutdown); the next download opens a new one."""
+    client, loop = _http["client"], _http["loop"]
+    _http["client"] = _http["loop"] = None
+    if client is not None and loop is asyncio.get_running_loop():  # another loop's client cannot be awaited here
+        await client.aclose()
+
+def _store_image(data: bytes, ext: str) -> str:
+    """Writes the image under its SHA-256 unless identical bytes are already stored."""
+    filename = f"image_{hashlib.sha256(data).hexdigest()[:32]}{ext}"
+    filepath = os.path.join(IMAGE_OUTPUT_DIR, filename)
+    if not os.path.exists(filepath):
+        tmp_path = os.path.join(IMAGE_OUTPUT_DIR, f".{uuid.uuid4().hex}.part")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, filepath)
+    return filename
+
+def _is_http_url(url: str) -> bool:
+    parsed = urlparse(url)
+    return parsed.scheme in ("http", "https") and bool(parsed.hostname)
+
+async def fetch_image(url: str, max_bytes: int = IMAGE_MAX_BYTES) -> Optional[str]:
+    """
+    Downloads one image (streamed, capped at max_bytes) and returns its stored
+    filename. Only public addresses are connected to (see _PublicOnlyBackend),
+    redirects included, and only raster image types in IMAGE_EXTENSIONS are stored.
+    """
+    try:
+        print(f"[Download] Downloading: {url}")
+        for _ in range(IMAGE_MAX_REDIRECTS + 1):
+            if not _is_http_url(url):
+                print(f"[Download] Refusing non-HTTP URL: {url}")
+                return None
+            async with _http_client().stream("GET", url) as response:
+                if response.is_redirect:
+                    url = urljoin(url, response.headers.get("Location", ""))
+                    continue
+                if response.status_code != 200:
+                    print(f"[Download] Failed with status {response.status_code}")
+                    return None
+
+                content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+                ext = IMAGE_EXTENSIONS.get(content_type)
+                if ext is None:
+                    print(f"[Download] Skipping unsupported content type ({content_type or 'none'}): {url}")
+                    return None
+
+                declared = response.headers.get("Content-Length")
+                if declared and declared.isdigit() and int(declared) > max_bytes:
+                    print(f"[Download] Skipping {url}: {declared} bytes exceeds {max_bytes}")
+                    return None
+
+                chunks, size = [], 0
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+                    if size > max_bytes:
+                        print(f"[Download] Skipping {url}: exceeds {max_bytes} bytes")
+                        return None
+                    chunks.append(chunk)
+
+            return await asyncio.to_thread(_store_image, b"".join(chunks), ext)
+
+        print(f"[Download] Too many redirects: {url}")
+        return None
+
+    except Exception as e:
+        print(f"[Download] Error downloading image from {url}: {e}")
+        return None
+
+async def download_images(image_urls: List[str], max_concurrency: int = IMAGE_DOWNLOAD_CONCURRENCY) -> List[str]:
+    """
+    Downloads images concurrently and returns their public URLs, in input
+    order, without failures or duplicate images.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def one(url: str) -> Optional[str]:
+        async with semaphore:
+            return await fetch_image(url)
+
+    filenames = await asyncio.gather(*(one(url) for url in image_urls))
+    downloaded_urls = [f"{BASE_IMAGE_URL}{name}" for name in dict.fromkeys(f for f in filenames if f)]
 
     print(f"[Download] Total images downloaded: {len(downloaded_urls)}")
-    return downloaded_urls
\ No newline at end of file
+    return downloaded_urls
+
+async def commit_image(result_id: str) -> Optional[str]:
+    """
+    Stores one search result, identified by the id search_image_metadata gave
+    it, and returns its public URL. Falls back to the result's thumbnail when
+    the original cannot be fetched. Raises KeyError for unknown or expired ids,
+    so clients can only commit URLs the server's own search returned.
+    """
+    urls = search_result_urls(result_id)
+    if urls is None:
+        raise KeyError(result_id)
+    for candidate in dict.fromkeys(u for u in urls if u):
+        filename = await fetch_image(candidate)
+        if filename:
+            return f"{BASE_IMAGE_URL}{filename}"
+    return None
@@ -0,0 +1,449 @@
+# utils/artifact_store.py
+
+import os
+import re
+import time
+import uuid
+import asyncio
+import hashlib
+import mimetypes
+import threading
+from collections import OrderedDict
+from contextlib import closing
+from typing import Iterator, Optional
+from utils.sqlite_utils import connect
+from utils.file_parser import EXTRACTION_CACHE_DIR
+from utils.job_queue import current_job_id, prune_finished_jobs
+
+try:
+    import boto3
+except ImportError:  # boto3 is only needed for ARTIFACT_BACKEND=s3
+    boto3 = None
+
+# -----------------------------
+# Configuration
+# -----------------------------
+ARTIFACT_ROOT = os.getenv("ARTIFACT_ROOT", "data/outputs")
+ARTIFACT_INDEX_PATH = os.getenv("ARTIFACT_INDEX_PATH", "data/cache/artifacts.sqlite3")
+ARTIFACT_BACKEND = os.getenv("ARTIFACT_BACKEND", "local")   # "local" or "s3"
+ARTIFACT_RETENTION_SECONDS = int(os.getenv("ARTIFACT_RETENTION_SECONDS", str(30 * 24 * 3600)))  # 30 days
+ARTIFACT_MAX_BYTES = int(os.getenv("ARTIFACT_MAX_BYTES", str(5 * 1024 * 1024 * 1024)))  # 5 GB
+ARTIFACT_MIN_AGE_SECONDS = 600          # never evict artifacts of a job that may still be running
+ARTIFACT_GC_INTERVAL = int(os.getenv("ARTIFACT_GC_INTERVAL", "3600"))
+ARTIFACT_TOUCH_INTERVAL = 3600          # last_accessed is refreshed at most this often per artifact
+ARTIFACT_CHUNK_SIZE = 64 * 1024
+
+# Recently written artifacts are also kept in memory so the download that
+# usually follows is served without touching the backend. With
+# ARTIFACT_PERSIST=0 they live only there (single-process deployments: other
+# workers cannot see them, and they 404 once evicted).
+ARTIFACT_MEMORY_TTL_SECONDS = int(os.getenv("ARTIFACT_MEMORY_TTL_SECONDS", "900"))
+ARTIFACT_MEMORY_MAX_BYTES = int(os.getenv("ARTIFACT_MEMORY_MAX_BYTES", str(64 * 1024 * 1024)))
+ARTIFACT_PERSIST = os.getenv("ARTIFACT_PERSIST", "1") != "0"
+
+# S3-compatible backend (AWS, MinIO, ...); credentials come from the usual AWS_* variables
+ARTIFACT_S3_BUCKET = os.getenv("ARTIFACT_S3_BUCKET", "lesson-artifacts")
+ARTIFACT_S3_ENDPOINT_URL = os.getenv("ARTIFACT_S3_ENDPOINT_URL")  # e.g. http://localhost:9000 for MinIO
+ARTIFACT_S3_PREFIX = os.getenv("ARTIFACT_S3_PREFIX", "")
+
+# Pre-store flat output folders (ARTIFACT_ROOT/<kind>/<file>): GC adopts their
+# files into the index (created_at = mtime), so the normal policy applies.
+LEGACY_OUTPUT_KINDS = ("word", "slides", "worksheets", "source_materials", "markdown", "json", "final", "files")
+
+# Regenerable caches (downloaded inputs, extracted lesson text, TTS sentence
+# segments): dropping an entry only costs a re-download / re-parse /
+# re-synthesis. Their readers refresh mtime on every hit, so GC removes
+# entries unused for CACHE_RETENTION_SECONDS.
+CACHE_TREES = ["data/inputs", EXTRACTION_CACHE_DIR, "data/outputs/audio/segments"]  # tools/audio/generate.py SEGMENT_DIR
+CACHE_RETENTION_SECONDS = int(os.getenv("CACHE_RETENTION_SECONDS", str(30 * 24 * 3600)))
+
+# Audio and images (ARTIFACT_ROOT/<kind>/<file>, served by /audio and /images)
+# are embedded in lessons by URL. Saving lesson markup records the files it
+# references (record_media_references), which restarts their retention; GC
+# indexes the rest when it first sees them, so unreferenced files are
+# collected once they are older than ARTIFACT_RETENTION_SECONDS.
+MEDIA_KINDS = ("audio", "images")
+_MEDIA_REF = re.compile(r"\[(AUDIO|IMAGE):\s*([\w.-]+)\]|/(audio|images)/([\w.-]+\.\w+)")  # marker or URL
+_MARKER_KINDS = {"AUDIO": "audio", "IMAGE": "images"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    content_type TEXT,
+    job_id TEXT,
+    created_at REAL NOT NULL,
+    last_accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_artifacts_last_accessed ON artifacts(last_accessed);
+CREATE INDEX IF NOT EXISTS idx_artifacts_created ON artifacts(created_at);
+CREATE INDEX IF NOT EXISTS idx_artifacts_job ON artifacts(job_id);
+"""
+
+_initialized = False
+_touched = {}  # key -> last touch written by this process
+
+_memory_lock = threading.Lock()
+_memory: "OrderedDict[str, dict]" = OrderedDict()  # key -> {data, content_type, etag, expires_at}
+_memory_bytes = 0
+
+def _open():
+    global _initialized
+    conn = connect(ARTIFACT_INDEX_PATH)
+    if not _initialized:
+        conn.executescript(_SCHEMA)
+        _initialized = True
+    return conn
+
+# -----------------------------
+# Backends
+# -----------------------------
+class LocalBackend:
+    """Artifacts as files under ARTIFACT_ROOT, served by the /outputs static mount."""
+
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def put(self, key: str, data: bytes, content_type: str):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = os.path.join(os.path.dirname(path), f".{uuid.uuid4().hex}.part")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def open(self, key: str) -> Iterator[bytes]:
+        with open(self.path(key), "rb") as f:
+            while chunk := f.read(ARTIFACT_CHUNK_SIZE):
+                yield chunk
+
+    def delete(self, key: str):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+class S3Backend:
+    """Artifacts as objects in an S3-compatible bucket, proxied through /outputs."""
+
+    name = "s3"
+
+    def __init__(self, bucket: str, endpoint_url: Optional[str] = None, prefix: str = ""):
+        if boto3 is None:
+            raise RuntimeError("ARTIFACT_BACKEND=s3 requires boto3 (pip install boto3)")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+        try:
+            self.client.head_bucket(Bucket=bucket)
+        except Exception:
+            self.client.create_bucket(Bucket=bucket)
+
+    def put(self, key: str, data: bytes, content_type: str):
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data, ContentType=content_type)
+
+    def open(self, key: str) -> Iterator[bytes]:
+        body = self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)["Body"]
+        try:
+            yield from body.iter_chunks(ARTIFACT_CHUNK_SIZE)
+        finally:
+            body.close()
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+_backend = None
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if ARTIFACT_BACKEND == "s3":
+            _backend = S3Backend(ARTIFACT_S3_BUCKET, ARTIFACT_S3_ENDPOINT_URL, ARTIFACT_S3_PREFIX)
+        else:
+            _backend = LocalBackend(ARTIFACT_ROOT)
+    return _backend
+
+# -----------------------------
+# Store operations (blocking, called via asyncio.to_thread)
+# -----------------------------
+def artifact_key(kind: str, filename: str) -> str:
+    """Relative key `kind/ab/filename`; the shard spreads files over 256 subdirectories."""
+    shard = hashlib.sha1(filename.encode("utf-8")).hexdigest()[:2]
+    return f"{kind}/{shard}/{filename}"
+
+# -----------------------------
+# In-memory layer (TTL + size bounded LRU)
+# -----------------------------
+def _remember(key: str, data: bytes, content_type: str):
+    global _memory_bytes
+    if len(data) > ARTIFACT_MEMORY_MAX_BYTES:
+        return
+    entry = {"data": data, "content_type": content_type, "etag": hashlib.sha256(data).hexdigest(),
+             "expires_at": time.time() + ARTIFACT_MEMORY_TTL_SECONDS}
+    with _memory_lock:
+        old = _memory.pop(key, None)
+        if old is not None:
+            _memory_bytes -= len(old["data"])
+        _memory[key] = entry
+        _memory_bytes += len(data)
+        while _memory_bytes > ARTIFACT_MEMORY_MAX_BYTES:
+            _, evicted = _memory.popitem(last=False)
+            _memory_bytes -= len(evicted["data"])
+
+def memory_artifact(key: str) -> Optional[dict]:
+    """{data, content_type, etag} of an artifact still held in memory, else None."""
+    global _memory_bytes
+    with _memory_lock:
+        entry = _memory.get(key)
+        if entry is None:
+            return None
+        if entry["expires_at"] < time.time():
+            del _memory[key]
+            _memory_bytes -= len(entry["data"])
+            return None
+        _memory.move_to_end(key)
+        return entry
+
+def put_artifact(kind: str, filename: str, data: bytes, content_type: Optional[str] = None,
+                 persist: Optional[bool] = None) -> str:
+    """
+    Stores one output file and returns its key. The index records size,
+    timestamps and the job that produced it (when running inside a job).
+    persist=False (default: ARTIFACT_PERSIST) keeps it in memory only.
+    """
+    key = artifact_key(kind, filename)
+    content_type = content_type or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    _remember(key, data, content_type)
+    if not (ARTIFACT_PERSIST if persist is None else persist):
+        print(f"[Artifacts] Kept {key} in memory ({len(data)} bytes)")
+        return key
+    get_backend().put(key, data, content_type)
+
+    now = time.time()
+    with closing(_open()) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO artifacts(key, kind, size, content_type, job_id, created_at, last_accessed) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, kind, len(data), content_type, current_job_id.get(), now, now)
+        )
+    print(f"[Artifacts] Stored {key} ({len(data)} bytes)")
+    return key
+
+def put_text(kind: str, filename: str, text: str) -> str:
+    return put_artifact(kind, filename, text.encode("utf-8"))
+
+def record_media_references(text: str) -> int:
+    """
+    Indexes the audio and image files `text` embeds, as [AUDIO:file] /
+    [IMAGE:file] markers or /audio/, /images/ URLs (created_at = now), so
+    they are kept as long as the lesson that embeds them. Returns how many
+    local files were recorded.
+    """
+    if get_backend().name != "local":
+        return 0
+    now = time.time()
+    rows = []
+    refs = (
+        (_MARKER_KINDS[marker], marker_name) if marker else (url_kind, url_name)
+        for marker, marker_name, url_kind, url_name in _MEDIA_REF.findall(text)
+    )
+    for kind, name in dict.fromkeys(refs):
+        try:
+            size = os.stat(os.path.join(ARTIFACT_ROOT, kind, name)).st_size
+        except OSError:
+            continue  # another host's URL, or already collected
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        rows.append((f"{kind}/{name}", kind, size, content_type, current_job_id.get(), now, now))
+    if not rows:
+        return 0
+    with closing(_open()) as conn:
+        conn.executemany(
+            "INSERT INTO artifacts(key, kind, size, content_type, job_id, created_at, last_accessed) VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET size = excluded.size, created_at = excluded.created_at, last_accessed = excluded.last_accessed",
+            rows
+        )
+    return len(rows)
+
+def get_artifact(key: str) -> Optional[dict]:
+    with closing(_open()) as conn:
+        row = conn.execute(
+            "SELECT key, kind, size, content_type, job_id, created_at, last_accessed FROM artifacts WHERE key = ?", (key,)
+        ).fetchone()
+    if row is None:
+        return None
+    return dict(zip(["key", "kind", "size", "content_type", "job_id", "created_at", "last_accessed"], row))
+
+def open_artifact(key: str) -> Iterator[bytes]:
+    return get_backend().open(key)
+
+def touch_artifact(key: str):
+    """Marks an artifact as recently read so quota eviction keeps it."""
+    now = time.time()
+    if now - _touched.get(key, 0) < ARTIFACT_TOUCH_INTERVAL:
+        return
+    if len(_touched) > 10000:
+        _touched.clear()
+    _touched[key] = now
+    with closing(_open()) as conn:
+        conn.execute(
+            "UPDATE artifacts SET last_accessed = ? WHERE key = ? AND last_accessed < ?",
+            (now, key, now - ARTIFACT_TOUCH_INTERVAL)
+        )
+
+def delete_artifact(key: str):
+    global _memory_bytes
+    with _memory_lock:
+        entry = _memory.pop(key, None)
+        if entry is not None:
+            _memory_bytes -= len(entry["data"])
+    get_backend().delete(key)
+    with closing(_open()) as conn:
+        conn.execute("DELETE FROM artifacts WHERE key = ?", (key,))
+
+def artifact_relpath(ref: str) -> str:
+    """
+    Path of an artifact under /outputs. Accepts keys as well as the plain
+    paths older job results hold (e.g. data/outputs/word/x.docx).
+    """
+    root = ARTIFACT_ROOT.rstrip("/") + "/"
+    return ref[len(root):] if ref.startswith(root) else ref
+
+def artifact_url(ref: Optional[str], base_url: str) -> Optional[str]:
+    """Public URL of an artifact key (None passes through)."""
+    if not ref:
+        return None
+    return f"{base_url}/outputs/{artifact_relpath(ref)}"
+
+# -----------------------------
+# Garbage collection
+# -----------------------------
+def _adopt_legacy_outputs(now: float) -> int:
+    """
+    Indexes files left in the flat pre-store folders and media files no saved
+    lesson has referenced yet; returns how many were new. Media files are
+    dated from when GC first sees them: lessons saved before references were
+    recorded may still embed them.
+    """
+    if get_backend().name != "local":
+        return 0
+    rows = []
+    for kind in LEGACY_OUTPUT_KINDS + MEDIA_KINDS:
+        directory = os.path.join(ARTIFACT_ROOT, kind)
+        if not os.path.isdir(directory):
+            continue
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file() and not entry.name.startswith("."):
+                    stat = entry.stat()
+                    created = now if kind in MEDIA_KINDS else stat.st_mtime
+                    content_type = mimetypes.guess_type(entry.name)[0] or "application/octet-stream"
+                    rows.append((f"{kind}/{entry.name}", kind, stat.st_size, content_type, created, created))
+    if not rows:
+        return 0
+    with closing(_open()) as conn:
+        return conn.executemany(
+            "INSERT OR IGNORE INTO artifacts(key, kind, size, content_type, created_at, last_accessed) VALUES (?, ?, ?, ?, ?, ?)",
+            rows
+        ).rowcount
+
+def _sweep_caches(cutoff: float) -> tuple:
+    removed = freed = 0
+    for tree in CACHE_TREES:
+        for dirpath, _, filenames in os.walk(tree):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                    if stat.st_mtime < cutoff:
+                        os.remove(path)
+                        removed += 1
+                        freed += stat.st_size
+                except OSError as e:
+                    print(f"[Artifacts] Could not remove {path}: {e}")
+    return removed, freed
+
+def collect_garbage(now: Optional[float] = None) -> dict:
+    """
+    Deletes artifacts older than ARTIFACT_RETENTION_SECONDS, then the least
+    recently accessed ones until the store is under ARTIFACT_MAX_BYTES, then
+    cache entries unused for CACHE_RETENTION_SECONDS. Only indexed artifacts
+    are collected; legacy flat output files and new media files are indexed first.
+    """
+    now = now or time.time()
+    backend = get_backend()
+    adopted = _adopt_legacy_outputs(now)
+
+    with closing(_open()) as conn:
+        expired = conn.execute(
+            "SELECT key, size FROM artifacts WHERE created_at < ?", (now - ARTIFACT_RETENTION_SECONDS,)
+        ).fetchall()
+        expired_keys = {key for key, _ in expired}
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0]
+        total -= sum(size for _, size in expired)
+
+        evicted = []
+        if total > ARTIFACT_MAX_BYTES:
+            candidates = conn.execute(
+                "SELECT key, size FROM artifacts WHERE created_at < ? ORDER BY last_accessed ASC",
+                (now - ARTIFACT_MIN_AGE_SECONDS,)
+            ).fetchall()
+            for key, size in candidates:
+                if total <= ARTIFACT_MAX_BYTES:
+                    break
+                if key in expired_keys:
+                    continue
+                evicted.append((key, size))
+                total -= size
+
+    deleted = freed = 0
+    for key, size in expired + evicted:
+        try:
+            backend.delete(key)
+        except Exception as e:
+            print(f"[Artifacts] Could not delete {key}: {e}")
+            continue
+        with closing(_open()) as conn:
+            conn.execute("DELETE FROM artifacts WHERE key = ?", (key,))
+        deleted += 1
+        freed += size
+
+    swept, swept_bytes = _sweep_caches(now - CACHE_RETENTION_SECONDS)
+    result = {
+        "expired": len(expired), "evicted": len(evicted), "deleted": deleted, "legacy_adopted": adopted,
+        "cache_removed": swept, "freed_bytes": freed + swept_bytes,
+    }
+    if deleted or swept or adopted:
+        print(f"[Artifacts] GC: {result}")
+    return result
+
+async def run_gc_forever(interval: float = ARTIFACT_GC_INTERVAL):
+    """Background loop started from the app lifespan; also prunes old finished jobs."""
+    while True:
+        try:
+            await asyncio.to_thread(collect_garbage)
+        except Exception as e:
+            print(f"[Artifacts] GC failed: {e}")
+        try:
+            await asyncio.to_thread(prune_finished_jobs)
+        except Exception as e:
+            print(f"[Jobs] Pruning failed: {e}")
+        await asyncio.sleep(interval)
+
+def artifact_stats() -> dict:
+    with closing(_open()) as conn:
+        rows = conn.execute(
+            "SELECT kind, COUNT(*), COALESCE(SUM(size), 0) FROM artifacts GROUP BY kind ORDER BY kind"
+        ).fetchall()
+    return {
+        "backend": get_backend().name,
+        "max_bytes": ARTIFACT_MAX_BYTES,
+        "retention_seconds": ARTIFACT_RETENTION_SECONDS,
+        "size_bytes": sum(size for _, _, size in rows),
+        "kinds": {kind: {"count": count, "size_bytes": size} for kind, count, size in rows},
+        "memory": {"entries": len(_memory), "size_bytes": _memory_bytes, "persist": ARTIFACT_PERSIST},
+    }
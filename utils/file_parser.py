@@ -1,15 +1,54 @@
 # utils/file_parser.py
 
 import os
-from typing import Union
+import uuid
+from typing import Optional, Union
 import docx2txt
 import pptx
 import fitz  # PyMuPDF
+from utils.file_utils import file_sha256
 
-def extract_text_from_file(file_path: str) -> str:
+# Bump whenever extraction output changes so stale cache entries are ignored
+PARSER_VERSION = "1"
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", "data/cache/extracted_text")
+
+def _cache_path(content_hash: str, ext: str) -> str:
+    return os.path.join(EXTRACTION_CACHE_DIR, content_hash[:2], f"{content_hash}{ext}.v{PARSER_VERSION}.txt")
+
+def extract_text_from_file(file_path: str, content_hash: Optional[str] = None, use_cache: bool = True) -> str:
     """
     Extracts readable text content from PDF, DOCX, or PPTX files.
+    Results are cached on disk by SHA-256 of the file bytes plus PARSER_VERSION,
+    so re-parsing identical lessons is skipped. Pass content_hash if already known.
     """
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext not in (".pdf", ".docx", ".pptx"):
+        raise ValueError(f"Unsupported file type for: {file_path}")
+    if not use_cache:
+        return _extract_uncached(file_path)
+
+    cache_path = _cache_path(content_hash or file_sha256(file_path), ext)
+
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            text = f.read()
+        os.utime(cache_path)  # last use, for the cache sweep in utils/artifact_store.py
+        print(f"[FileParser] Extraction cache hit for {os.path.basename(file_path)}")
+        return text
+    except FileNotFoundError:
+        pass
+
+    text = _extract_uncached(file_path)
+
+    # Write-then-rename so concurrent workers never read a partial file
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.{uuid.uuid4().hex}.part"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, cache_path)
+    return text
+
+def _extract_uncached(file_path: str) -> str:
     if file_path.lower().endswith(".pdf"):
         return extract_text_from_pdf(file_path)
     elif file_path.lower().endswith(".docx"):
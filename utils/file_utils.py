@@ -1,33 +1,129 @@
 # utils/file_utils.py
 
 import os
+import time
 import uuid
+import hashlib
 import requests
+from contextlib import closing
 from urllib.parse import urlparse
+from utils.sqlite_utils import connect
 
-def download_file(url: str, dest_dir: str = "data/inputs") -> str:
+DOWNLOAD_INDEX_PATH = os.getenv("DOWNLOAD_INDEX_PATH", "data/cache/downloads.sqlite3")
+DOWNLOAD_MAX_BYTES = int(os.getenv("DOWNLOAD_MAX_BYTES", str(100 * 1024 * 1024)))  # 100 MB
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# One pooled session so repeated lesson downloads reuse connections
+_session = requests.Session()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS downloads (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    sha256 TEXT NOT NULL,
+    path TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+"""
+
+def _open_index():
+    conn = connect(DOWNLOAD_INDEX_PATH)
+    conn.executescript(_SCHEMA)
+    return conn
+
+def file_sha256(file_path: str) -> str:
+    """SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(DOWNLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def blob_path(sha256: str, ext: str, dest_dir: str = "data/inputs") -> str:
+    """Content-addressed location: data/inputs/ab/abcdef....pdf"""
+    return os.path.join(dest_dir, sha256[:2], f"{sha256}{ext}")
+
+def blob_sha256(file_path: str) -> str:
+    """The SHA-256 encoded in a blob_path() location (no file read)."""
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+def download_file(url: str, dest_dir: str = "data/inputs", max_bytes: int = DOWNLOAD_MAX_BYTES) -> str:
     """
     Downloads a file from the given URL and stores it in the destination directory.
     Returns the full path of the downloaded file.
+
+    - Repeat downloads of a URL send If-None-Match / If-Modified-Since, and a
+      304 reuses the stored copy without transferring the body.
+    - Bodies are streamed to disk in chunks and rejected past `max_bytes`.
+    - Files are stored by SHA-256, so identical lessons are kept only once.
     """
     os.makedirs(dest_dir, exist_ok=True)
 
-    # Extract filename or generate one
     parsed_url = urlparse(url)
     original_name = os.path.basename(parsed_url.path)
     ext = os.path.splitext(original_name)[1] or ".bin"
-    unique_filename = f"{uuid.uuid4().hex}{ext}"
 
-    file_path = os.path.join(dest_dir, unique_filename)
+    with closing(_open_index()) as conn:
+        cached = conn.execute(
+            "SELECT etag, last_modified, path FROM downloads WHERE url = ?", (url,)
+        ).fetchone()
+
+    headers = {}
+    if cached and os.path.exists(cached[2]):
+        etag, last_modified, _ = cached
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    else:
+        cached = None
+
+    tmp_path = os.path.join(dest_dir, f".{uuid.uuid4().hex}.part")
 
     try:
-        response = requests.get(url, timeout=20)
-        response.raise_for_status()
+        with _session.get(url, headers=headers, timeout=20, stream=True) as response:
+            if response.status_code == 304 and cached:
+                print(f"[Download] Not modified, reusing {cached[2]}")
+                os.utime(cached[2])  # last use, for the cache sweep in utils/artifact_store.py
+                return cached[2]
+
+            response.raise_for_status()
+
+            declared = response.headers.get("Content-Length")
+            if declared and declared.isdigit() and int(declared) > max_bytes:
+                raise ValueError(f"File is {declared} bytes, limit is {max_bytes}")
 
-        with open(file_path, "wb") as f:
-            f.write(response.content)
+            digest = hashlib.sha256()
+            size = 0
+            with open(tmp_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise ValueError(f"File exceeds the {max_bytes} byte limit")
+                    digest.update(chunk)
+                    f.write(chunk)
+
+            sha256 = digest.hexdigest()
+            file_path = blob_path(sha256, ext, dest_dir)
+            if os.path.exists(file_path):
+                os.remove(tmp_path)  # identical bytes already stored
+                os.utime(file_path)
+            else:
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                os.replace(tmp_path, file_path)
+
+            with closing(_open_index()) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO downloads(url, etag, last_modified, sha256, path, fetched_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (url, response.headers.get("ETag"), response.headers.get("Last-Modified"), sha256, file_path, time.time())
+                )
 
         return file_path
 
     except Exception as e:
-        raise RuntimeError(f"Failed to download file: {url} — {str(e)}")
\ No newline at end of file
+        raise RuntimeError(f"Failed to download file: {url} — {str(e)}")
+
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,226 @@
+# utils/job_queue.py
+
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+from contextlib import closing
+from contextvars import ContextVar
+from typing import AsyncIterator, Callable, Dict, Optional
+from utils.sqlite_utils import connect
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "data/cache/jobs.sqlite3")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))            # concurrent jobs per process
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_HEARTBEAT_INTERVAL = 10.0                                # seconds between liveness updates
+JOB_STALE_AFTER = 60.0                                       # running jobs without a heartbeat are requeued
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "2"))
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))  # finished jobs kept 7 days
+
+# A runner takes the job inputs and yields pipeline events (see graph/streaming.py);
+# its final {"event": "result", "state": {...}} becomes the job result.
+Runner = Callable[[dict], AsyncIterator[dict]]
+
+# Id of the job the current task is running, if any (inherited by graph nodes and to_thread calls)
+current_job_id: ContextVar[Optional[str]] = ContextVar("current_job_id", default=None)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    inputs TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    node_timings TEXT NOT NULL DEFAULT '[]',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs(finished_at);
+"""
+
+def _open():
+    conn = connect(JOB_DB_PATH)
+    conn.executescript(_SCHEMA)
+    return conn
+
+def _row_to_job(row) -> dict:
+    keys = ["id", "kind", "status", "inputs", "result", "error", "node_timings", "attempts",
+            "worker", "created_at", "started_at", "finished_at", "heartbeat_at"]
+    job = dict(zip(keys, row))
+    job["inputs"] = json.loads(job["inputs"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    job["node_timings"] = json.loads(job["node_timings"])
+    return job
+
+# -----------------------------
+# Store operations (blocking)
+# -----------------------------
+def submit_job(kind: str, inputs: dict) -> str:
+    job_id = uuid.uuid4().hex
+    with closing(_open()) as conn:
+        conn.execute(
+            "INSERT INTO jobs(id, kind, status, inputs, created_at) VALUES (?, ?, 'queued', ?, ?)",
+            (job_id, kind, json.dumps(inputs, default=str), time.time())
+        )
+    return job_id
+
+def get_job(job_id: str) -> Optional[dict]:
+    with closing(_open()) as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return _row_to_job(row) if row else None
+
+def claim_next_job(worker: str, kinds: list) -> Optional[dict]:
+    """
+    Atomically moves the oldest queued job (or a running job whose worker
+    stopped heartbeating, e.g. after a restart) to 'running' for this worker.
+    """
+    now = time.time()
+    placeholders = ",".join("?" for _ in kinds)
+    with closing(_open()) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                f"""SELECT * FROM jobs
+                    WHERE kind IN ({placeholders})
+                      AND (status = 'queued' OR (status = 'running' AND heartbeat_at < ?))
+                    ORDER BY created_at LIMIT 1""",
+                (*kinds, now - JOB_STALE_AFTER)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            job = _row_to_job(row)
+            if job["attempts"] >= JOB_MAX_ATTEMPTS:
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                    (f"Gave up after {job['attempts']} attempts (worker lost)", now, job["id"])
+                )
+                conn.execute("COMMIT")
+                return None
+
+            conn.execute(
+                """UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1,
+                       started_at = ?, heartbeat_at = ?, node_timings = '[]', error = NULL
+                   WHERE id = ?""",
+                (worker, now, now, job["id"])
+            )
+            conn.execute("COMMIT")
+            return job
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+def heartbeat(job_id: str, worker: str):
+    with closing(_open()) as conn:
+        conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND worker = ?", (time.time(), job_id, worker))
+
+def record_node_timing(job_id: str, timing: dict):
+    with closing(_open()) as conn:
+        conn.execute(
+            "UPDATE jobs SET node_timings = json_insert(node_timings, '$[#]', json(?)), heartbeat_at = ? WHERE id = ?",
+            (json.dumps(timing), time.time(), job_id)
+        )
+
+def finish_job(job_id: str, result: Optional[dict] = None, error: Optional[str] = None):
+    with closing(_open()) as conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+            (
+                "failed" if error else "succeeded",
+                json.dumps(result, default=str) if result is not None else None,
+                error,
+                time.time(),
+                job_id
+            )
+        )
+
+def prune_finished_jobs(now: Optional[float] = None) -> int:
+    """Deletes succeeded / failed jobs finished more than JOB_RETENTION_SECONDS ago."""
+    cutoff = (now or time.time()) - JOB_RETENTION_SECONDS
+    with closing(_open()) as conn:
+        deleted = conn.execute(
+            "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND finished_at < ?", (cutoff,)
+        ).rowcount
+    if deleted:
+        print(f"[Jobs] Pruned {deleted} finished job(s)")
+    return deleted
+
+# -----------------------------
+# Worker pool
+# -----------------------------
+class JobWorkerPool:
+    """
+    Runs queued jobs with `size` concurrent asyncio workers in this process.
+    Several processes can share one JOB_DB_PATH; claiming is atomic.
+    """
+
+    def __init__(self, runners: Dict[str, Runner], size: int = JOB_WORKERS):
+        self.runners = runners
+        self.size = size
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks = []
+        self._stopping = asyncio.Event()
+
+    def start(self):
+        for i in range(self.size):
+            self._tasks.append(asyncio.create_task(self._work(f"{self.worker_prefix}:{i}")))
+        print(f"[Jobs] Started {self.size} worker(s)")
+
+    async def stop(self):
+        self._stopping.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self, worker: str):
+        kinds = list(self.runners)
+        while not self._stopping.is_set():
+            try:
+                job = await asyncio.to_thread(claim_next_job, worker, kinds)
+            except Exception as e:
+                print(f"[Jobs] Claim failed: {e}")
+                job = None
+
+            if job is None:
+                await asyncio.sleep(JOB_POLL_INTERVAL)
+                continue
+
+            await self._run(job, worker)
+
+    async def _run(self, job: dict, worker: str):
+        print(f"[Jobs] {worker} running {job['kind']} job {job['id']}")
+
+        async def keep_alive():
+            while True:
+                await asyncio.sleep(JOB_HEARTBEAT_INTERVAL)
+                await asyncio.to_thread(heartbeat, job["id"], worker)
+
+        pulse = asyncio.create_task(keep_alive())
+        token = current_job_id.set(job["id"])
+        try:
+            result = None
+            async for event in self.runners[job["kind"]](job["inputs"]):
+                if event.get("event") == "node_end":
+                    timing = {k: event.get(k) for k in ("node", "duration_ms", "error")}
+                    await asyncio.to_thread(record_node_timing, job["id"], timing)
+                elif event.get("event") == "result":
+                    result = event.get("state")
+            await asyncio.to_thread(finish_job, job["id"], result)
+        except asyncio.CancelledError:
+            # Shutting down: leave it 'running'; it is requeued once its heartbeat goes stale
+            raise
+        except Exception as e:
+            await asyncio.to_thread(finish_job, job["id"], None, str(e))
+        finally:
+            current_job_id.reset(token)
+            pulse.cancel()
@@ -0,0 +1,17 @@
+# utils/sqlite_utils.py
+
+import os
+import sqlite3
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """
+    Opens a SQLite connection that is safe to share between uvicorn worker processes.
+    WAL lets readers proceed while one process writes; busy_timeout makes
+    concurrent writers wait instead of failing with 'database is locked'.
+    """
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
@@ -0,0 +1,188 @@
+# utils/static_files.py
+
+import os
+import gzip
+import stat
+import anyio
+import hashlib
+import mimetypes
+import threading
+from collections import OrderedDict
+from typing import Optional
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; text assets fall back to gzip
+    brotli = None
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"  # may be cached, but revalidated (ETag) on every use
+
+COMPRESSIBLE_TYPES = {"text/markdown", "application/json", "text/javascript", "application/javascript",
+                      "text/css", "text/html", "text/plain"}
+COMPRESS_MIN_BYTES = 512
+COMPRESS_MAX_BYTES = 8 * 1024 * 1024           # larger text files are sent as-is
+COMPRESSED_CACHE_MAX_BYTES = int(os.getenv("COMPRESSED_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+HASH_CHUNK_SIZE = 1024 * 1024
+
+_lock = threading.Lock()
+_etags: "OrderedDict[tuple, str]" = OrderedDict()        # (path, size, mtime_ns) -> sha256 hex
+_compressed: "OrderedDict[tuple, bytes]" = OrderedDict()  # (path, size, mtime_ns, encoding) -> body
+_compressed_bytes = 0
+
+def _stat_key(path: str, stat_result: os.stat_result) -> tuple:
+    return (path, stat_result.st_size, stat_result.st_mtime_ns)
+
+def content_etag(path: str, stat_result: os.stat_result) -> str:
+    """SHA-256 of the file contents, cached per (path, size, mtime). Blocking."""
+    key = _stat_key(path, stat_result)
+    with _lock:
+        if key in _etags:
+            _etags.move_to_end(key)
+            return _etags[key]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+
+    with _lock:
+        _etags[key] = digest.hexdigest()
+        while len(_etags) > 4096:
+            _etags.popitem(last=False)
+    return digest.hexdigest()
+
+def compress(data: bytes, encoding: str) -> bytes:
+    return brotli.compress(data) if encoding == "br" else gzip.compress(data, compresslevel=6, mtime=0)
+
+def compressed_body(path: str, stat_result: os.stat_result, encoding: str) -> bytes:
+    """The file compressed with `encoding` ("br" or "gzip"), kept in a bounded LRU. Blocking."""
+    global _compressed_bytes
+    key = _stat_key(path, stat_result) + (encoding,)
+    with _lock:
+        if key in _compressed:
+            _compressed.move_to_end(key)
+            return _compressed[key]
+
+    with open(path, "rb") as f:
+        body = compress(f.read(), encoding)
+
+    with _lock:
+        if key not in _compressed:
+            _compressed[key] = body
+            _compressed_bytes += len(body)
+        while _compressed_bytes > COMPRESSED_CACHE_MAX_BYTES and len(_compressed) > 1:
+            _, evicted = _compressed.popitem(last=False)
+            _compressed_bytes -= len(evicted)
+    return body
+
+def _compressible(path: str, stat_result: os.stat_result) -> bool:
+    media_type = mimetypes.guess_type(path)[0]
+    return media_type in COMPRESSIBLE_TYPES and COMPRESS_MIN_BYTES <= stat_result.st_size <= COMPRESS_MAX_BYTES
+
+def preferred_encoding(accept_encoding: str) -> Optional[str]:
+    """br if brotli is installed and accepted, else gzip if accepted, else None."""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        if params.replace(" ", "").lower() in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(token.strip().lower())
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+def _etag_matches(request_headers: Headers, etag: str) -> bool:
+    if_none_match = request_headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+def bytes_response(data: bytes, media_type: str, etag: str, request_headers: Headers,
+                   cache_control: str = IMMUTABLE_CACHE_CONTROL) -> Response:
+    """
+    In-memory counterpart of CachedStaticFiles.file_response: ETag and
+    Cache-Control headers, If-None-Match, and gzip/br for text types.
+    """
+    headers = {"etag": f'"{etag}"', "cache-control": cache_control}
+    if media_type.split(";")[0] in COMPRESSIBLE_TYPES:
+        headers["vary"] = "Accept-Encoding"
+        encoding = preferred_encoding(request_headers.get("accept-encoding", ""))
+        if encoding and COMPRESS_MIN_BYTES <= len(data) <= COMPRESS_MAX_BYTES:
+            headers["etag"] = f'"{etag}-{encoding}"'
+            headers["content-encoding"] = encoding
+            if not _etag_matches(request_headers, headers["etag"]):
+                data = compress(data, encoding)
+    if _etag_matches(request_headers, headers["etag"]):
+        return NotModifiedResponse(Headers(headers))
+    return Response(data, media_type=media_type, headers=headers)
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles with strong content-hash ETags, an explicit Cache-Control
+    policy and precompressed (br/gzip) text assets. Range requests are
+    handled by Starlette's FileResponse and honour If-Range with the ETag.
+
+    `immutable=True` is for directories whose file names never get reused
+    (uuid or content-hash names): clients may cache them for a year
+    without revalidating.
+    """
+
+    def __init__(self, *args, immutable: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_control = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+
+    async def get_response(self, path: str, scope) -> Response:
+        await self._warm(path, Headers(scope=scope))
+        return await super().get_response(path, scope)
+
+    async def _warm(self, path: str, request_headers: Headers):
+        """Hashes (and compresses) the file off the event loop so file_response hits the caches."""
+        try:
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path)
+        except Exception:
+            return  # StaticFiles reports the error itself
+        if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+            return
+
+        def warm():
+            content_etag(full_path, stat_result)
+            encoding = preferred_encoding(request_headers.get("accept-encoding", ""))
+            if encoding and _compressible(full_path, stat_result):
+                compressed_body(full_path, stat_result, encoding)
+
+        await anyio.to_thread.run_sync(warm)
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        etag = content_etag(full_path, stat_result)
+        response = FileResponse(
+            full_path, status_code=status_code, stat_result=stat_result,
+            headers={"etag": f'"{etag}"', "cache-control": self.cache_control}
+        )
+
+        if response.media_type.split(";")[0] in COMPRESSIBLE_TYPES:
+            response.headers["vary"] = "Accept-Encoding"
+            encoding = preferred_encoding(request_headers.get("accept-encoding", ""))
+            if encoding and _compressible(full_path, stat_result) and status_code == 200:
+                headers = {
+                    "etag": f'"{etag}-{encoding}"',
+                    "cache-control": self.cache_control,
+                    "content-encoding": encoding,
+                    "vary": "Accept-Encoding",
+                    "last-modified": response.headers["last-modified"],
+                }
+                if self.is_not_modified(Headers(headers), request_headers):
+                    return NotModifiedResponse(Headers(headers))
+                body = compressed_body(full_path, stat_result, encoding)
+                return Response(body, status_code=status_code, headers=headers, media_type=response.media_type)
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,37 @@
+# utils/tokens.py
+
+import re
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional; fall back to a heuristic
+    tiktoken = None
+
+ENCODING_NAME = "o200k_base"  # tokenizer used by gpt-4o
+
+# Rough token pieces when tiktoken (or its encoding file) is unavailable:
+# words, numbers and individual punctuation/symbols
+_TOKEN_PIECE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+@lru_cache(maxsize=1)
+def _encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(ENCODING_NAME)
+    except Exception as e:  # encoding files are fetched on first use and may be unreachable
+        print(f"[Tokens] tiktoken unavailable ({e}); using heuristic counts")
+        return None
+
+def count_tokens(text: str) -> int:
+    """
+    Counts gpt-4o tokens locally. Falls back to an estimate (word pieces, with
+    long words counted as ~4 characters per token) when tiktoken can't load.
+    """
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return sum(max(1, (len(piece) + 3) // 4) for piece in _TOKEN_PIECE.findall(text))
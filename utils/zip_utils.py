@@ -0,0 +1,72 @@
+# utils/zip_utils.py
+
+import io
+import struct
+import zipfile
+from typing import Dict, List, Tuple
+
+_EOCD_SIGNATURE = b"PK\x05\x06"
+_EOCD = struct.Struct("<4s4H2LH")        # end of central directory record (no zip64)
+_CENTRAL_OFFSET_FIELD = slice(42, 46)    # local header offset inside a central directory record
+
+def _raw_entries(data: bytes) -> List[Tuple[str, bytes, bytes]]:
+    """(name, local record, central directory record) for each entry, as stored."""
+    eocd = data.rfind(_EOCD_SIGNATURE)
+    if eocd < 0:
+        raise ValueError("not a zip archive")
+    _, _, _, _, count, _, cd_start, _ = _EOCD.unpack_from(data, eocd)
+    if count == 0xFFFF or cd_start == 0xFFFFFFFF:
+        raise ValueError("zip64 archives are not supported")
+
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        infos = zf.infolist()
+    bounds = sorted(info.header_offset for info in infos) + [cd_start]
+    next_offset = dict(zip(bounds, bounds[1:]))
+
+    entries, pos = [], cd_start
+    for info in infos:  # central directory order
+        name_len, extra_len, comment_len = struct.unpack_from("<3H", data, pos + 28)
+        central = data[pos:pos + 46 + name_len + extra_len + comment_len]
+        pos += len(central)
+        local = data[info.header_offset:next_offset[info.header_offset]]  # header, data (+ descriptor)
+        entries.append((info.filename, local, central))
+    return entries
+
+class ZipTemplate:
+    """
+    A zip archive (docx, pptx, ...) split into its raw entry records, so
+    copies with a few entries replaced are written without decompressing
+    or recompressing the others.
+    """
+
+    def __init__(self, data: bytes):
+        self.entries = _raw_entries(data)
+        self.names = {name for name, _, _ in self.entries}
+
+    def replace(self, replacements: Dict[str, bytes]) -> bytes:
+        """The archive bytes with the given entries' contents replaced (deflated)."""
+        unknown = set(replacements) - self.names
+        if unknown:
+            raise ValueError(f"entries not in template: {sorted(unknown)}")
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+            for name, payload in replacements.items():
+                zf.writestr(name, payload)
+        replaced = {name: (local, central) for name, local, central in _raw_entries(buffer.getvalue())}
+
+        out = io.BytesIO()
+        central_dir = []
+        for name, local, central in self.entries:
+            local, central = replaced.get(name, (local, central))
+            offset = out.tell()
+            out.write(local)
+            central_dir.append(central[:_CENTRAL_OFFSET_FIELD.start] + struct.pack("<L", offset)
+                               + central[_CENTRAL_OFFSET_FIELD.stop:])
+
+        cd_start = out.tell()
+        for record in central_dir:
+            out.write(record)
+        count = len(central_dir)
+        out.write(_EOCD.pack(_EOCD_SIGNATURE, 0, 0, count, count, out.tell() - cd_start, cd_start, 0))
+        return out.getvalue()